@@ -1,4 +1,135 @@
+import asyncio, random, time
+import httpx
+from .cache import ReadCache, read_cache
+
 class AdapterError(Exception): pass
+class CircuitOpenError(AdapterError): pass
+class UpstreamClientError(AdapterError):
+    """Upstream answered 4xx; passed through with its status and never counted against the breaker."""
+    def __init__(self, msg:str, status_code:int):
+        super().__init__(msg); self.status_code = status_code
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; after `reset_s` lets one trial call through (half-open)."""
+    def __init__(self, threshold:int=5, reset_s:float=30.0):
+        self.threshold, self.reset_s = threshold, reset_s
+        self.failures = 0; self.opened_at = None; self._trial = False
+    @property
+    def state(self)->str:
+        if self.opened_at is None: return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_s else "open"
+    def allow(self)->bool:
+        st = self.state
+        if st == "closed": return True
+        if st == "half-open" and not self._trial: self._trial = True; return True
+        return False
+    def end_trial(self): self._trial = False
+    def success(self): self.failures = 0; self.opened_at = None; self._trial = False
+    def failure(self):
+        self.failures += 1; self._trial = False
+        if self.failures >= self.threshold: self.opened_at = time.monotonic()
+
+RETRY_STATUS = {429, 502, 503, 504}
+
 class BaseAdapter:
-    def __init__(self, **kwargs): self.config = kwargs
+    """Client base for ERP/WMS/CMMS/SupplierNet.
+
+    Built once per process. With a `url` it talks HTTP over one pooled
+    keep-alive AsyncClient, with a per-adapter timeout, retries (exponential
+    backoff, full jitter) and a circuit breaker. Without a `url` subclasses
+    answer from their built-in demo data. Reads go through a shared `ReadCache`
+    with per-kind `ttls` (seconds, overriding the class `TTLS`) and `stale_s`.
+    """
+    TTLS: dict[str, float] = {}
+    def __init__(self, url:str='', api_key:str='', timeout:float=5.0, retries:int=2, backoff:float=0.2,
+                 max_connections:int=20, breaker_threshold:int=5, breaker_reset_s:float=30.0,
+                 ttls:dict|None=None, stale_s:float=0.0, cache:ReadCache|None=None, batch_size:int=100, **kwargs):
+        self.config = {"url": url, "api_key": api_key, **kwargs}
+        self.url = (url or '').rstrip('/'); self.api_key = api_key
+        self.timeout, self.retries, self.backoff = timeout, retries, backoff
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_s)
+        self._client: httpx.AsyncClient | None = None
+        self.ttls = {**self.TTLS, **(ttls or {})}; self.stale_s = stale_s
+        self.cache = read_cache if cache is None else cache
+        self.batch_size, self.concurrency = max(1, batch_size), max(1, max_connections)
+    @property
+    def live(self)->bool: return bool(self.url)
+    @property
+    def client(self)->httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(base_url=self.url, headers=headers, timeout=self.timeout, limits=self.limits)
+        return self._client
+    async def request(self, method:str, path:str, **kw)->dict:
+        """JSON request with retries. Non-idempotent methods are only retried when the connection never opened.
+        Upstream 4xx raise ``UpstreamClientError`` and never count against the breaker; 5xx, bad JSON and transport errors do."""
+        idempotent = method.upper() in ("GET", "HEAD", "PUT", "DELETE")
+        name = type(self).__name__
+        for attempt in range(self.retries + 1):
+            trial = self.breaker.state == "half-open"
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{name}: circuit open")
+            try:
+                r = await self.client.request(method, path, **kw)
+                if r.status_code in RETRY_STATUS and idempotent and attempt < self.retries:
+                    if r.status_code >= 500: self.breaker.failure()
+                elif r.status_code >= 500:
+                    self.breaker.failure()
+                    raise AdapterError(f"{name}: {r.status_code} {r.text[:200]}")
+                elif r.status_code >= 400:
+                    self.breaker.success()   # upstream is up; the request itself was refused
+                    raise UpstreamClientError(f"{name}: {r.status_code} {r.text[:200]}", r.status_code)
+                else:
+                    try: data = r.json()
+                    except ValueError as e:
+                        self.breaker.failure(); raise AdapterError(f"{name}: invalid JSON from upstream") from e
+                    self.breaker.success(); return data
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                self.breaker.failure()
+                if attempt >= self.retries: raise AdapterError(f"{name}: {e}") from e
+            except httpx.TransportError as e:
+                self.breaker.failure()
+                if not idempotent or attempt >= self.retries: raise AdapterError(f"{name}: {e}") from e
+            finally:
+                if trial: self.breaker.end_trial()   # cancelled or failed in an unexpected way: let the next call try again
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+        raise AdapterError(f"{name}: retries exhausted")
+    # ---------- bulk ----------
+    async def each_chunk(self, items:list, fetch_chunk):
+        """Split ``items`` into ``batch_size`` chunks, run ``fetch_chunk(chunk) -> results`` for them in
+        parallel (at most ``concurrency`` at once) and yield ``(chunk, results | AdapterError)`` as each finishes."""
+        sem = asyncio.Semaphore(self.concurrency)
+        async def run(chunk):
+            async with sem:
+                try: return chunk, await fetch_chunk(chunk)
+                except AdapterError as e: return chunk, e
+        chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        for fut in asyncio.as_completed([run(c) for c in chunks]): yield await fut
+
+    async def read_many(self, kind:str, keys:list[tuple], fetch_chunk):
+        """Bulk read through the cache: yields ``(key, result | AdapterError)``, cached keys first,
+        the rest fetched in chunks and cached as they arrive."""
+        ttl, since, todo = self.ttls.get(kind, 0.0), self.cache.clock, []
+        for k in dict.fromkeys(keys):
+            hit = self.cache.peek((kind, *k))
+            if hit is None: todo.append(k)
+            else: yield k, hit
+        async for chunk, res in self.each_chunk(todo, fetch_chunk):
+            for k, r in zip(chunk, [res] * len(chunk) if isinstance(res, Exception) else res):
+                if not isinstance(r, Exception): self.cache.put((kind, *k), r, ttl, self.stale_s, since)
+                yield k, r
+
+    @staticmethod
+    async def collect(pairs, keys:list[tuple])->list:
+        """Drain a ``read_many``-style stream into a list aligned with ``keys``."""
+        got = {k: r async for k, r in pairs}
+        return [got[k] for k in keys]
+
+    async def aclose(self):
+        if self._client is not None: await self._client.aclose(); self._client = None
     def ping(self): return True
+    async def aping(self)->bool:
+        if not self.live: return True
+        try: await self.request("GET", "/health"); return True
+        except AdapterError: return False
@@ -0,0 +1,97 @@
+import asyncio, functools, time
+from collections import OrderedDict
+
+class ReadCache:
+    """Read-through cache for adapter reads keyed by ``(kind, *args)``.
+
+    A fresh entry (younger than its TTL) is served directly; an entry within the
+    extra ``stale_s`` window is served as-is while one background refresh runs
+    (stale-while-revalidate). Misses are single-flight: concurrent callers for the
+    same key await one upstream call. ``invalidate`` drops entries and in-flight
+    loads by key prefix, and results for keys under that prefix from loads started
+    before it are not stored; loads of other keys are unaffected.
+    """
+    def __init__(self, max_entries:int=4096):
+        self.max_entries = max_entries
+        self._data: OrderedDict[tuple, tuple[float, float, object]] = OrderedDict()   # key -> (fresh_until, stale_until, value)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self._clock = 0                                   # bumped by every invalidate
+        self._gens: OrderedDict[tuple, int] = OrderedDict()  # prefix -> clock of its last invalidation (at most max_entries)
+        self._floor = 0                                   # clock of the newest generation dropped from _gens
+        self.counters = {"hits": 0, "stale": 0, "misses": 0, "coalesced": 0, "loads": 0, "errors": 0, "invalidations": 0}
+
+    async def get(self, key:tuple, fetch, ttl:float, stale_s:float=0.0):
+        now = time.monotonic()
+        hit = self._data.get(key)
+        if hit is not None and now < hit[0]:
+            self.counters["hits"] += 1; self._data.move_to_end(key); return hit[2]
+        if hit is not None and now < hit[1]:
+            self.counters["stale"] += 1; self._flight(key, fetch, ttl, stale_s); return hit[2]
+        if key in self._inflight: self.counters["coalesced"] += 1
+        else: self.counters["misses"] += 1
+        return await asyncio.shield(self._flight(key, fetch, ttl, stale_s))   # a cancelled caller doesn't cancel the others
+
+    def _flight(self, key:tuple, fetch, ttl:float, stale_s:float)->asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._load(key, fetch, ttl, stale_s))
+            task.add_done_callback(functools.partial(self._done, key))
+        return task
+
+    def _done(self, key:tuple, task:asyncio.Task):
+        if self._inflight.get(key) is task: del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None: self.counters["errors"] += 1
+
+    async def _load(self, key:tuple, fetch, ttl:float, stale_s:float):
+        since = self._clock
+        self.counters["loads"] += 1
+        value = await fetch()
+        self.put(key, value, ttl, stale_s, since)
+        return value
+
+    @property
+    def clock(self)->int:
+        """Pass to ``put(..., since=)`` to drop a result if its key is invalidated while it loads."""
+        return self._clock
+
+    def _invalidated_since(self, key:tuple, since:int)->bool:
+        if since < self._floor: return True   # its prefix's generation may have been pruned: assume the worst
+        return any(self._gens.get(key[:i], -1) > since for i in range(len(key) + 1))
+
+    def peek(self, key:tuple):
+        """Fresh value for ``key`` or None (bulk reads use this, then ``put`` what they fetched)."""
+        hit = self._data.get(key)
+        if hit is None or time.monotonic() >= hit[0]: return None
+        self.counters["hits"] += 1; self._data.move_to_end(key); return hit[2]
+
+    def put(self, key:tuple, value, ttl:float, stale_s:float=0.0, since:int|None=None):
+        if since is not None and self._invalidated_since(key, since): return   # a write since the load started may have changed the answer
+        now = time.monotonic()
+        self._data[key] = (now + ttl, now + ttl + stale_s, value); self._data.move_to_end(key)
+        while len(self._data) > self.max_entries: self._data.popitem(last=False)
+
+    def invalidate(self, *prefix)->int:
+        """Drop cached and in-flight entries whose key starts with ``prefix`` (everything if empty)."""
+        n = len(prefix)
+        keys = [k for k in self._data if k[:n] == prefix]
+        for k in keys: del self._data[k]
+        for k in [k for k in self._inflight if k[:n] == prefix]: del self._inflight[k]
+        self._clock += 1; self._gens[prefix] = self._clock; self._gens.move_to_end(prefix)
+        while len(self._gens) > self.max_entries: self._floor = self._gens.popitem(last=False)[1]
+        self.counters["invalidations"] += 1
+        return len(keys)
+
+    def stats(self)->dict: return {"entries": len(self._data), "inflight": len(self._inflight), **self.counters}
+
+# One cache per process, shared by all adapters so a write on one system can invalidate reads on another.
+read_cache = ReadCache()
+
+def cached_read(kind:str, key=None):
+    """Decorator for async adapter reads: cache under ``(kind, *key(*args))`` with the adapter's TTL for ``kind``."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kw):
+            k = (kind, *(key(*args, **kw) if key else (*args, *kw.values())))
+            return await self.cache.get(k, lambda: fn(self, *args, **kw), self.ttls.get(kind, 0.0), self.stale_s)
+        return wrapper
+    return deco
@@ -1,3 +1,6 @@
 from .base import BaseAdapter
 class CMMS(BaseAdapter):
-    def create_work_order(self, asset:str, desc:str): return {'status':'CREATED','wo':'CMMS-1234','asset':asset,'desc':desc}
+    async def create_work_order(self, asset:str, desc:str):
+        # No cached read (inventory / asn / alternate) depends on work orders, so nothing to invalidate.
+        if self.live: return await self.request("POST", "/work-orders", json={'asset':asset,'desc':desc})
+        return {'status':'CREATED','wo':'CMMS-1234','asset':asset,'desc':desc}
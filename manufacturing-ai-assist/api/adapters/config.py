@@ -1,12 +1,26 @@
 import os
+def _timeout(prefix:str)->float: return float(os.getenv(f'{prefix}_TIMEOUT_S', os.getenv('ADAPTER_TIMEOUT_S','5')))
 class Settings:
     ERP_KIND=os.getenv('ERP_KIND','DYNAMICS')
     ERP_URL=os.getenv('ERP_URL','')
     ERP_API_KEY=os.getenv('ERP_API_KEY','')
+    ERP_TIMEOUT_S=_timeout('ERP')
     WMS_URL=os.getenv('WMS_URL','')
     WMS_API_KEY=os.getenv('WMS_API_KEY','')
+    WMS_TIMEOUT_S=_timeout('WMS')
     CMMS_URL=os.getenv('CMMS_URL','')
     CMMS_API_KEY=os.getenv('CMMS_API_KEY','')
+    CMMS_TIMEOUT_S=_timeout('CMMS')
     SUPPLIER_URL=os.getenv('SUPPLIER_URL','')
     SUPPLIER_API_KEY=os.getenv('SUPPLIER_API_KEY','')
+    SUPPLIER_TIMEOUT_S=_timeout('SUPPLIER')
+    ADAPTER_RETRIES=int(os.getenv('ADAPTER_RETRIES','2'))
+    ADAPTER_MAX_CONNECTIONS=int(os.getenv('ADAPTER_MAX_CONNECTIONS','20'))
+    ADAPTER_BREAKER_THRESHOLD=int(os.getenv('ADAPTER_BREAKER_THRESHOLD','5'))
+    ADAPTER_BREAKER_RESET_S=float(os.getenv('ADAPTER_BREAKER_RESET_S','30'))
+    ADAPTER_BATCH_SIZE=int(os.getenv('ADAPTER_BATCH_SIZE','100'))
+    INVENTORY_TTL_S=float(os.getenv('INVENTORY_TTL_S','30'))
+    ASN_TTL_S=float(os.getenv('ASN_TTL_S','60'))
+    ALTERNATE_TTL_S=float(os.getenv('ALTERNATE_TTL_S','300'))
+    ADAPTER_STALE_S=float(os.getenv('ADAPTER_STALE_S','120'))
 settings=Settings()
@@ -1,10 +1,58 @@
 from .base import BaseAdapter
-class DynamicsERP(BaseAdapter):
-    def get_inventory(self, sku:str): return {'sku':sku,'on_hand':1200,'safety_stock':800,'open_pos':2,'lead_time_days':7}
-    def create_po(self, sku:str, qty:int, supplier:str, expedite:bool=False): return {'status':'CREATED','po_id':'PO-DYN-001','sku':sku,'qty':qty,'supplier':supplier,'expedite':expedite}
-class SAPERP(BaseAdapter):
-    def get_inventory(self, sku:str): return {'sku':sku,'on_hand':1150,'safety_stock':900,'open_pos':1,'lead_time_days':9}
-    def create_po(self, sku:str, qty:int, supplier:str, expedite:bool=False): return {'status':'CREATED','po_id':'PO-SAP-001','sku':sku,'qty':qty,'supplier':supplier,'expedite':expedite}
+from .cache import cached_read
+
+class _ERP(BaseAdapter):
+    """Shared ERP surface; subclasses only differ in their demo data."""
+    TTLS = {'inventory': 30.0}
+    DEMO_INVENTORY: dict = {}
+    DEMO_PO_ID = 'PO-001'
+    @cached_read('inventory')
+    async def get_inventory(self, sku:str):
+        if self.live: return await self.request("GET", f"/inventory/{sku}")
+        return {'sku':sku, **self.DEMO_INVENTORY}
+    async def create_po(self, sku:str, qty:int, supplier:str, expedite:bool=False):
+        try:
+            if self.live: return await self.request("POST", "/po", json={'sku':sku,'qty':qty,'supplier':supplier,'expedite':expedite})
+            return {'status':'CREATED','po_id':self.DEMO_PO_ID,'sku':sku,'qty':qty,'supplier':supplier,'expedite':expedite}
+        finally: invalidate_sku(self.cache, sku)
+
+    # ---------- bulk ----------
+    async def _inventory_chunk(self, keys:list[tuple])->list:
+        skus = [k[0] for k in keys]
+        if self.live: return (await self.request("POST", "/inventory/batch", json={'skus':skus}))['items']
+        return [{'sku':sku, **self.DEMO_INVENTORY} for sku in skus]
+    def iter_inventory(self, skus:list[str]):
+        """``(key, row | AdapterError)`` per SKU as chunks complete."""
+        return self.read_many('inventory', [(s,) for s in skus], self._inventory_chunk)
+    async def get_inventory_many(self, skus:list[str])->list:
+        return await self.collect(self.iter_inventory(skus), [(s,) for s in skus])
+
+    async def _po_chunk(self, orders:list[dict])->list:
+        try:
+            if self.live: return (await self.request("POST", "/po/batch", json={'orders':orders}))['items']
+            return [{'status':'CREATED','po_id':f"{self.DEMO_PO_ID}-{i:04d}", 'expedite':False, **o} for i, o in enumerate(orders, 1)]
+        finally:
+            for sku in {o['sku'] for o in orders}: invalidate_sku(self.cache, sku)
+    async def iter_create_po(self, orders:list[dict]):
+        """``(order, result | AdapterError)`` per PO line as chunks complete (never retried after the request is sent)."""
+        async for chunk, res in self.each_chunk(orders, self._po_chunk):
+            for o, r in zip(chunk, [res] * len(chunk) if isinstance(res, Exception) else res): yield o, r
+    async def create_po_many(self, orders:list[dict])->list:
+        got = [None] * len(orders); pos = {id(o): i for i, o in enumerate(orders)}
+        async for o, r in self.iter_create_po(orders): got[pos[id(o)]] = r
+        return got
+
+class DynamicsERP(_ERP):
+    DEMO_INVENTORY = {'on_hand':1200,'safety_stock':800,'open_pos':2,'lead_time_days':7}
+    DEMO_PO_ID = 'PO-DYN-001'
+class SAPERP(_ERP):
+    DEMO_INVENTORY = {'on_hand':1150,'safety_stock':900,'open_pos':1,'lead_time_days':9}
+    DEMO_PO_ID = 'PO-SAP-001'
+
+def invalidate_sku(cache, sku:str):
+    """A PO changes on-hand/open POs, inbound ASNs and what alternates can still supply for the SKU.
+    Runs even when the write fails: a timed-out POST may still have been applied upstream."""
+    for kind in ('inventory', 'asn', 'alternate'): cache.invalidate(kind, sku)
 
 def make_erp(kind:str, **cfg)->BaseAdapter:
     if (kind or '').upper().startswith('SAP'): return SAPERP(**cfg)
@@ -0,0 +1,51 @@
+# Local stand-in for ERP/WMS/CMMS/SupplierNet, serving the adapters' demo payloads over HTTP.
+#   uvicorn api.adapters.stub_server:app --port 9000
+#   ERP_URL=http://localhost:9000 WMS_URL=... uvicorn api.app:app
+# STUB_DELAY_S adds latency and STUB_FAIL_RATE returns random 503s, to exercise timeouts/retries/breaker.
+import asyncio, os, random
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from .erp import make_erp
+from .wms import WMS
+from .cmms import CMMS
+from .supplier import SupplierNet
+
+app = FastAPI(title="Adapter stub server")
+_erp, _wms, _cmms, _sup = make_erp(os.getenv('ERP_KIND','DYNAMICS')), WMS(), CMMS(), SupplierNet()
+
+class PORequest(BaseModel):
+    sku: str; qty: int; supplier: str; expedite: bool = False
+class POBatch(BaseModel):
+    orders: list[PORequest]
+class SkuList(BaseModel):
+    skus: list[str]
+class ASNList(BaseModel):
+    items: list[dict]
+class WORequest(BaseModel):
+    asset: str; desc: str
+
+async def _chaos():
+    delay = float(os.getenv('STUB_DELAY_S','0'))
+    if delay: await asyncio.sleep(delay)
+    if random.random() < float(os.getenv('STUB_FAIL_RATE','0')): raise HTTPException(503, "stub failure")
+
+@app.get("/health")
+async def health(): return {"status":"ok"}
+@app.get("/inventory/{sku}")
+async def inventory(sku:str): await _chaos(); return await _erp.get_inventory(sku)
+@app.post("/inventory/batch")
+async def inventory_batch(req:SkuList): await _chaos(); return {"items": await _erp._inventory_chunk([(s,) for s in req.skus])}
+@app.post("/po/batch")
+async def po_batch(req:POBatch): await _chaos(); return {"items": await _erp._po_chunk([o.model_dump() for o in req.orders])}
+@app.post("/asn/batch")
+async def asn_batch(req:ASNList): await _chaos(); return {"items": await _wms._asn_chunk([(i['sku'], i['supplier']) for i in req.items])}
+@app.post("/alternate/batch")
+async def alternate_batch(req:SkuList): await _chaos(); return {"items": await _sup._alternate_chunk([(s,) for s in req.skus])}
+@app.post("/po")
+async def po(req:PORequest): await _chaos(); return await _erp.create_po(**req.model_dump())
+@app.get("/asn/{supplier}/{sku}")
+async def asn(supplier:str, sku:str): await _chaos(); return await _wms.get_asn(supplier, sku)
+@app.post("/work-orders")
+async def work_order(req:WORequest): await _chaos(); return await _cmms.create_work_order(req.asset, req.desc)
+@app.get("/alternate/{sku}")
+async def alternate(sku:str): await _chaos(); return await _sup.alternate_supplier(sku)
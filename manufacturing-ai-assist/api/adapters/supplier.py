@@ -1,3 +1,18 @@
 from .base import BaseAdapter
+from .cache import cached_read
 class SupplierNet(BaseAdapter):
-    def alternate_supplier(self, sku:str): return {'sku':sku,'alt_supplier':'Supplier Y','available_qty':500,'eta_days':2}
+    TTLS = {'alternate': 300.0}
+    @cached_read('alternate')
+    async def alternate_supplier(self, sku:str):
+        if self.live: return await self.request("GET", f"/alternate/{sku}")
+        return {'sku':sku,'alt_supplier':'Supplier Y','available_qty':500,'eta_days':2}
+
+    # ---------- bulk ----------
+    async def _alternate_chunk(self, keys:list[tuple])->list:
+        skus = [k[0] for k in keys]
+        if self.live: return (await self.request("POST", "/alternate/batch", json={'skus':skus}))['items']
+        return [{'sku':sku,'alt_supplier':'Supplier Y','available_qty':500,'eta_days':2} for sku in skus]
+    def iter_alternates(self, skus:list[str]):
+        return self.read_many('alternate', [(s,) for s in skus], self._alternate_chunk)
+    async def alternate_supplier_many(self, skus:list[str])->list:
+        return await self.collect(self.iter_alternates(skus), [(s,) for s in skus])
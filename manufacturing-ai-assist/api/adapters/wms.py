@@ -1,3 +1,19 @@
 from .base import BaseAdapter
+from .cache import cached_read
 class WMS(BaseAdapter):
-    def get_asn(self, supplier:str, sku:str): return {'supplier':supplier,'sku':sku,'eta_days':4,'status':'DELAYED'}
+    TTLS = {'asn': 60.0}
+    @cached_read('asn', key=lambda supplier, sku: (sku, supplier))
+    async def get_asn(self, supplier:str, sku:str):
+        if self.live: return await self.request("GET", f"/asn/{supplier}/{sku}")
+        return {'supplier':supplier,'sku':sku,'eta_days':4,'status':'DELAYED'}
+
+    # ---------- bulk ----------
+    async def _asn_chunk(self, keys:list[tuple])->list:
+        items = [{'supplier':supplier,'sku':sku} for sku, supplier in keys]
+        if self.live: return (await self.request("POST", "/asn/batch", json={'items':items}))['items']
+        return [{**it,'eta_days':4,'status':'DELAYED'} for it in items]
+    def iter_asn(self, pairs:list[tuple[str, str]]):
+        """``((sku, supplier), row | AdapterError)`` per (supplier, sku) pair as chunks complete."""
+        return self.read_many('asn', [(sku, supplier) for supplier, sku in pairs], self._asn_chunk)
+    async def get_asn_many(self, pairs:list[tuple[str, str]])->list:
+        return await self.collect(self.iter_asn(pairs), [(sku, supplier) for supplier, sku in pairs])
@@ -1,89 +1,203 @@
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import pandas as pd
+import numpy as np
 from pathlib import Path
-import json
+import asyncio, hashlib, json, os, threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta
+from typing import Callable
 
-from .models import SimState, KPIResponse, ApplyActionRequest, ApplyActionResponse
+from .models import (SimState, KPIResponse, ApplyActionRequest, ApplyActionResponse,
+                     BatchSimRequest, BatchSimResponse, BatchSimRow,
+                     SkuBatchRequest, ASNBatchRequest, POBatchRequest, BatchQuoteRequest, ReplayRequest, ChatIntentRequest)
+from .state_store import StateStore
+from .sales_log import SalesLog
+from . import replay as scenario_replay
+from .adapters.base import AdapterError, CircuitOpenError, UpstreamClientError
+from .adapters.cache import read_cache
 from .adapters.config import settings
 from .adapters.erp import make_erp
 from .adapters.wms import WMS
 from .adapters.cmms import CMMS
 from .adapters.supplier import SupplierNet
+from utils import sqlstore
+from utils.data import KPI_PARTS, fold_kpi_tables, tables
+from utils.kpis import KPIEngine
+from utils.bom import WhereUsed
+from utils.sales_offline import price_lines
+from utils.changeover import current_plan, recent_reduction
+from utils.intent import parse as parse_intent
+from utils.montecarlo import forecast
+from utils.mrp import RISK_DAYS, current_plan as current_mrp
+from utils.rollup import SPECS as ROLLUP_SPECS, current_cube
+from utils.scheduling import current_schedule
+from utils import timeseries
+from utils.search import SOURCES as SEARCH_SOURCES, current_index
 
-app = FastAPI(title="Manufacturing AI Assist API")
+def _warm_up():
+    """Solve the schedule and changeover plans once at start-up, so the first /metrics call doesn't pay for them."""
+    current_schedule(); recent_reduction()
+
+@asynccontextmanager
+async def _lifespan(app:FastAPI):
+    await asyncio.to_thread(_warm_up)
+    yield
+    for make in (erp, wms, cmms, supplier_net):   # pooled adapter clients, only those actually built
+        if make.cache_info().currsize: await make().aclose()
+
+app = FastAPI(title="Manufacturing AI Assist API", lifespan=_lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA = ROOT / "data"
 STATE_FP = DATA / "sim_state.json"
-SALES_LOG_FP = DATA / "sales_log.jsonl"
+SALES_LOG_FP = DATA / "sales_log.jsonl"   # legacy single file, still indexed read-only
+SALES_LOG_DIR = DATA / "sales_log"
 
+# Parsed tables stay in memory, shared with the front-end loaders (see utils.data).
 def load_df(name:str)->pd.DataFrame:
-    df = pd.read_csv(DATA / f"{name}.csv")
-    for c in df.columns:
-        if any(k in c.lower() for k in ["date","start","end","planned"]):
-            df[c] = pd.to_datetime(df[c])
-    return df
+    """Cached, read-only frame for data/<name>.csv (copy before mutating)."""
+    return tables.get(name)
 
-def get_state()->SimState:
-    if not STATE_FP.exists():
-        s = SimState()
-        STATE_FP.write_text(s.model_dump_json())
-        return s
-    return SimState.model_validate_json(STATE_FP.read_text())
+# Locked, atomically replaced sim_state.json; safe with several uvicorn workers.
+state_store = StateStore(STATE_FP)
 
-def save_state(s:SimState): STATE_FP.write_text(s.model_dump_json())
+def get_state()->SimState: return state_store.read()[1]
+
+def save_state(s:SimState)->int: return state_store.replace(s)[0]
 
 @app.get("/health")
 def health(): return {"status":"ok"}
 
+@app.get("/cache/stats")
+def cache_stats(): return {**tables.stats(), "adapters": read_cache.stats()}
+
 @app.post("/reset")
 def reset():
-    s = SimState(); save_state(s)
-    return {"status":"reset", "state": s.model_dump()}
+    s = SimState(); version = save_state(s)
+    return {"status":"reset", "state": s.model_dump(), "version": version}
+
+# Incremental KPI aggregates, folded forward from the table cache (appends) or rebuilt (rewrites).
+_kpi_engine = KPIEngine(); _kpi_seen: dict[str, tuple[int, int]] = {}; _kpi_lock = threading.Lock()
+
+def base_kpis()->dict:
+    with _kpi_lock:
+        return fold_kpi_tables(_kpi_engine, _kpi_seen).kpis()
+
+SIM_FIELDS = list(SimState.model_fields)
+MAX_BATCH = int(os.getenv("MFG_MAX_BATCH", "100000"))
+
+def evaluate_states(cols:dict[str,np.ndarray])->dict[str,np.ndarray]:
+    """Apply SimState effects to the shared base KPIs for many states at once (one array per SimState field)."""
+    base = base_kpis(); inv = load_df("inventory")
+    eta, carrier, extra = cols['eta_offset_days'], cols['carrier_upgrade_days'], cols['extra_qty']
+    out = {"eta_days": np.maximum(0, 3 - (eta + carrier))}
+    out["otd_risk_pct"] = np.clip(9.5 - (eta*2.0 + carrier*1.2), 1.0, 15.0)
+    throughput = np.full(len(eta), float(base['throughput_per_day']))
+    if cols['resequence'].any():   # gain from actually re-sequencing the open work orders (utils.scheduling)
+        throughput = throughput * np.where(cols['resequence'], 1 + current_schedule().summary()['throughput_gain_pct'] / 100, 1.0)
+    throughput = throughput * np.where(cols['batch_changeovers'], 1.02, 1.0)
+    out["throughput_per_day"] = throughput * np.where(cols['qa_fast_track'], 1.01, 1.0)
+    down = float(base['downtime_hours'])
+    if cols['batch_changeovers'].any():   # logged changeover downtime in the KPI window × planned share saved (utils.changeover)
+        saved = sum(r["saved_h"] for r in recent_reduction().values())
+        out["downtime_hours"] = np.where(cols['batch_changeovers'], max(0.0, down - saved), down)
+    else: out["downtime_hours"] = np.full(len(eta), down)
+    # Risk = projected below safety stock within RISK_DAYS (utils.mrp). Only SKU-19 depends on the state: its open POs
+    # are pulled in by eta_offset + carrier upgrade and extra_qty lands from the alternate supplier; recount that row per state.
+    plan = current_mrp(); below = (plan.below_safety_day >= 0) & (plan.below_safety_day < RISK_DAYS)
+    is19 = (inv['sku']=="SKU-19").to_numpy()
+    others = inv[~is19].sort_values('on_hand', kind='stable')
+    lowest_other, lowest_val = others['sku'].iloc[0], others['on_hand'].iloc[0]
+    if is19.any():
+        on19 = inv.loc[is19, 'on_hand'].iloc[0] + extra
+        i19 = plan.ids["SKU-19"]
+        out["inventory_risk_count"] = int(below.sum() - below[i19]) + plan.sim_at_risk("SKU-19", eta + carrier, extra).astype(int)
+        first19 = int(np.flatnonzero(is19)[0]) < inv.index.get_loc(others.index[0])   # ties go to file order
+        out["lowest_stock_sku"] = np.where((on19 < lowest_val) | ((on19 == lowest_val) & first19), "SKU-19", lowest_other)
+    else:
+        out["inventory_risk_count"] = np.full(len(eta), int(below.sum()))
+        out["lowest_stock_sku"] = np.full(len(eta), lowest_other)
+    for k in ('on_time_pct', 'defect_rate_pct', 'throughput_trend', 'top_downtime_cause', 'top_defect_family'):
+        out[k] = base[k]
+    return out
+
+def _kpi_rows(cols:dict[str,np.ndarray])->list[KPIResponse]:
+    r = evaluate_states(cols); n = len(cols['eta_offset_days'])
+    lists = {k: (v.tolist() if isinstance(v, np.ndarray) else [v]*n) for k, v in r.items()}
+    state_lists = {k: cols[k].tolist() for k in SIM_FIELDS}
+    rows = []
+    for i in range(n):
+        rows.append(KPIResponse.model_construct(throughput_per_day=float(lists['throughput_per_day'][i]), on_time_pct=float(lists['on_time_pct'][i]),
+            defect_rate_pct=float(lists['defect_rate_pct'][i]), downtime_hours=float(lists['downtime_hours'][i]),
+            inventory_risk_count=int(lists['inventory_risk_count'][i]), throughput_trend=lists['throughput_trend'][i],
+            top_downtime_cause=lists['top_downtime_cause'][i], top_defect_family=lists['top_defect_family'][i],
+            lowest_stock_sku=lists['lowest_stock_sku'][i], otd_risk_pct=float(round(lists['otd_risk_pct'][i],1)),
+            notes=f"ETA remaining delay ≈ {lists['eta_days'][i]} days; extra_qty={state_lists['extra_qty'][i]}, carrier_upgrade_days={state_lists['carrier_upgrade_days'][i]}, qa_fast_track={state_lists['qa_fast_track'][i]}"))
+    return rows
+
+def _state_cols(states:list[SimState])->dict[str,np.ndarray]:
+    return {k: np.array([getattr(s, k) for s in states]) for k in SIM_FIELDS}
 
 def compute_kpis(state:SimState)->KPIResponse:
-    orders = load_df("orders"); quality = load_df("quality_inspections"); down = load_df("downtime_log"); inv = load_df("inventory")
-    eta_days = max(0, 3 - (state.eta_offset_days + state.carrier_upgrade_days))
-    otd_risk = 9.5 - (state.eta_offset_days*2.0 + state.carrier_upgrade_days*1.2)
-    otd_risk = max(1.0, min(otd_risk, 15.0))
-    recent = orders[orders['order_date'] >= (orders['order_date'].max() - pd.Timedelta(days=6))]
-    throughput = recent['qty_produced'].sum() / max(1,(recent['order_date'].nunique()))
-    if state.resequence: throughput *= 1.03
-    if state.batch_changeovers: throughput *= 1.02
-    if state.qa_fast_track: throughput *= 1.01
-    on_time = (orders['actual_ship_date'] <= orders['promised_ship_date']).mean() * 100
-    total_units = quality['units_inspected'].sum(); defects = quality['defects_found'].sum()
-    defect_pct = (defects/total_units*100) if total_units else 0.0
-    down_recent = down[down['start'] >= (down['start'].max() - pd.Timedelta(days=6))]
-    downtime_hours = down_recent['duration_min'].sum()/60.0
-    if state.batch_changeovers: downtime_hours = max(0.0, downtime_hours - 0.5)
-    inv2 = inv.copy(); idx = inv2['sku']=="SKU-19"
-    if idx.any(): inv2.loc[idx,'on_hand'] += state.extra_qty
-    inventory_risk = int((inv2['on_hand'] < inv2['safety_stock']).sum())
-    last3 = recent[recent['order_date'] >= (orders['order_date'].max() - pd.Timedelta(days=2))]['qty_produced'].mean()
-    prev4 = recent[recent['order_date'] < (orders['order_date'].max() - pd.Timedelta(days=2))]['qty_produced'].mean()
-    trend = 'up' if last3 > prev4 else 'down' if last3 < prev4 else 'flat'
-    top_down = down.groupby('cause')['duration_min'].sum().sort_values(ascending=False).head(1).index.to_list()[0]
-    fam = quality.groupby('defect_family')['defects_found'].sum().sort_values(ascending=False).head(1).index.to_list()[0]
-    lowest = inv2.sort_values('on_hand').head(1)['sku'].iloc[0]
-    return KPIResponse(throughput_per_day=float(throughput), on_time_pct=float(on_time), defect_rate_pct=float(defect_pct),
-        downtime_hours=float(downtime_hours), inventory_risk_count=int(inventory_risk), throughput_trend=trend,
-        top_downtime_cause=top_down, top_defect_family=fam, lowest_stock_sku=lowest, otd_risk_pct=float(round(otd_risk,1)),
-        notes=f"ETA remaining delay ≈ {eta_days} days; extra_qty={state.extra_qty}, carrier_upgrade_days={state.carrier_upgrade_days}, qa_fast_track={state.qa_fast_track}")
+    return _kpi_rows(_state_cols([state]))[0]
+
+# ---------- Conditional GET ----------
+KPI_MEMO_SIZE = 256
+_kpi_memo: OrderedDict[tuple[str, str], tuple[str, bytes]] = OrderedDict(); _memo_lock = threading.Lock()
+
+def data_version()->str:
+    """Content digest over the tables compute_kpis, the scheduler and MRP read (cheap: rides the table cache's stat interval)."""
+    names = (*KPI_PARTS.values(), "inventory", "work_orders", "bom", *(["purchase_orders"] if (DATA / "purchase_orders.csv").exists() else []))
+    return hashlib.blake2b("|".join(tables.entry(n).digest for n in names).encode(), digest_size=8).hexdigest()
+
+def _etag(*parts:str)->str: return '"' + hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest() + '"'
+
+def _conditional(request:Request, etag:str, body:Callable[[], bytes])->Response:
+    inm = request.headers.get("if-none-match", "")
+    if inm.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in inm.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body(), media_type="application/json", headers={"ETag": etag})
+
+def metrics_payload(s:SimState)->tuple[str, bytes]:
+    """(ETag, JSON body) for a state, memoized on (state content hash, data version)."""
+    key = (s.model_dump_json(), data_version())
+    with _memo_lock:
+        hit = _kpi_memo.get(key)
+        if hit is not None: _kpi_memo.move_to_end(key); return hit
+    hit = (_etag(*key), compute_kpis(s).model_dump_json().encode())
+    with _memo_lock:
+        _kpi_memo[key] = hit
+        while len(_kpi_memo) > KPI_MEMO_SIZE: _kpi_memo.popitem(last=False)
+    return hit
 
 @app.get("/metrics", response_model=KPIResponse)
-def metrics(): return compute_kpis(get_state())
+def metrics(request:Request):
+    etag, body = metrics_payload(get_state())
+    return _conditional(request, etag, lambda: body)
 
 @app.get("/state")
-def state(): return get_state().model_dump()
+def state(request:Request):
+    version, s = state_store.read(); raw = s.model_dump_json()
+    resp = _conditional(request, _etag(raw), raw.encode)
+    resp.headers["X-State-Version"] = str(version)
+    return resp
 
-@app.post("/simulate/action", response_model=ApplyActionResponse)
-def simulate_action(req:ApplyActionRequest):
-    s = get_state(); label = (req.action or '').lower()
+@app.get("/dashboard")
+def dashboard(request:Request):
+    """State, its version and its KPIs in one conditional round trip for the front end."""
+    version, s = state_store.read()
+    etag, body = metrics_payload(s)
+    etag = _etag(etag, str(version))
+    return _conditional(request, etag, lambda: b'{"version":%d,"state":%s,"metrics":%s}' % (version, s.model_dump_json().encode(), body))
+
+def apply_action(s:SimState, action:str)->SimState:
+    label = (action or '').lower()
     if not label: raise HTTPException(400, "Missing action")
     if "expedited po" in label or "eta_minus_days" in label: s.eta_offset_days += 2
     elif "alternate supplier" in label or "add_qty" in label: s.extra_qty += 500
@@ -91,40 +205,333 @@ def simulate_action(req:ApplyActionRequest):
     elif "qa fast" in label or "enable_alt_material" in label: s.qa_fast_track = True
     elif "re-sequence" in label or "resequence" in label: s.resequence = True
     elif "batch change" in label: s.batch_changeovers = True
-    else: raise HTTPException(400, f"Unknown action: {req.action}")
-    save_state(s); return ApplyActionResponse(state=s, message=f"Applied: {req.action}")
+    else: raise HTTPException(400, f"Unknown action: {action}")
+    return s
+
+@app.post("/simulate/action", response_model=ApplyActionResponse)
+def simulate_action(req:ApplyActionRequest):
+    version, s = state_store.update(lambda s: apply_action(s, req.action))
+    return ApplyActionResponse(state=s, message=f"Applied: {req.action}", version=version)
+
+@app.post("/simulate/batch", response_model=BatchSimResponse)
+def simulate_batch(req:BatchSimRequest):
+    cols = _state_cols(req.states) if req.states else {k: np.array([], dtype=int) for k in SIM_FIELDS}
+    if req.grid is not None:
+        axes = [np.asarray(getattr(req.grid, k)) for k in SIM_FIELDS]
+        if int(np.prod([len(a) for a in axes])) + len(req.states) > MAX_BATCH:
+            raise HTTPException(400, f"Batch larger than {MAX_BATCH} states")
+        mesh = np.meshgrid(*axes, indexing="ij")
+        cols = {k: np.concatenate([cols[k], m.ravel()]).astype(m.dtype) for k, m in zip(SIM_FIELDS, mesh)}
+    n = len(cols['eta_offset_days'])
+    if not n: raise HTTPException(400, "Provide states or grid")
+    if n > MAX_BATCH: raise HTTPException(400, f"Batch larger than {MAX_BATCH} states")
+    kpis = _kpi_rows(cols); states = [dict(zip(SIM_FIELDS, v)) for v in zip(*(cols[k].tolist() for k in SIM_FIELDS))]
+    return BatchSimResponse.model_construct(count=n, rows=[BatchSimRow.model_construct(state=SimState.model_construct(**st), kpis=k) for st, k in zip(states, kpis)])
+
+# ---------- Chat ----------
+@app.post("/chat/intent")
+def chat_intent(req:ChatIntentRequest):
+    """Intent and slots for a chat prompt (the same router the Chat Assistant page dispatches on)."""
+    return parse_intent(req.prompt).to_dict()
+
+# ---------- Scenario replay ----------
+# Isolated SimStates only: replays never read or write sim_state.json.
+MAX_VARIANTS = int(os.getenv("MFG_MAX_VARIANTS", "100000"))
+REPLAY_WORKERS = int(os.getenv("MFG_REPLAY_WORKERS", "1"))
+
+@app.post("/scenario/replay")
+def replay_scenario(req:ReplayRequest):
+    if not 0 <= req.variants <= MAX_VARIANTS: raise HTTPException(422, f"variants must be within 0..{MAX_VARIANTS}")
+    sc = req.scenario or scenario_replay.load_scenario()
+    try:
+        out = {"replay": scenario_replay.replay(sc, req.start.model_dump() if req.start else None)}
+        if req.variants:
+            out["variants"] = scenario_replay.run_variants(sc, req.variants, req.seed, req.drop_p, req.shuffle, req.jitter, REPLAY_WORKERS, req.top)
+    except ValueError as e: raise HTTPException(400, str(e))
+    return out
+
+# ---------- Forecast ----------
+# Monte Carlo P10/P50/P90 fitted from history (utils.montecarlo); /metrics keeps its point formulas for the dashboard.
+MAX_TRIALS = int(os.getenv("MFG_MAX_TRIALS", "1000000"))
+MAX_TRIAL_DAYS = int(float(os.getenv("MFG_MAX_TRIAL_DAYS", "5e6")))   # trials × horizon_days: bounds CPU per request
+_forecast_memo: OrderedDict[tuple, dict] = OrderedDict()
+
+def _forecast(s:SimState, trials:int, horizon_days:int, seed:int)->dict:
+    if not 1 <= trials <= MAX_TRIALS: raise HTTPException(422, f"trials must be within 1..{MAX_TRIALS}")
+    if not 1 <= horizon_days <= 90: raise HTTPException(422, "horizon_days must be within 1..90")
+    if trials * horizon_days > MAX_TRIAL_DAYS: raise HTTPException(422, f"trials × horizon_days must be at most {MAX_TRIAL_DAYS:,}")
+    key = (s.model_dump_json(), data_version(), trials, horizon_days, seed)
+    with _memo_lock:
+        hit = _forecast_memo.get(key)
+        if hit is not None: _forecast_memo.move_to_end(key); return hit
+    out = {"state": s.model_dump(), **forecast(s, trials, horizon_days, seed), "otd_risk_pct_formula": compute_kpis(s).otd_risk_pct}
+    with _memo_lock:
+        _forecast_memo[key] = out
+        while len(_forecast_memo) > KPI_MEMO_SIZE: _forecast_memo.popitem(last=False)
+    return out
 
-# Convenience endpoints
-def erp(): return make_erp(settings.ERP_KIND, url=settings.ERP_URL, api_key=settings.ERP_API_KEY)
-def wms(): return WMS(url=settings.WMS_URL, api_key=settings.WMS_API_KEY)
-def cmms(): return CMMS(url=settings.CMMS_URL, api_key=settings.CMMS_API_KEY)
-def supplier_net(): return SupplierNet(url=settings.SUPPLIER_URL, api_key=settings.SUPPLIER_API_KEY)
+@app.get("/forecast")
+def forecast_current(trials:int=100_000, horizon_days:int=7, seed:int=0):
+    """Distributions for the current sim state."""
+    return _forecast(get_state(), trials, horizon_days, seed)
+
+@app.post("/forecast")
+def forecast_state(s:SimState, trials:int=100_000, horizon_days:int=7, seed:int=0):
+    """Distributions for an arbitrary (what-if) state."""
+    return _forecast(s, trials, horizon_days, seed)
+
+# Filtered table reads: pushed down to data/plant.db (utils.sqlstore) when built, else pandas on the cache.
+_FILTERABLE = {"orders": ("order_date", ("sku","line")), "downtime_log": ("start", ("line","asset","cause")),
+               "quality_inspections": ("date", ("sku","line","defect_family")), "work_orders": ("planned_start", ("sku","line","status"))}
+
+def query_table(table:str, start:str|None=None, end:str|None=None, limit:int=500, **eq)->list[dict]:
+    date_col, keys = _FILTERABLE[table]; eq = {k: v for k, v in eq.items() if k in keys and v is not None}
+    store = sqlstore.open_store(DATA)
+    if store is not None:
+        df = store.select(table, filters=eq, date_col=date_col, start=start, end=end, order_by=date_col, limit=limit)
+    else:
+        df = load_df(table); mask = pd.Series(True, index=df.index)
+        for k, v in eq.items(): mask &= df[k] == v
+        if start: mask &= df[date_col] >= pd.Timestamp(start)
+        if end: mask &= df[date_col] <= pd.Timestamp(end)
+        df = df[mask].sort_values(date_col, kind="stable").head(limit)
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+@app.get("/orders")
+def list_orders(sku:str|None=None, line:str|None=None, start:str|None=None, end:str|None=None, limit:int=500):
+    return query_table("orders", start, end, limit, sku=sku, line=line)
+@app.get("/downtime")
+def list_downtime(line:str|None=None, asset:str|None=None, cause:str|None=None, start:str|None=None, end:str|None=None, limit:int=500):
+    return query_table("downtime_log", start, end, limit, line=line, asset=asset, cause=cause)
+@app.get("/quality")
+def list_quality(sku:str|None=None, line:str|None=None, defect_family:str|None=None, start:str|None=None, end:str|None=None, limit:int=500):
+    return query_table("quality_inspections", start, end, limit, sku=sku, line=line, defect_family=defect_family)
+@app.get("/work_orders")
+def list_work_orders(sku:str|None=None, line:str|None=None, status:str|None=None, start:str|None=None, end:str|None=None, limit:int=500):
+    return query_table("work_orders", start, end, limit, sku=sku, line=line, status=status)
+
+# ---------- Rollups ----------
+# Pre-aggregated downtime (line × asset × cause × day) and quality (line × sku × defect_family × day) cubes.
+def _cube(cube:str):
+    if cube not in ROLLUP_SPECS: raise HTTPException(404, f"Unknown cube: {cube}")
+    return current_cube(cube)
+
+def _cube_filters(**kw)->dict:
+    return {k: v.split(",") for k, v in kw.items() if v is not None}
+
+@app.get("/rollup/{cube}")
+def rollup(cube:str, by:str="day", measures:str|None=None, start:str|None=None, end:str|None=None, line:str|None=None,
+           asset:str|None=None, cause:str|None=None, sku:str|None=None, defect_family:str|None=None, limit:int=1000):
+    """Cube totals grouped by ``by`` (comma-separated dimensions and/or ``day``); filters take comma-separated values."""
+    c = _cube(cube)
+    try:
+        df = c.group(tuple(b for b in by.split(",") if b), measures.split(",") if measures else None, start, end,
+                     **_cube_filters(line=line, asset=asset, cause=cause, sku=sku, defect_family=defect_family))
+    except ValueError as e: raise HTTPException(400, str(e))
+    if "day" in df: df = df.sort_values("day")
+    return {"cube": cube, "by": by, "groups": len(df), "rows": json.loads(df.head(limit).to_json(orient="records", date_format="iso"))}
+
+@app.get("/rollup/{cube}/pareto")
+def rollup_pareto(cube:str, dim:str, measure:str|None=None, start:str|None=None, end:str|None=None, line:str|None=None,
+                  asset:str|None=None, cause:str|None=None, sku:str|None=None, defect_family:str|None=None, limit:int=50):
+    """``dim`` ranked by ``measure`` (default: minutes / defects) with share and cumulative share."""
+    c = _cube(cube); measure = measure or list(c.spec.measures)[-1]
+    try:
+        df = c.pareto(dim, measure, limit, start=start, end=end, **_cube_filters(line=line, asset=asset, cause=cause, sku=sku, defect_family=defect_family))
+    except ValueError as e: raise HTTPException(400, str(e))
+    return {"cube": cube, "dim": dim, "measure": measure, "rows": json.loads(df.to_json(orient="records"))}
+
+# ---------- Time series ----------
+@app.get("/timeseries/{metric}")
+def get_timeseries(metric:str, request:Request, line:str|None=None, sku:str|None=None, start:str|None=None, end:str|None=None,
+                   days:int|None=None, points:int=500, mode:str="lttb"):
+    """Daily ``metric`` (throughput, on_time, defect_rate, downtime) downsampled to ≤ ``points`` points (LTTB or minmax)."""
+    if metric not in timeseries.METRICS: raise HTTPException(404, f"Unknown metric: {metric}")
+    try: out = timeseries.query(metric, line, sku, start, end, days, points, mode)
+    except ValueError as e: raise HTTPException(422, str(e))
+    etag = _etag(metric, str(line), str(sku), str(out["start"]), str(out["end"]), str(points), mode, str(out["version"]))
+    return _conditional(request, etag, lambda: json.dumps(out).encode())
+
+# ---------- Where-used ----------
+# Reverse BOM index joined to orders/work orders; synced from the table cache (BOM row diffs, re-grouped order tables).
+where_used_index = WhereUsed(); _wu_seen: dict[str, int] = {}; _wu_lock = threading.Lock()
+
+def _sync_where_used()->WhereUsed:
+    with _wu_lock:
+        for name in ("bom", "orders", "work_orders"):
+            e = tables.entry(name)
+            if _wu_seen.get(name) == e.gen: continue
+            if name == "bom": where_used_index.sync_bom(e.df)
+            else: where_used_index.set_table(name, e.df)
+            _wu_seen[name] = e.gen
+        return where_used_index
+
+@app.get("/where-used/{part}")
+def where_used(part:str, open_only:bool=False, limit:int=500):
+    """Assemblies containing ``part`` at any depth, and the orders / work orders (with lines and promise dates) built from them."""
+    wu = _sync_where_used()
+    with _wu_lock:
+        if not wu.known(part): raise HTTPException(404, f"Unknown part: {part}")
+        levels = wu.assemblies(part); skus = [part, *levels]
+        orders, wos = wu.rows("orders", skus), wu.rows("work_orders", skus)
+    if open_only:
+        orders = orders[orders["actual_ship_date"].isna()]; wos = wos[wos["status"] != "Completed"]
+    rec = lambda df: json.loads(df.head(limit).to_json(orient="records", date_format="iso"))
+    return {"part": part,
+            "assemblies": [{"assembly": a, "level": d} for a, d in sorted(levels.items(), key=lambda x: (x[1], x[0]))],
+            "lines": sorted(set(orders["line"]) | set(wos["line"])),
+            "earliest_promise": orders["promised_ship_date"].min().isoformat() if len(orders) else None,
+            "order_count": len(orders), "work_order_count": len(wos),
+            "orders": rec(orders), "work_orders": rec(wos)}
+
+# ---------- MRP ----------
+@app.get("/mrp")
+def mrp_risks(days:int=RISK_DAYS, limit:int=500):
+    """SKUs projected below safety stock within ``days``: first below-safety date, first stock-out date and shortage qty."""
+    plan = current_mrp()
+    rows = plan.risks(days, limit)
+    return {"as_of": plan.start.date().isoformat(), "horizon_days": plan.days, "days": days,
+            "count": plan.risk_count(days), "items": json.loads(rows.to_json(orient="records"))}
+
+@app.get("/mrp/{sku}")
+def mrp_sku(sku:str):
+    """Day-by-day demand, supply and projected on-hand for one SKU."""
+    plan = current_mrp()
+    if sku not in plan.ids: raise HTTPException(404, f"Unknown SKU: {sku}")
+    i = plan.ids[sku]
+    return {"sku": sku, "as_of": plan.start.date().isoformat(), "on_hand": float(plan.on_hand[i]), "safety_stock": float(plan.safety[i]),
+            "shortage_qty": float(np.ceil(plan.shortage[i])) + 0.0, "series": json.loads(plan.series(sku).to_json(orient="records"))}
+
+# ---------- Search ----------
+@app.get("/search")
+def search(q:str="", kind:str|None=None, line:str|None=None, status:str|None=None, start:str|None=None, end:str|None=None,
+           page:int=1, per_page:int=20):
+    """Ranked prefix/fuzzy search over every plant table; ``kind`` may be comma-separated. Facet counts cover all matches."""
+    kinds = kind.split(",") if kind else None
+    if kinds and set(kinds) - set(SEARCH_SOURCES): raise HTTPException(400, f"Unknown kind: {', '.join(sorted(set(kinds) - set(SEARCH_SOURCES)))}")
+    try:
+        return current_index().search(q, kind=kinds, line=line, status=status, start=start, end=end,
+                                      page=max(1, page), per_page=min(max(1, per_page), 200))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+# ---------- Schedule ----------
+@app.get("/schedule")
+def get_schedule(line:str|None=None, limit:int=500):
+    """Re-sequenced open work orders (memoized on the work_orders/orders tables) with before/after metrics."""
+    sched = current_schedule()
+    if line and line not in sched.lines: raise HTTPException(404, f"No open work orders on line: {line}")
+    plan = sched.plan[sched.plan["line"] == line] if line else sched.plan
+    return {"line": line, "summary": sched.summary(line),
+            "stations": {k: r.stations for k, r in sched.lines.items() if not line or k == line},
+            "plan": json.loads(plan.head(limit).to_json(orient="records", date_format="iso"))}
+
+@app.get("/changeover/{line}")
+def get_changeover(line:str):
+    """Open work orders of ``line`` batched per SKU and sequenced on the learned changeover matrix."""
+    try: plan = current_plan(line)
+    except KeyError: raise HTTPException(404, f"Unknown line: {line}")
+    if plan.lots.empty: raise HTTPException(404, f"No open work orders on line: {line}")
+    return {**plan.summary(), "downtime": recent_reduction().get(line),
+            "lots": json.loads(plan.lots.to_json(orient="records"))}
+
+# Convenience endpoints — adapters are built once per process and share pooled async connections.
+def _adapter_opts(timeout:float)->dict:
+    return dict(timeout=timeout, retries=settings.ADAPTER_RETRIES, max_connections=settings.ADAPTER_MAX_CONNECTIONS,
+                breaker_threshold=settings.ADAPTER_BREAKER_THRESHOLD, breaker_reset_s=settings.ADAPTER_BREAKER_RESET_S,
+                ttls={'inventory': settings.INVENTORY_TTL_S, 'asn': settings.ASN_TTL_S, 'alternate': settings.ALTERNATE_TTL_S},
+                stale_s=settings.ADAPTER_STALE_S, batch_size=settings.ADAPTER_BATCH_SIZE)
+@lru_cache(maxsize=None)
+def erp(): return make_erp(settings.ERP_KIND, url=settings.ERP_URL, api_key=settings.ERP_API_KEY, **_adapter_opts(settings.ERP_TIMEOUT_S))
+@lru_cache(maxsize=None)
+def wms(): return WMS(url=settings.WMS_URL, api_key=settings.WMS_API_KEY, **_adapter_opts(settings.WMS_TIMEOUT_S))
+@lru_cache(maxsize=None)
+def cmms(): return CMMS(url=settings.CMMS_URL, api_key=settings.CMMS_API_KEY, **_adapter_opts(settings.CMMS_TIMEOUT_S))
+@lru_cache(maxsize=None)
+def supplier_net(): return SupplierNet(url=settings.SUPPLIER_URL, api_key=settings.SUPPLIER_API_KEY, **_adapter_opts(settings.SUPPLIER_TIMEOUT_S))
+
+@app.exception_handler(AdapterError)
+async def _adapter_error(request:Request, exc:AdapterError):
+    status = exc.status_code if isinstance(exc, UpstreamClientError) else 503 if isinstance(exc, CircuitOpenError) else 502
+    return JSONResponse(status_code=status, content={"detail": str(exc)})
+
+# ---------- Bulk adapter endpoints ----------
+# Lists go upstream in ADAPTER_BATCH_SIZE chunks, in parallel; results stream back as NDJSON, one line per item,
+# in completion order. Failed chunks yield {"error": ...} lines for their items instead of failing the stream.
+def _ndjson(pairs, row)->StreamingResponse:
+    async def gen():
+        async for key, r in pairs:
+            yield (json.dumps({**row(key), "error": str(r)} if isinstance(r, Exception) else r, default=str) + "\n").encode()
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+@app.post("/inventory/batch")
+async def inventory_batch(req:SkuBatchRequest):
+    skus = req.skus or load_df("inventory")['sku'].astype(str).tolist()
+    return _ndjson(erp().iter_inventory(skus), lambda k: {"sku": k[0]})
+@app.post("/asn/batch")
+async def asn_batch(req:ASNBatchRequest):
+    return _ndjson(wms().iter_asn([(i.supplier, i.sku) for i in req.items]), lambda k: {"sku": k[0], "supplier": k[1]})
+@app.post("/supplier/alternate/batch")
+async def alternate_batch(req:SkuBatchRequest):
+    skus = req.skus or load_df("inventory")['sku'].astype(str).tolist()
+    return _ndjson(supplier_net().iter_alternates(skus), lambda k: {"sku": k[0]})
+@app.post("/po/batch")
+async def create_po_batch(req:POBatchRequest):
+    return _ndjson(erp().iter_create_po([o.model_dump() for o in req.orders]), lambda o: o)
 
 @app.get("/inventory/{sku}")
-def inventory(sku:str): return erp().get_inventory(sku)
+async def inventory(sku:str): return await erp().get_inventory(sku)
 @app.post("/po/{sku}")
-def create_po(sku:str, qty:int=500, supplier:str="Supplier Z", expedite:bool=True): return erp().create_po(sku=sku, qty=qty, supplier=supplier, expedite=expedite)
+async def create_po(sku:str, qty:int=500, supplier:str="Supplier Z", expedite:bool=True): return await erp().create_po(sku=sku, qty=qty, supplier=supplier, expedite=expedite)
 @app.get("/asn/{supplier}/{sku}")
-def get_asn(supplier:str, sku:str): return wms().get_asn(supplier, sku)
+async def get_asn(supplier:str, sku:str): return await wms().get_asn(supplier, sku)
 @app.post("/cmms/wo")
-def create_work_order(asset:str="Line-L2", desc:str="Batch changeover optimization"): return cmms().create_work_order(asset, desc)
+async def create_work_order(asset:str="Line-L2", desc:str="Batch changeover optimization"): return await cmms().create_work_order(asset, desc)
 @app.get("/supplier/alternate/{sku}")
-def get_alternate_supplier(sku:str): return supplier_net().alternate_supplier(sku)
+async def get_alternate_supplier(sku:str): return await supplier_net().alternate_supplier(sku)
 
 # Sales flow
-def _append_sales_log(obj:dict):
-    with open(SALES_LOG_FP, "a") as f:
-        f.write(json.dumps(obj) + "\n")
+sales_log = SalesLog(SALES_LOG_DIR, legacy=SALES_LOG_FP)
+
+def _append_sales_log(obj:dict): return sales_log.append(obj)
 
 @app.post("/sales/quote")
-def sales_generate_quote(sku:str="HX-220", qty:int=25, ship_date:str=None, unit_price:float=762.0):
+def sales_generate_quote(sku:str="HX-220", qty:int=25, ship_date:str=None, unit_price:float=762.0, prospect:str|None=None):
     sdate = pd.to_datetime(ship_date) if ship_date else pd.Timestamp.today()+pd.Timedelta(days=5)
     kpi = compute_kpis(get_state())
     risk = kpi.inventory_risk_count > 0 and (sdate - pd.Timestamp.today()).days <= 3
-    record = {"ts": datetime.utcnow().isoformat(), "type":"quote", "sku":sku, "qty":qty, "ship_date":str(sdate.date()), "unit_price":unit_price, "risk": bool(risk)}
+    quote_id = sales_log.ids.next("Q")
+    record = {"ts": datetime.utcnow().isoformat(), "type":"quote", "quote_id": quote_id, "sku":sku, "qty":qty, "prospect": prospect,
+              "ship_date":str(sdate.date()), "unit_price":unit_price, "risk": bool(risk)}
     _append_sales_log(record)
     msg = "Quote generated." + (" Potential stock risk flagged to Supply Chain." if risk else "")
-    return {"status":"ok", "message": msg, "quote_id":"Q-"+str(int(datetime.utcnow().timestamp())), "record": record}
+    return {"status":"ok", "message": msg, "quote_id": quote_id, "record": record}
+
+@app.post("/sales/quote/batch")
+def sales_quote_batch(req:BatchQuoteRequest, prospect:str|None=None):
+    """Price an RFQ (many assembly/qty/margin lines) in one pass over the BOM rollups; logged as one event."""
+    if len(req.lines) > MAX_BATCH: raise HTTPException(413, f"At most {MAX_BATCH} lines per request")
+    b = price_lines([l.assembly for l in req.lines], [l.qty for l in req.lines], [l.margin_pct for l in req.lines], breaks=req.breaks)
+    quote_id, lines = sales_log.ids.next("Q"), b.records()
+    _append_sales_log({"ts": datetime.utcnow().isoformat(), "type":"quote_batch", "quote_id": quote_id, "prospect": prospect,
+                       "total": b.total, "items": [[l["assembly"], l["qty"], l["margin_pct"], l["price"]] for l in lines]})
+    out = {"status":"ok", "quote_id": quote_id, "count": len(lines), "total": b.total, "lines": lines}
+    if req.markdown: out["markdown"] = b.markdown
+    return out
+
+@app.get("/sales/quotes/{quote_id}")
+def sales_get_quote(quote_id:str):
+    rec = sales_log.get(quote_id)
+    if rec is None: raise HTTPException(404, f"Unknown quote: {quote_id}")
+    return rec
+
+@app.get("/sales/quotes")
+def sales_list_quotes(sku:str|None=None, prospect:str|None=None, day:str|None=None, limit:int=100):
+    return sales_log.query(limit=limit, type="quote", sku=sku, prospect=prospect, day=day)
+
+@app.get("/sales/events")
+def sales_list_events(type:str|None=None, sku:str|None=None, prospect:str|None=None, day:str|None=None, limit:int=100):
+    return sales_log.query(limit=limit, type=type, sku=sku, prospect=prospect, day=day)
 
 @app.post("/sales/email")
 def sales_email(to:str="purchasing@acme.com", subject:str="Quote from Saxon.AI", body:str="Thank you.", attach_quote_id:str|None=None):
@@ -26,3 +26,53 @@ class ApplyActionRequest(BaseModel):
 class ApplyActionResponse(BaseModel):
     state: SimState
     message: str
+    version: Optional[int] = None
+class SimGrid(BaseModel):
+    eta_offset_days: list[int] = [0]
+    extra_qty: list[int] = [0]
+    carrier_upgrade_days: list[int] = [0]
+    qa_fast_track: list[bool] = [False]
+    resequence: list[bool] = [False]
+    batch_changeovers: list[bool] = [False]
+class BatchSimRequest(BaseModel):
+    states: list[SimState] = []
+    grid: Optional[SimGrid] = None
+class BatchSimRow(BaseModel):
+    state: SimState
+    kpis: KPIResponse
+class BatchSimResponse(BaseModel):
+    count: int
+    rows: list[BatchSimRow]
+class SkuBatchRequest(BaseModel):
+    skus: list[str] = []   # empty = every SKU in inventory.csv
+class ASNKey(BaseModel):
+    supplier: str
+    sku: str
+class ASNBatchRequest(BaseModel):
+    items: list[ASNKey]
+class POLine(BaseModel):
+    sku: str
+    qty: int = 500
+    supplier: str = "Supplier Z"
+    expedite: bool = True
+class POBatchRequest(BaseModel):
+    orders: list[POLine]
+class QuoteLine(BaseModel):
+    assembly: str
+    qty: int
+    margin_pct: float = 22.0
+class BatchQuoteRequest(BaseModel):
+    lines: list[QuoteLine] = []
+    breaks: bool = True        # apply qty-break margins
+    markdown: bool = False     # also return a rendered table
+class ChatIntentRequest(BaseModel):
+    prompt: str
+class ReplayRequest(BaseModel):
+    scenario: Optional[dict] = None   # default: data/scenario.json
+    start: Optional[SimState] = None  # state before the first event (default: fresh)
+    variants: int = 0                 # randomized variants to run after the scripted replay
+    seed: int = 0
+    drop_p: float = 0.25
+    shuffle: bool = True
+    jitter: float = 0.5
+    top: int = 10
@@ -0,0 +1,155 @@
+"""Headless scenario replay.
+
+Replays a storyline such as ``data/scenario.json`` against an isolated
+SimState; the shared ``sim_state.json`` is never touched. The KPI trajectory
+is recorded after every event. ``run_variants`` generates randomized variants
+of a scenario. Each event can be dropped, mitigations can be reordered, and
+quantities and days can be jittered. Every state of every variant is scored in
+one ``evaluate_states`` call over the distinct states, and large runs can be
+split over a process pool. Variants are then grouped by the set of mitigations
+that ran, to compare strategies. An event may carry
+``"expect": {"otd_risk_pct": {"max": 8}}``; ``replay`` reports each miss so a
+playbook can be regression-tested. The CLI exits 1 when an expectation fails:
+
+    python -m api.replay [scenario.json] [--variants 5000 --workers 4 --seed 0]
+"""
+from __future__ import annotations
+import argparse, json, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+
+from .models import SimState
+
+SCENARIO_FP = Path(__file__).resolve().parents[1] / "data" / "scenario.json"
+FIELDS = list(SimState.model_fields)
+METRICS = ("throughput_per_day", "otd_risk_pct", "downtime_hours", "inventory_risk_count", "eta_days")
+
+# Scenario action → SimState change (same effects as the /simulate/action labels); actions not listed only log.
+def _expedite(s, p): s["eta_offset_days"] += int(p.get("days_pull", 2))
+def _alternate(s, p): s["extra_qty"] += int(p.get("qty", 500))
+def _carrier(s, p): s["carrier_upgrade_days"] += int(p.get("days", 1))
+ACTIONS = {
+    "sc_expedite_po": _expedite,
+    "sc_alternate_supplier": _alternate,
+    "sc_upgrade_carrier": _carrier,
+    "plant_qa_fast_track": lambda s, p: s.update(qa_fast_track=True),
+    "plant_resequence": lambda s, p: s.update(resequence=True),
+    "plant_batch_changeovers": lambda s, p: s.update(batch_changeovers=True),
+}
+NO_EFFECT = {"sales_quote", "sales_follow_up", "note"}
+
+def load_scenario(fp: str | Path = SCENARIO_FP) -> dict:
+    return json.loads(Path(fp).read_text(encoding="utf-8"))
+
+def _states(events: list[dict], start: dict | None = None) -> list[tuple]:
+    """SimState rows before the first event and after each one."""
+    s = dict(SimState().model_dump() if start is None else start); rows = [tuple(s[k] for k in FIELDS)]
+    for ev in events:
+        act = ev.get("action", "")
+        if act in ACTIONS: ACTIONS[act](s, ev.get("params") or {})
+        elif act not in NO_EFFECT: raise ValueError(f"Unknown scenario action: {act}")
+        rows.append(tuple(s[k] for k in FIELDS))
+    return rows
+
+def evaluate(rows: list[tuple]) -> dict[str, np.ndarray]:
+    """KPIs for many SimState rows, each distinct state evaluated once."""
+    from .app import evaluate_states
+    uniq, inv = np.unique(np.array(rows, dtype=np.int64), axis=0, return_inverse=True)
+    cols = {k: uniq[:, i].astype(bool if SimState.model_fields[k].annotation is bool else np.int64) for i, k in enumerate(FIELDS)}
+    out = evaluate_states(cols); n = len(uniq)
+    return {k: np.broadcast_to(np.asarray(out[k], dtype=float), (n,))[inv.ravel()] for k in METRICS}
+
+def _check(expect: dict, kpis: dict) -> list[str]:
+    miss = []
+    for metric, bound in (expect or {}).items():
+        v = kpis.get(metric)
+        if v is None: miss.append(f"{metric}: unknown metric"); continue
+        if "max" in bound and v > bound["max"]: miss.append(f"{metric}={v:g} > max {bound['max']:g}")
+        if "min" in bound and v < bound["min"]: miss.append(f"{metric}={v:g} < min {bound['min']:g}")
+    return miss
+
+def replay(scenario: dict, start: dict | None = None) -> dict:
+    """Run the scripted events once; per step: event, state after it, KPIs after it and failed expectations."""
+    events = scenario.get("events", []); rows = _states(events, start); k = evaluate(rows)
+    steps = []
+    for i, row in enumerate(rows):
+        ev = events[i - 1] if i else {"t": "start", "action": None}
+        kpis = {m: round(float(k[m][i]), 2) for m in METRICS}
+        step = {"t": ev.get("t"), "dept": ev.get("dept"), "action": ev.get("action"), "state": dict(zip(FIELDS, row)),
+                "kpis": kpis, "failed": _check(ev.get("expect"), kpis)}
+        if ev.get("action") == "sales_quote":
+            from utils.sales_offline import price_lines
+            p = ev.get("params") or {}
+            step["quote_total"] = price_lines([p.get("assembly", "ASSY-100")], [p.get("qty", 1)]).total
+        steps.append(step)
+    return {"id": scenario.get("id"), "steps": steps, "passed": not any(s["failed"] for s in steps)}
+
+# ---------- randomized variants ----------
+def randomize(scenario: dict, n: int, seed: int = 0, drop_p: float = 0.25, shuffle: bool = True, jitter: float = 0.5) -> list[list[dict]]:
+    """``n`` event lists: each event kept with 1 − ``drop_p``; state-changing events reordered; numeric params × U(1 ± jitter)."""
+    rng = np.random.default_rng(seed); events = scenario.get("events", [])
+    keep = rng.random((n, len(events))) >= drop_p
+    scale = rng.uniform(1 - jitter, 1 + jitter, (n, len(events)))
+    out = []
+    for v in range(n):
+        evs = []
+        for j, ev in enumerate(events):
+            if not keep[v, j]: continue
+            p = {k: (max(1, int(round(x * scale[v, j]))) if isinstance(x, int) and not isinstance(x, bool) else x)
+                 for k, x in (ev.get("params") or {}).items()}
+            evs.append({**ev, "params": p})
+        if shuffle and len(evs) > 1: evs = [evs[i] for i in rng.permutation(len(evs))]
+        out.append(evs)
+    return out
+
+def _chunk(event_lists: list[list[dict]]) -> dict[str, np.ndarray]:
+    """Final-state KPIs (and step counts) for a block of variants; runs in a pool worker for large runs."""
+    rows, last = [], []
+    for evs in event_lists:
+        r = _states(evs); rows.extend(r); last.append(len(rows) - 1)
+    k = evaluate(rows); last = np.asarray(last, dtype=np.int64)
+    return {m: k[m][last] for m in METRICS}
+
+def run_variants(scenario: dict, n: int = 1000, seed: int = 0, drop_p: float = 0.25, shuffle: bool = True,
+                 jitter: float = 0.5, workers: int = 1, top: int = 10) -> dict:
+    """Final-KPI percentiles over ``n`` randomized variants and the mitigation sets ranked by mean final OTD risk."""
+    t0 = time.perf_counter()
+    variants = randomize(scenario, n, seed, drop_p, shuffle, jitter)
+    if workers > 1 and n >= 2_000:
+        size = -(-n // workers)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_chunk, [variants[i:i + size] for i in range(0, n, size)]))
+        final = {m: np.concatenate([p[m] for p in parts]) for m in METRICS}
+    else:
+        final = _chunk(variants)
+    keys = np.array([" + ".join(sorted({e["action"] for e in evs if e["action"] in ACTIONS})) or "(none)" for evs in variants])
+    groups, inv, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    mean = {m: np.bincount(inv, final[m], len(groups)) / counts for m in METRICS}
+    order = np.lexsort((-mean["throughput_per_day"], mean["otd_risk_pct"]))[:top]
+    pct = lambda a: {f"p{q}": round(float(v), 2) for q, v in zip((10, 50, 90), np.percentile(a, (10, 50, 90)))}
+    return {"variants": n, "seed": seed, "final": {m: pct(final[m]) for m in METRICS},
+            "strategies": [{"actions": str(groups[g]), "variants": int(counts[g]), **{m: round(float(mean[m][g]), 2) for m in METRICS}} for g in order],
+            "runtime_s": round(time.perf_counter() - t0, 3)}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Headless scenario replay")
+    ap.add_argument("scenario", nargs="?", default=str(SCENARIO_FP))
+    ap.add_argument("--variants", type=int, default=0, help="randomized variants to run after the scripted replay")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--drop", type=float, default=0.25, help="probability of dropping each event in a variant")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--json", action="store_true", help="print JSON instead of tables")
+    args = ap.parse_args()
+    sc = load_scenario(args.scenario); res = {"replay": replay(sc)}
+    if args.variants: res["variants"] = run_variants(sc, args.variants, args.seed, args.drop, workers=args.workers)
+    if args.json:
+        print(json.dumps(res, indent=2, default=str))
+    else:
+        for s in res["replay"]["steps"]:
+            print(f"{s['t'] or '':>6}  {s['action'] or '-':<24} " + "  ".join(f"{m}={v:g}" for m, v in s["kpis"].items())
+                  + (f"  FAILED: {'; '.join(s['failed'])}" if s["failed"] else ""))
+        if args.variants:
+            v = res["variants"]; print(f"\n{v['variants']} variants in {v['runtime_s']}s; final: {v['final']}")
+            for st in v["strategies"]: print(f"  {st['variants']:>6}  otd={st['otd_risk_pct']:<6g} tput={st['throughput_per_day']:<8g} {st['actions']}")
+    sys.exit(0 if res["replay"]["passed"] else 1)
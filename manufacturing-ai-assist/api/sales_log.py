@@ -0,0 +1,198 @@
+from __future__ import annotations
+import json, os, queue, threading, time
+from bisect import bisect_left
+from pathlib import Path
+
+from utils.ids import IdGen, quote_ids
+from .state_store import _file_lock
+
+INDEXED = ("type", "sku", "prospect", "day")
+
+def _contains(sorted_list: list, item) -> bool:
+    i = bisect_left(sorted_list, item)
+    return i < len(sorted_list) and sorted_list[i] == item
+
+class SalesLog:
+    """Append-only sales event store: group-committed JSONL segments plus in-memory indexes.
+
+    ``append`` hands the record to a writer thread that drains everything queued
+    in the meantime, writes it with one ``write`` + ``fsync`` and then releases
+    all waiting callers (group commit). Segments rotate at ``segment_bytes``;
+    sealed segments get an ``.idx`` sidecar so restarts don't rescan them, and
+    every rotation runs ``compact``, which merges runs of small sealed segments
+    (e.g. left by a process with a smaller ``segment_bytes``). Indexes (quote_id, type, sku,
+    prospect, day) map to (segment, offset, length) and catch up on bytes
+    appended by other worker processes before every query.
+    """
+    def __init__(self, root: Path, legacy: Path | None = None, segment_bytes: int = 64 << 20,
+                 max_batch: int = 1024, max_delay_s: float = 0.002):
+        self.root = Path(root); self.root.mkdir(parents=True, exist_ok=True)
+        self.legacy = Path(legacy) if legacy else None
+        self.segment_bytes, self.max_batch, self.max_delay_s = segment_bytes, max_batch, max_delay_s
+        self.ids: IdGen = quote_ids
+        self._q: queue.Queue = queue.Queue()
+        self._ilock = threading.RLock()
+        self._reset_index()
+        self._writer = threading.Thread(target=self._run, name="sales-log-writer", daemon=True)
+        self._writer.start()
+
+    # ---------- segments ----------
+    def _seg_path(self, n: int) -> Path:
+        return self.legacy if n == 0 else self.root / f"seg-{n:06d}.jsonl"
+
+    def _segments(self) -> list[int]:
+        nums = sorted(int(p.stem[4:]) for p in self.root.glob("seg-*.jsonl"))
+        return ([0] if self.legacy and self.legacy.exists() else []) + nums
+
+    def _active(self) -> int:
+        nums = [n for n in self._segments() if n]
+        if not nums: return 1
+        last = nums[-1]
+        if self._seg_path(last).stat().st_size < self.segment_bytes: return last
+        self._write_sidecar(last)
+        return last + 1
+
+    # ---------- group commit ----------
+    def append(self, record: dict) -> dict:
+        done = threading.Event(); slot = {"record": record, "done": done, "error": None}
+        self._q.put(slot); done.wait()
+        if slot["error"]: raise slot["error"]
+        return record
+
+    def _run(self):
+        while True:
+            batch = [self._q.get()]
+            deadline = time.monotonic() + self.max_delay_s
+            while len(batch) < self.max_batch:
+                try: batch.append(self._q.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty: break
+            try:
+                self._commit(batch)
+            except Exception as e:
+                for slot in batch: slot["error"] = e
+            for slot in batch: slot["done"].set()
+
+    def _commit(self, batch: list[dict]) -> None:
+        data = b"".join(json.dumps(s["record"]).encode() + b"\n" for s in batch)
+        with _file_lock(self.root / ".lock"):
+            fp = self._seg_path(self._active()); rotated = not fp.exists() and fp != self._seg_path(1)
+            fd = os.open(fp, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, data); os.fsync(fd)
+            finally:
+                os.close(fd)
+            removed = self._merge_small(self.segment_bytes // 4) if rotated else 0
+        if removed:
+            with self._ilock: self._reset_index()
+        self._catch_up()
+
+    # ---------- index ----------
+    def _reset_index(self):
+        self._by_id: dict[str, tuple[int, int, int]] = {}
+        self._idx: dict[str, dict[str, list[tuple[int, int, int]]]] = {k: {} for k in INDEXED}
+        self._offsets: dict[int, int] = {}
+        self._all: list[tuple[int, int, int]] = []   # every typed event in log order (positions only grow)
+
+    @staticmethod
+    def _keys(rec: dict) -> dict:
+        return {"type": rec.get("type"), "sku": rec.get("sku"), "prospect": rec.get("prospect"),
+                "day": (rec.get("ts") or "")[:10] or None, "quote_id": rec.get("quote_id") if rec.get("type") in ("quote", "quote_batch") else None}
+
+    def _add(self, keys: dict, pos: tuple[int, int, int]) -> None:
+        if keys.get("quote_id"): self._by_id[keys["quote_id"]] = pos
+        if keys.get("type"): self._all.append(pos)
+        for k in INDEXED:
+            if keys.get(k): self._idx[k].setdefault(keys[k], []).append(pos)
+
+    def _sidecar(self, n: int) -> Path:
+        return self.root / f"seg-{n:06d}.idx"
+
+    def _write_sidecar(self, n: int) -> None:
+        side = self._sidecar(n)
+        if n == 0 or side.exists(): return
+        entries = [[self._keys(json.loads(line)), off, len(line)] for off, line in self._scan(n, 0)]
+        tmp = side.with_suffix(".idx.tmp"); tmp.write_text(json.dumps(entries)); os.replace(tmp, side)
+
+    def _scan(self, n: int, start: int):
+        with open(self._seg_path(n), "rb") as f:
+            f.seek(start); off = start
+            for line in f:
+                if not line.endswith(b"\n"): break   # partial tail from a concurrent writer
+                yield off, line; off += len(line)
+
+    def _catch_up(self) -> None:
+        with self._ilock:
+            segs = self._segments()
+            if any(n not in segs for n in self._offsets): self._reset_index()   # compacted elsewhere
+            for n in segs:
+                start = self._offsets.get(n, 0)
+                side = self._sidecar(n)
+                if start == 0 and side.exists() and side.stat().st_mtime_ns >= self._seg_path(n).stat().st_mtime_ns:
+                    entries = json.loads(side.read_text())
+                    for keys, off, ln in entries: self._add(keys, (n, off, ln))
+                    self._offsets[n] = self._seg_path(n).stat().st_size
+                    continue
+                for off, line in self._scan(n, start):
+                    try: self._add(self._keys(json.loads(line)), (n, off, len(line)))
+                    except ValueError: pass
+                    start = off + len(line)
+                self._offsets[n] = start
+
+    def _read(self, pos: tuple[int, int, int]) -> dict:
+        n, off, ln = pos
+        with open(self._seg_path(n), "rb") as f:
+            f.seek(off); return json.loads(f.read(ln))
+
+    # ---------- queries ----------
+    def get(self, quote_id: str) -> dict | None:
+        self._catch_up()
+        pos = self._by_id.get(quote_id)
+        return self._read(pos) if pos else None
+
+    def query(self, limit: int = 100, **filters) -> list[dict]:
+        """Newest-first events matching every given indexed field (type/sku/prospect/day)."""
+        self._catch_up()
+        with self._ilock:
+            lists = [self._idx[k].get(v, []) for k, v in filters.items() if k in INDEXED and v is not None]
+            if not lists: lists = [self._all]
+            lists.sort(key=len)   # walk the rarest key newest-first, probe the rest (position lists are sorted)
+            hits = []
+            for p in reversed(lists[0]):
+                if all(_contains(l, p) for l in lists[1:]):
+                    hits.append(p)
+                    if len(hits) >= limit: break
+        return [self._read(p) for p in hits]
+
+    def compact(self, min_bytes: int | None = None) -> int:
+        """Merge runs of sealed segments smaller than ``min_bytes`` into one; returns segments removed."""
+        with _file_lock(self.root / ".lock"):
+            removed = self._merge_small(self.segment_bytes // 4 if min_bytes is None else min_bytes)
+        if removed:
+            with self._ilock: self._reset_index()
+            self._catch_up()
+        return removed
+
+    def _merge_small(self, min_bytes: int) -> int:
+        """Merge the first run of small sealed segments; the caller holds the file lock."""
+        sealed = [n for n in self._segments() if n][:-1]
+        small = []   # first run of adjacent small segments, so merged order stays chronological
+        for n in sealed:
+            if self._seg_path(n).stat().st_size < min_bytes: small.append(n)
+            elif len(small) >= 2: break
+            else: small = []
+        if len(small) < 2: return 0
+        head, tail = small[0], small[1:]
+        tmp = self._seg_path(head).with_suffix(".tmp")
+        with open(tmp, "wb") as out:
+            for n in small: out.write(self._seg_path(n).read_bytes())
+            out.flush(); os.fsync(out.fileno())
+        os.replace(tmp, self._seg_path(head))
+        for n in small: self._sidecar(n).unlink(missing_ok=True)
+        for n in tail: self._seg_path(n).unlink()
+        self._write_sidecar(head)
+        return len(tail)
+
+    def stats(self) -> dict:
+        self._catch_up()
+        return {"segments": len(self._segments()), "quotes": len(self._by_id),
+                "events": len(self._all)}
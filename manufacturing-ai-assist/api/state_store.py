@@ -0,0 +1,83 @@
+from __future__ import annotations
+import json, os, threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+
+from .models import SimState
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+@contextmanager
+def _file_lock(fp: Path):
+    """Exclusive advisory lock on ``fp`` shared by every process/worker using the same file."""
+    with open(fp, "a+b") as f:
+        if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl: fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else: f.seek(0); msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class StateStore:
+    """SimState persisted as ``{"version": n, "state": {...}}`` with serialized, atomic updates.
+
+    Writers take a lock file (across processes) and a thread lock (within one),
+    re-read the current state, apply their change and publish it with
+    write-temp + fsync + ``os.replace``, so readers never see a torn file and
+    concurrent increments are never lost. Readers keep the last parsed snapshot
+    and only re-parse when the file's inode/mtime/size changes.
+    """
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix(self.path.suffix + ".lock")
+        self._lock = threading.Lock()
+        self._snap: tuple[tuple, int, SimState] | None = None
+
+    def _sig(self) -> tuple | None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self) -> tuple[int, SimState]:
+        sig = self._sig()
+        if sig is None: return 0, SimState()
+        snap = self._snap
+        if snap is not None and snap[0] == sig: return snap[1], snap[2]
+        raw = json.loads(self.path.read_text())
+        version, state = (raw["version"], SimState(**raw["state"])) if "state" in raw else (0, SimState(**raw))
+        self._snap = (sig, version, state)
+        return version, state
+
+    def read(self) -> tuple[int, SimState]:
+        """Consistent (version, state) snapshot; the state is a copy the caller may mutate."""
+        version, state = self._load()
+        return version, state.model_copy()
+
+    def update(self, fn: Callable[[SimState], object]) -> tuple[int, SimState]:
+        """Apply ``fn`` to the latest state under the lock and persist it as version + 1.
+        If ``fn`` raises, nothing is written."""
+        with self._lock, _file_lock(self.lock_path):
+            version, state = self._load()
+            state = state.model_copy()
+            fn(state)
+            version += 1
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                f.write(json.dumps({"version": version, "state": state.model_dump()}))
+                f.flush(); os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            self._snap = (self._sig(), version, state)
+            return version, state.model_copy()
+
+    def replace(self, state: SimState) -> tuple[int, SimState]:
+        def _set(s: SimState):
+            for k, v in state.model_dump().items(): setattr(s, k, v)
+        return self.update(_set)
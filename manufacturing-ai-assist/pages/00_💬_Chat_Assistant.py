@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import json, os, re
+import json, os
 from pathlib import Path
 from datetime import datetime
 
 from utils import api as simapi
-from utils.data import load_all_data
-from utils.kpis import compute_kpis
+from utils.data import cached_kpis
+from utils.intent import parse as parse_intent
 from utils.ui import show_logo, header, chips_row, greeting
 from utils.sales_offline import generate_quote, follow_up_email, propose_new_product
 from utils.ops_offline import (
@@ -240,19 +240,15 @@ else:  # Plant Manager
         add_task("Plant Manager", "Quality", "QA fast-track")
 
 # ---------------------------------------------------------------------
-# Natural-language triggers
+# Natural-language triggers (utils.intent — shared with POST /chat/intent)
 # ---------------------------------------------------------------------
-def _int_in(text, default=None):
-    m = re.search(r"\b(\d{1,5})\b", text)
-    return int(m.group(1)) if m else default
-
 prompt = st.chat_input("Type a message")
 if prompt:
     user(prompt)
-    low = prompt.lower()
+    it = parse_intent(prompt); sl = it.slots
 
     # KPI brief
-    if "kpi" in low or "brief" in low or "status" in low:
+    if it.name == "kpi_brief":
         if simapi.api_up():
             m = simapi.get_metrics() or {}
             assistant(
@@ -264,8 +260,7 @@ if prompt:
                 f"Inventory risks {m.get('inventory_risk_count',0)}."
             )
         else:
-            df_orders, df_quality, df_down, df_inv, _ = load_all_data()
-            k = compute_kpis(df_orders, df_quality, df_down, df_inv)
+            k = cached_kpis()
             assistant(
                 f"**Brief:** Throughput {k['throughput_per_day']:.0f}/day, "
                 f"On-time {k['on_time_pct']:.1f}%, "
@@ -275,10 +270,9 @@ if prompt:
             )
 
     # Sales NL
-    elif low.startswith("quote") or "quote for" in low:
-        m = re.search(r"quote.*?([a-z0-9-]{5,})[^0-9]*?(\d+)", low, re.I)
-        if m:
-            assy, qty = m.group(1).upper(), int(m.group(2))
+    elif it.name == "quote":
+        if "qty" in sl and (sl.get("assembly") or it.unknown.get("assembly")):
+            assy, qty = sl.get("assembly") or it.unknown["assembly"], sl["qty"]   # an unknown code surfaces "BOM not found"
             try:
                 res = generate_quote(assy, qty)
                 assistant(res["body"])
@@ -291,46 +285,39 @@ if prompt:
                 assistant(f"Could not create quote: {e}")
         else:
             assistant("Try: `quote for ASSY-100 qty 25`")
-    elif "follow up" in low or "follow-up" in low:
-        assistant(f"**Draft email to ACME Mfg:**\n\n{follow_up_email('ACME Mfg', 'Q-XXXX', tone='crisp')}")
-        add_task("Sales AE", "Follow-up", "ACME Mfg", "Q-XXXX")
-    elif "propose" in low or "suggest product" in low or "cross sell" in low:
-        assistant(propose_new_product("ASSY-100"))
-        add_task("Sales AE", "Propose", "Cross-sell for ASSY-100")
+    elif it.name == "follow_up":
+        acct = sl["account"]
+        assistant(f"**Draft email to {acct}:**\n\n{follow_up_email(acct, 'Q-XXXX', tone='crisp')}")
+        add_task("Sales AE", "Follow-up", acct, "Q-XXXX")
+    elif it.name == "propose_product":
+        assistant(propose_new_product(sl["assembly"]))
+        add_task("Sales AE", "Propose", f"Cross-sell for {sl['assembly']}")
 
     # Supply Chain NL
-    elif "expedite po" in low or ("expedite" in low and "po" in low):
-        sku = (re.search(r"(sku[- ]?\d+)", low) or re.search(r"(assy[- ]?\d+)", low) or re.search(r"(comp[- ]?\d+)", low))
-        sku = sku.group(1).upper() if sku else "SKU-19"
-        days = _int_in(low, default=2)
+    elif it.unknown.get("sku"):
+        assistant(f"Unknown SKU: {it.unknown['sku']}. Nothing was changed.")
+    elif it.name == "expedite_po":
+        sku, days = sl["sku"], sl["days"]
         assistant(sc_expedite_po(sku=sku, days_pull=days))
         add_task("Supply Chain Manager", "PO", "Expedited PO", f"{sku}, ETA -{days}d")
-    elif "alternate supplier" in low or "alt supplier" in low:
-        sku = (re.search(r"(sku[- ]?\d+)", low) or re.search(r"(assy[- ]?\d+)", low))
-        sku = sku.group(1).upper() if sku else "SKU-19"
-        qty = _int_in(low, default=500)
+    elif it.name == "alternate_supplier":
+        sku, qty = sl["sku"], sl["qty"]
         assistant(sc_alternate_supplier(sku=sku, qty=qty))
         add_task("Supply Chain Manager", "Supplier", "Alternate supplier", f"{sku}, {qty} pcs")
-    elif "upgrade carrier" in low or ("carrier" in low and "air" in low):
+    elif it.name == "upgrade_carrier":
         assistant(sc_upgrade_carrier())
         add_task("Supply Chain Manager", "Logistics", "Upgrade carrier to air")
 
     # Plant NL
-    elif "re-sequence" in low or "resequence" in low:
-        line = (re.search(r"(l\d)", low) or re.search(r"line[- ]?(l?\d)", low))
-        line = line.group(1).upper() if line else "L2"
-        assistant(plant_resequence(line))
-        add_task("Plant Manager", "Scheduling", f"Re-sequenced {line}")
-    elif "batch changeover" in low or "batch changeovers" in low:
-        line = (re.search(r"(l\d)", low) or re.search(r"line[- ]?(l?\d)", low))
-        line = line.group(1).upper() if line else "L2"
-        assistant(plant_batch_changeovers(line))
-        add_task("Plant Manager", "Ops", f"Batched changeovers {line}")
-    elif "qa fast" in low or "fast-track" in low or "fast track" in low:
-        sku = (re.search(r"(sku[- ]?\d+)", low) or re.search(r"(assy[- ]?\d+)", low))
-        sku = sku.group(1).upper() if sku else "SKU-19"
-        assistant(plant_qa_fast_track(sku))
-        add_task("Plant Manager", "Quality", "QA fast-track", sku)
+    elif it.name == "resequence":
+        assistant(plant_resequence(sl["line"]))
+        add_task("Plant Manager", "Scheduling", f"Re-sequenced {sl['line']}")
+    elif it.name == "batch_changeovers":
+        assistant(plant_batch_changeovers(sl["line"]))
+        add_task("Plant Manager", "Ops", f"Batched changeovers {sl['line']}")
+    elif it.name == "qa_fast_track":
+        assistant(plant_qa_fast_track(sl["sku"]))
+        add_task("Plant Manager", "Quality", "QA fast-track", sl["sku"])
 
     else:
         assistant("Acknowledged.")
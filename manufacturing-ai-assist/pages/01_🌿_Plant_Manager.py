@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
+import pandas as pd
 from datetime import datetime
 
 from utils.ui import show_logo, greeting, header, chips_row
@@ -7,6 +8,7 @@ from utils.ops_offline import (
     plant_resequence, plant_batch_changeovers, plant_qa_fast_track
 )
 from utils import api as simapi
+from utils.rollup import current_cube
 
 # -------- Page chrome --------
 st.set_page_config(page_title="Plant Manager", page_icon="🌿", layout="wide")
@@ -72,3 +74,27 @@ if b.button("Batch changeovers", use_container_width=True):
 if c.button("QA fast-track", use_container_width=True):
     sku = "SKU-19"
     st.success(plant_qa_fast_track(sku)); add_task("Quality", "QA fast-track", sku)
+
+# -------- Drill-down (rollup cubes) --------
+st.divider()
+st.subheader("Downtime & quality drill-down")
+down, qual = current_cube("downtime"), current_cube("quality")
+f1, f2 = st.columns(2)
+line = f1.selectbox("Line", ["All lines", *sorted(down.labels["line"])])
+days = f2.selectbox("Window", [7, 30, 90, 365], index=1, format_func=lambda d: f"Last {d} days")
+end = down.span[1] if down.span else pd.Timestamp.today().normalize()
+flt = dict(start=end - pd.Timedelta(days=days - 1), end=end, **({} if line == "All lines" else {"line": line}))
+c1, c2 = st.columns(2)
+with c1:
+    st.markdown("**Downtime Pareto by cause (min)**")
+    cause = down.pareto("cause", "minutes", **flt)
+    st.bar_chart(cause.set_index("cause")["minutes"])
+    pick = st.selectbox("Drill into cause", cause["cause"].tolist() or ["—"])
+    if len(cause):
+        st.dataframe(down.pareto("asset", "minutes", **{**flt, "cause": pick})[["asset", "minutes", "share_pct"]], use_container_width=True, hide_index=True)
+with c2:
+    st.markdown("**Defects Pareto by family**")
+    fam = qual.pareto("defect_family", "defects", **flt)
+    st.bar_chart(fam.set_index("defect_family")["defects"])
+    st.markdown("**Daily downtime (min)**")
+    st.line_chart(down.series(["minutes"], **flt).set_index("day"))
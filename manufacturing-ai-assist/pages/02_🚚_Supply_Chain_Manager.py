@@ -4,7 +4,6 @@ from datetime import datetime
 from utils.ui import show_logo, greeting, header, chips_row
 from utils.ops_offline import sc_expedite_po, sc_alternate_supplier, sc_upgrade_carrier
 from utils import api as simapi
-import os, requests
 
 st.set_page_config(page_title="Supply Chain", page_icon="🚚", layout="wide")
 show_logo(width=170)
@@ -66,13 +65,10 @@ if c.button("Upgrade carrier to air", use_container_width=True):
     st.success(sc_upgrade_carrier()); add_task("Logistics", "Upgrade carrier to air")
 
 # Optional ERP snapshot (only if your API is up)
-API_URL = os.environ.get("MFG_API_URL","http://localhost:8000")
 with st.expander("ERP snapshot (SKU-19)", expanded=False):
     if simapi.api_up():
-        try:
-            inv = requests.get(f"{API_URL}/inventory/SKU-19", timeout=4).json()
-            st.json(inv)
-        except Exception as e:
-            st.warning(f"ERP snapshot unavailable: {e}")
+        inv = simapi.get_inventory("SKU-19")
+        if inv: st.json(inv)
+        else: st.warning("ERP snapshot unavailable.")
     else:
         st.caption("Offline demo mode — snapshot hidden.")
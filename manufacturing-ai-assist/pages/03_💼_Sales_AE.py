@@ -2,7 +2,7 @@
 import streamlit as st
 from datetime import datetime
 from utils.ui import show_logo, greeting, header, chips_row
-from utils.sales_offline import generate_quote, follow_up_email, propose_new_product
+from utils.sales_offline import generate_quote, follow_up_email, propose_new_product, qty_break_table
 
 st.set_page_config(page_title="Sales AE", page_icon="💼", layout="wide")
 show_logo(width=170)
@@ -70,6 +70,8 @@ with st.form("quote_form", clear_on_submit=False):
             res["body"] = res["body"].replace("Price:", f"Price: **${price:,.2f}**  (margin {margin}%)\n- ")
         st.success("Quote drafted below:")
         st.markdown(res["body"])
+        with st.expander("Qty breaks", expanded=False):
+            st.markdown(qty_break_table(a.upper(), margin_pct=margin).markdown)
         add_task("Quote", f"{a.upper()} x{int(q)}", res["quote_id"])
 
 col1, col2 = st.columns(2)
@@ -1,9 +1,9 @@
 import streamlit as st
 from pathlib import Path
 
-from utils.data import load_all_data
-from utils.kpis import compute_kpis
-from utils.charts import kpi_row
+from utils.data import cached_kpis
+from utils.charts import TREND_LABELS, kpi_row, trend_chart
+from utils.rollup import current_cube
 from utils.ai import draft_brief
 from utils import api as simapi
 from utils.ui import show_logo
@@ -25,29 +25,31 @@ with col_logo:
 with col_title:
     st.markdown("## Manufacturing AI Assist")
 
-# Data + KPIs
-df_orders, df_quality, df_down, df_inv, df_wos = load_all_data()
-
-if simapi.api_up():
-    m = simapi.get_metrics() or {}
-    if m:
-        k = {
-            "throughput_per_day": m.get("throughput_per_day", 0),
-            "on_time_pct": m.get("on_time_pct", 0),
-            "defect_rate_pct": m.get("defect_rate_pct", 0),
-            "downtime_hours": m.get("downtime_hours", 0),
-            "inventory_risk_count": m.get("inventory_risk_count", 0),
-            "throughput_trend": m.get("throughput_trend", "flat"),
-            "top_downtime_cause": m.get("top_downtime_cause", "n/a"),
-            "top_defect_family": m.get("top_defect_family", "n/a"),
-            "lowest_stock_sku": m.get("lowest_stock_sku", "n/a"),
-        }
-    else:
-        k = compute_kpis(df_orders, df_quality, df_down, df_inv)
+# KPIs (API when reachable, else the shared offline cache)
+d = simapi.get_dashboard()
+m = (d or {}).get("metrics") or {}
+if m:
+    k = {
+        "throughput_per_day": m.get("throughput_per_day", 0),
+        "on_time_pct": m.get("on_time_pct", 0),
+        "defect_rate_pct": m.get("defect_rate_pct", 0),
+        "downtime_hours": m.get("downtime_hours", 0),
+        "inventory_risk_count": m.get("inventory_risk_count", 0),
+        "throughput_trend": m.get("throughput_trend", "flat"),
+        "top_downtime_cause": m.get("top_downtime_cause", "n/a"),
+        "top_defect_family": m.get("top_defect_family", "n/a"),
+        "lowest_stock_sku": m.get("lowest_stock_sku", "n/a"),
+    }
 else:
-    k = compute_kpis(df_orders, df_quality, df_down, df_inv)
+    k = cached_kpis()
 
 kpi_row(k)
+st.subheader("Trends")
+t1, t2, t3 = st.columns([3, 1, 1])
+metric = t1.radio("Metric", list(TREND_LABELS), format_func=TREND_LABELS.get, horizontal=True)
+days = t2.selectbox("Window", [7, 30, 90, 365], index=1, format_func=lambda d: f"Last {d} days")
+line = t3.selectbox("Line", ["All lines", *sorted(current_cube("orders").labels["line"])])
+trend_chart(metric, days, None if line == "All lines" else line)
 st.divider()
 st.subheader("Daily Brief")
 note = st.text_input("Notes (optional)", placeholder="Add any context...")
@@ -0,0 +1,57 @@
+# tests/test_adapters.py
+import asyncio, time
+import httpx
+import pytest
+from api.adapters.base import AdapterError, BaseAdapter, CircuitOpenError, UpstreamClientError
+
+def _adapter(responses, **kw):
+    """Adapter whose upstream answers with ``responses`` in turn (a status, (status, body) or an exception)."""
+    calls = []
+    def handler(req):
+        calls.append(req.method)
+        r = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(r, Exception): raise r
+        status, body = r if isinstance(r, tuple) else (r, '{"ok": true}')
+        return httpx.Response(status, content=body)
+    a = BaseAdapter(url="http://upstream", backoff=0.0, **kw)
+    a._client = httpx.AsyncClient(base_url=a.url, transport=httpx.MockTransport(handler))
+    return a, calls
+
+def _get(a, method="GET"):
+    return asyncio.run(a.request(method, "/x"))
+
+def test_idempotent_retry_then_success():
+    a, calls = _adapter([503, 503, 200], retries=2)
+    assert _get(a) == {"ok": True} and len(calls) == 3 and a.breaker.state == "closed" and a.breaker.failures == 0
+
+def test_post_is_not_retried_on_5xx():
+    a, calls = _adapter([503, 200], retries=2)
+    with pytest.raises(AdapterError): _get(a, "POST")
+    assert len(calls) == 1
+
+def test_breaker_opens_and_half_opens():
+    a, calls = _adapter([500] * 3 + [200], retries=0, breaker_threshold=3, breaker_reset_s=0.05)
+    for _ in range(3):
+        with pytest.raises(AdapterError): _get(a)
+    with pytest.raises(CircuitOpenError): _get(a)
+    assert len(calls) == 3 and a.breaker.state == "open"
+    time.sleep(0.06)
+    assert _get(a) == {"ok": True} and a.breaker.state == "closed"
+
+def test_client_errors_pass_through_without_tripping():
+    a, _ = _adapter([404] * 10, retries=0, breaker_threshold=2)
+    for _ in range(5):
+        with pytest.raises(UpstreamClientError) as e: _get(a)
+        assert e.value.status_code == 404
+    assert a.breaker.state == "closed"
+
+def test_invalid_json_counts_as_failure():
+    a, _ = _adapter([(200, "<html>")], retries=0, breaker_threshold=1)
+    with pytest.raises(AdapterError, match="invalid JSON"): _get(a)
+    assert a.breaker.state == "open"
+
+def test_failed_trial_releases_the_half_open_slot():
+    a, _ = _adapter([500, RuntimeError("boom"), 200], retries=0, breaker_threshold=1, breaker_reset_s=0.0)
+    with pytest.raises(AdapterError): _get(a)
+    with pytest.raises(RuntimeError): _get(a)        # the trial dies unexpectedly
+    assert _get(a) == {"ok": True}                     # the next call may try again
@@ -0,0 +1,18 @@
+# tests/test_bom.py
+import pytest
+from utils.bom import WhereUsed
+
+def test_where_used_remove():
+    wu = WhereUsed()
+    wu.add("ASSY-100", "COMP-19", 2); wu.add("KIT-300", "ASSY-100")
+    wu.remove("ASSY-100", "COMP-19")
+    assert wu.assemblies("COMP-19") == {"ASSY-100": 1, "KIT-300": 2}
+    wu.remove("ASSY-100", "COMP-19")
+    assert wu.assemblies("COMP-19") == {}
+
+@pytest.mark.parametrize("assembly, part, n", [("ASSY-100", "COMP-22", 1), ("ASSY-150", "COMP-19", 1), ("ASSY-100", "COMP-19", 2)])
+def test_where_used_remove_unknown_edge(assembly, part, n):
+    wu = WhereUsed(); wu.add("ASSY-100", "COMP-19")
+    with pytest.raises(ValueError):
+        wu.remove(assembly, part, n)
+    assert wu.assemblies("COMP-19") == {"ASSY-100": 1}
@@ -0,0 +1,28 @@
+# tests/test_changeover.py
+import pytest
+from utils.changeover import current_plan, optimize_line, synthetic
+
+@pytest.fixture(scope="module")
+def line():
+    return synthetic(n_skus=40, n_families=4, n_wos=200)
+
+def test_plan_is_reproducible(line):
+    a, b = (optimize_line(*line, "L1", max_kicks=50) for _ in range(2))
+    assert a.sequence == b.sequence and a.changeover_h_after == b.changeover_h_after and not a.solver["cut_off"]
+
+def test_one_lot_per_sku_and_no_worse_than_nearest_neighbour(line):
+    p = optimize_line(*line, "L1", max_kicks=50)
+    assert sorted(p.sequence) == sorted(line[1]["sku"].unique()) and p.changeovers_after == len(p.lots) - 1
+    assert p.changeover_h_after <= p.solver["nn_cost"] + 1e-9 < p.changeover_h_before
+
+def test_safety_cut_off_is_flagged(line):
+    p = optimize_line(*line, "L1", budget_s=0.0)
+    assert p.solver["cut_off"] and p.solver["kicks"] == 0
+
+def test_unknown_line_is_rejected():
+    from fastapi.testclient import TestClient
+    from api.app import app
+    with pytest.raises(KeyError): current_plan("no-such-line")
+    c = TestClient(app)
+    assert c.get("/changeover/no-such-line").status_code == 404
+    assert c.get("/changeover/L1").json() == c.get("/changeover/L1").json()
@@ -0,0 +1,27 @@
+# tests/test_columnar.py
+import shutil
+import pytest
+from utils.data import DATA_DIR, read_table
+
+pytest.importorskip("pyarrow")
+from utils import columnar
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in ("orders", "work_orders"): shutil.copy(DATA_DIR / f"{name}.csv", tmp_path)
+    fp = tmp_path / "orders.csv"; head, first, rest = fp.read_text().split("\n", 2)
+    cells = first.split(","); cells[3] = ""                     # a gap in the int64 qty_produced column
+    fp.write_text("\n".join([head, ",".join(cells), rest]))
+    return tmp_path
+
+@pytest.mark.parametrize("name", ["orders", "work_orders"])
+def test_same_frame_as_csv(data_dir, name):
+    columnar.convert(name, data_dir)
+    arrow, csv = columnar.read_table(name, data_dir=data_dir), read_table(data_dir / f"{name}.csv")
+    assert arrow.dtypes.to_dict() == csv.dtypes.to_dict() and arrow.equals(csv)
+
+def test_reads_only_requested_columns(data_dir):
+    columnar.convert("orders", data_dir)
+    df = columnar.read_table("orders", ["promised_ship_date", "sku", "no_such_column"], data_dir)
+    assert list(df.columns) == ["promised_ship_date", "sku"]
+    assert df.equals(read_table(data_dir / "orders.csv")[["promised_ship_date", "sku"]])
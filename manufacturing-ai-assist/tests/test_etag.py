@@ -0,0 +1,40 @@
+# tests/test_etag.py
+import os, shutil
+import pytest
+from fastapi.testclient import TestClient
+from api import app as api
+from api.state_store import StateStore
+from utils.data import DATA_DIR, read_table
+from utils.table_cache import TableCache
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "state_store", StateStore(tmp_path / "sim_state.json"))
+    return TestClient(api.app)
+
+@pytest.mark.parametrize("path", ["/metrics", "/state", "/dashboard"])
+def test_not_modified(client, path):
+    r = client.get(path); tag = r.headers["etag"]
+    assert r.status_code == 200 and tag.startswith('"')
+    for inm in (tag, f"W/{tag}", f'"other", {tag}', "*"):
+        r304 = client.get(path, headers={"If-None-Match": inm})
+        assert r304.status_code == 304 and r304.content == b"" and r304.headers["etag"] == tag
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_etag_follows_the_state(client):
+    tag = client.get("/metrics").headers["etag"]; dash = client.get("/dashboard").headers["etag"]
+    client.post("/simulate/action", json={"action": "Expedited PO"})
+    assert client.get("/metrics", headers={"If-None-Match": tag}).status_code == 200
+    assert client.get("/dashboard").headers["etag"] != dash
+    client.post("/reset")
+    assert client.get("/metrics").headers["etag"] == tag          # same state + data → same ETag
+    assert client.get("/dashboard").headers["etag"] != dash       # the dashboard also carries the version
+
+def test_data_version_tracks_table_digests(tmp_path, monkeypatch):
+    for fp in DATA_DIR.glob("*.csv"): shutil.copy(fp, tmp_path)
+    monkeypatch.setattr(api, "DATA", tmp_path)
+    monkeypatch.setattr(api, "tables", TableCache(tmp_path, read_table, check_interval=0))
+    v = api.data_version(); os.utime(tmp_path / "orders.csv")
+    assert api.data_version() == v                                 # touched, same bytes
+    with open(tmp_path / "orders.csv", "a") as f: f.write("9999,2025-10-22,SKU-01,1,2025-10-25,,L1\n")
+    assert api.data_version() != v
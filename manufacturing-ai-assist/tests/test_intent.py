@@ -0,0 +1,38 @@
+# tests/test_intent.py
+import pytest
+from utils.intent import IntentRouter
+
+GAZ = {"sku": ["SKU-01", "SKU-07", "SKU-19"], "assembly": ["ASSY-100", "KIT-300"], "part": ["COMP-19"],
+       "line": ["L1", "L2"], "account": ["ACME Mfg"]}
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(GAZ)
+
+@pytest.mark.parametrize("prompt, slots", [
+    ("expedite po for sku 19 by 3 days", {"sku": "SKU-19", "days": 3}),
+    ("expedite po for SKU-1 by 3 days", {"sku": "SKU-01", "days": 3}),
+    ("qa fast track SKU-7", {"sku": "SKU-07"}),
+    ("expedite po", {"sku": "SKU-19", "days": 2}),
+])
+def test_known_or_default_sku(router, prompt, slots):
+    it = router.parse(prompt)
+    assert it.slots == slots and not it.missing and not it.unknown
+
+@pytest.mark.parametrize("prompt, name", [
+    ("expedite po for sku-45", "expedite_po"),
+    ("alt supplier sku 45 qty 300", "alternate_supplier"),
+    ("qa fast track SKU-45", "qa_fast_track"),
+])
+def test_unknown_sku_is_missing_not_defaulted(router, prompt, name):
+    it = router.parse(prompt)
+    assert it.name == name and "sku" not in it.slots
+    assert it.missing == ["sku"] and it.unknown == {"sku": "SKU-45"}
+
+def test_unknown_code_digits_are_not_quantities(router):
+    it = router.parse("alt supplier sku 45 qty 300")
+    assert it.slots == {"qty": 300}
+
+def test_unknown_assembly_in_quote(router):
+    it = router.parse("quote for ASSY-999 qty 5")
+    assert it.slots == {"qty": 5} and it.missing == ["assembly"] and it.unknown == {"assembly": "ASSY-999"}
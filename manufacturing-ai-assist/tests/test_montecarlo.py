@@ -0,0 +1,33 @@
+# tests/test_montecarlo.py
+import numpy as np
+import pytest
+from utils import montecarlo as mc
+from utils.montecarlo import Effects, current_model, run, simulate
+
+@pytest.fixture(scope="module")
+def model():
+    return current_model()
+
+def test_chunked_sampling_is_seeded_and_complete(model, monkeypatch):
+    monkeypatch.setattr(mc, "CHUNK_CELLS", 70)          # 10 trials per chunk at 7 days
+    a, b = simulate(model, Effects(), 95, 7, seed=3), simulate(model, Effects(), 95, 7, seed=3)
+    assert all(len(v) == 95 for v in a.values())
+    assert all(np.array_equal(a[k], b[k]) for k in a)
+
+def test_calibrated_to_history(model):
+    from utils.data import tables
+    o = tables.get("orders"); hist = o.groupby("order_date")["qty_produced"].sum().mean()
+    r = run(model, Effects(), 20_000, 7, workers=1)
+    assert r["throughput_per_day"]["mean"] == pytest.approx(hist, rel=0.05)
+
+def test_mitigation_lowers_otd_risk(model):
+    base = run(model, Effects(eta_days=3, uncovered=1.0), 20_000, workers=1)
+    mitigated = run(model, Effects(), 20_000, workers=1)
+    assert mitigated["otd_risk_pct"]["mean"] < base["otd_risk_pct"]["mean"]
+
+def test_forecast_rejects_oversized_requests():
+    from fastapi.testclient import TestClient
+    from api.app import app, MAX_TRIAL_DAYS
+    c = TestClient(app)
+    assert c.get("/forecast", params={"trials": MAX_TRIAL_DAYS // 10 + 1, "horizon_days": 10}).status_code == 422
+    assert c.get("/forecast", params={"trials": 1000, "horizon_days": 10}).status_code == 200
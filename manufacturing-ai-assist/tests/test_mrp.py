@@ -0,0 +1,36 @@
+# tests/test_mrp.py
+import numpy as np
+import pandas as pd
+from utils.mrp import build
+
+START = pd.Timestamp("2025-10-23")
+
+def _plan():
+    inv = pd.DataFrame({"sku": ["SKU-19", "SKU-01"], "on_hand": [1310, 500], "safety_stock": [1064, 100]})
+    orders = pd.DataFrame({"sku": ["SKU-19"], "order_date": [START], "qty_produced": [407],
+                           "promised_ship_date": [START + pd.Timedelta(days=1)], "actual_ship_date": [pd.NaT]})
+    po = pd.DataFrame({"sku": ["SKU-19"], "qty": [600], "eta_date": [START + pd.Timedelta(days=3)], "status": ["Open"]})
+    return build(inv, orders, None, po, START)
+
+def test_projection_and_risk():
+    p = _plan(); i = p.ids["SKU-19"]
+    assert p.projected[i, :4].tolist() == [1310, 903, 903, 1503]
+    assert p.below_safety_day[i] == 1 and p.risk_count() == 1
+
+def test_extra_qty_clears_risk():
+    at_risk = _plan().sim_at_risk("SKU-19", np.zeros(3, dtype=int), np.array([0, 100, 5000]))
+    assert at_risk.tolist() == [True, True, False]
+
+def test_pulled_in_po_clears_risk():
+    assert _plan().sim_at_risk("SKU-19", np.array([0, 2]), np.zeros(2)).tolist() == [True, False]
+
+def test_incremental_matches_rebuild():
+    p = _plan(); p.add_demand("SKU-01", START + pd.Timedelta(days=5), 450)
+    q = _plan(); q.demand[q.ids["SKU-01"], 5] += 450; q.project()
+    assert np.array_equal(p.projected, q.projected) and p.risk_count() == q.risk_count() == 2
+
+def test_alternate_supplier_lowers_api_risk_count():
+    from fastapi.testclient import TestClient
+    from api.app import app
+    rows = TestClient(app).post("/simulate/batch", json={"grid": {"extra_qty": [0, 5000]}}).json()["rows"]
+    assert rows[1]["kpis"]["inventory_risk_count"] == rows[0]["kpis"]["inventory_risk_count"] - 1
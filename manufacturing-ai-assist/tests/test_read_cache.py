@@ -0,0 +1,56 @@
+# tests/test_read_cache.py
+import asyncio
+from api.adapters.cache import ReadCache
+
+def _fetcher(gate: asyncio.Event | None = None):
+    calls = []
+    async def fetch():
+        calls.append(1)
+        if gate: await gate.wait()
+        return len(calls)
+    return fetch, calls
+
+def test_fresh_hit_and_single_flight():
+    async def run():
+        c = ReadCache(); gate = asyncio.Event(); fetch, calls = _fetcher(gate)
+        tasks = [asyncio.ensure_future(c.get(("inv", "SKU-19"), fetch, ttl=60)) for _ in range(5)]
+        await asyncio.sleep(0); gate.set()
+        assert await asyncio.gather(*tasks) == [1] * 5
+        assert await c.get(("inv", "SKU-19"), fetch, ttl=60) == 1
+        return c, calls
+    c, calls = asyncio.run(run())
+    assert len(calls) == 1 and c.counters["coalesced"] == 4 and c.counters["hits"] == 1
+
+def test_stale_while_revalidate():
+    async def run():
+        c = ReadCache(); fetch, calls = _fetcher()
+        await c.get(("asn", 1), fetch, ttl=0, stale_s=60)
+        stale = await c.get(("asn", 1), fetch, ttl=0, stale_s=60)   # served at once, refreshed behind
+        await asyncio.sleep(0.01)
+        return stale, c.peek(("asn", 1)), calls, c.counters["stale"]
+    stale, fresh, calls, n_stale = asyncio.run(run())
+    assert stale == 1 and fresh is None and len(calls) == 2 and n_stale == 1   # ttl=0: the refresh is stored, never fresh
+
+def test_invalidate_drops_racing_loads_of_that_prefix_only():
+    async def run():
+        c = ReadCache(); gate = asyncio.Event()
+        inv, _ = _fetcher(gate); other, _ = _fetcher(gate)
+        a = asyncio.ensure_future(c.get(("inv", "SKU-19"), inv, ttl=60))
+        b = asyncio.ensure_future(c.get(("asn", "SKU-19"), other, ttl=60))
+        await asyncio.sleep(0.01)                                      # both fetches have started
+        assert c.invalidate("inv") == 0
+        gate.set(); await asyncio.gather(a, b)
+        return c
+    c = asyncio.run(run())
+    assert c.peek(("inv", "SKU-19")) is None and c.peek(("asn", "SKU-19")) == 1
+
+def test_put_since_and_pruned_generations():
+    c = ReadCache(max_entries=2)
+    since = c.clock; c.invalidate("a", 1)
+    c.put(("a", 1, "x"), "old", ttl=60, since=since); c.put(("a", 2), "ok", ttl=60, since=since)
+    assert c.peek(("a", 1, "x")) is None and c.peek(("a", 2)) == "ok"
+    since = c.clock
+    for i in range(3): c.invalidate("b", i)                         # pushes ("a", 1) out of the generation table
+    c.put(("a", 1), "unsure", ttl=60, since=since)                    # started before the pruned floor → dropped
+    c.put(("c",), 1, ttl=60); c.put(("d",), 2, ttl=60); c.put(("e",), 3, ttl=60)
+    assert c.peek(("a", 1)) is None and c.stats()["entries"] == 2 and c.peek(("c",)) is None
@@ -0,0 +1,36 @@
+# tests/test_sales_log.py
+from api.sales_log import SalesLog
+from utils.ids import IdGen
+
+def _fill(log, n, start=0):
+    for i in range(start, start + n):
+        log.append({"type": "quote", "quote_id": f"Q-{i}", "sku": f"SKU-{i % 3}", "ts": f"2025-10-{1 + i % 5:02d}T08:00:00"})
+
+def _snapshot(log):
+    return [log.query(limit=1000), log.query(limit=1000, sku="SKU-1"), log.query(limit=1000, sku="SKU-2", day="2025-10-03"),
+            [log.get(f"Q-{i}") for i in range(0, 60, 7)]]
+
+def test_rotation_and_queries(tmp_path):
+    log = SalesLog(tmp_path, segment_bytes=400)
+    _fill(log, 30)
+    assert log.stats()["segments"] > 2 and log.stats()["quotes"] == 30
+    assert [r["quote_id"] for r in log.query(limit=3)] == ["Q-29", "Q-28", "Q-27"]
+    assert all(r["sku"] == "SKU-1" for r in log.query(sku="SKU-1")) and log.get("Q-5")["sku"] == "SKU-2"
+    assert SalesLog(tmp_path, segment_bytes=400).query(limit=1000) == log.query(limit=1000)   # restart reads the sidecars
+
+def test_compaction_keeps_query_results(tmp_path):
+    log = SalesLog(tmp_path, segment_bytes=400)
+    _fill(log, 60); before = _snapshot(log); segs = log.stats()["segments"]
+    assert log.compact(min_bytes=10_000) == segs - 2          # every sealed segment merged into one
+    assert log.stats()["segments"] == 2 and _snapshot(log) == before
+
+def test_rotation_compacts_small_segments(tmp_path):
+    _fill(SalesLog(tmp_path, segment_bytes=400), 30)           # small segments from an earlier, smaller setting
+    log = SalesLog(tmp_path, segment_bytes=4_000); before = _snapshot(log); segs = log.stats()["segments"]
+    _fill(log, 60, start=30)                                   # fills the last segment past 4 kB, then rotates
+    assert log.stats()["segments"] < segs
+    assert _snapshot(log)[3][:5] == before[3][:5] and len(log.query(limit=1000)) == 90
+
+def test_ids_are_unique_and_ordered():
+    gen = IdGen(); ids = [gen.next("Q") for _ in range(5_000)]
+    assert len(set(ids)) == len(ids) and [int(i.split("-")[1]) for i in ids] == sorted(int(i.split("-")[1]) for i in ids)
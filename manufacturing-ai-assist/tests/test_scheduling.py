@@ -0,0 +1,33 @@
+# tests/test_scheduling.py
+import pytest
+from utils import scheduling
+from utils.scheduling import schedule, synthetic
+
+@pytest.fixture(scope="module")
+def jobs():
+    return synthetic(n_jobs=400, n_lines=2)
+
+def test_schedule_is_reproducible(jobs):
+    wos, orders, st = jobs
+    a, b = (schedule(wos, orders, max_moves=5_000, stations=st) for _ in range(2))
+    assert a.plan.equals(b.plan) and a.summary()["throughput_gain_pct"] == b.summary()["throughput_gain_pct"]
+    assert not a.summary()["cut_off"]
+
+def test_every_open_job_is_planned_once_and_no_later(jobs):
+    wos, orders, st = jobs
+    s = schedule(wos, orders, max_moves=5_000, stations=st)
+    assert sorted(s.plan["wo_id"]) == sorted(wos["wo_id"])
+    for r in s.lines.values(): assert r.optimized["tardiness_h"] <= r.baseline["tardiness_h"] + 1e-9
+
+def test_safety_cut_off_is_flagged(jobs):
+    wos, orders, st = jobs
+    assert schedule(wos, orders, budget_s=0.0, stations=st).summary()["cut_off"]
+
+def test_lifespan_warms_schedule_and_metrics_etag_is_stable():
+    from fastapi.testclient import TestClient
+    from api.app import app
+    scheduling._memo.clear()
+    with TestClient(app) as c:
+        assert "sched" in scheduling._memo
+        a, b = c.get("/metrics"), c.get("/metrics")
+    assert a.headers["etag"] == b.headers["etag"] and a.content == b.content
@@ -0,0 +1,55 @@
+# tests/test_search.py
+import shutil
+import pandas as pd
+import pytest
+from utils import data, search as S
+from utils.search import SearchIndex, doc_tokens, query_tokens
+
+INV = pd.DataFrame({"sku": ["SKU-19", "SKU-01", "SKU-02"], "description": ["Hex bracket", "Gasket kit", "Hose clamp"]})
+ORDERS = pd.DataFrame({"order_id": [1, 2, 3], "sku": ["SKU-19", "SKU-19", "SKU-01"], "line": ["L1", "L2", "L1"],
+                       "order_date": pd.to_datetime(["2025-10-01", "2025-10-05", "2025-10-09"])})
+
+@pytest.fixture
+def idx():
+    ix = SearchIndex(); ix.add("inventory", INV); ix.add("orders", ORDERS); return ix
+
+def test_tokens():
+    assert doc_tokens("SKU-19 bracket") == {"sku", "19", "sku19", "bracket"}
+    assert query_tokens("skU19? sku-19") == ["sku19"]
+
+def test_key_row_ranks_first(idx):
+    r = idx.search("SKU-19")
+    assert r["total"] == 3 and r["hits"][0] == {**r["hits"][0], "kind": "inventory", "key": "SKU-19"}
+    assert [h["key"] for h in r["hits"][1:]] == ["2", "1"]                    # then newest order first
+
+def test_prefix_fuzzy_and_ignored(idx):
+    assert [h["key"] for h in idx.search("brack")["hits"]] == ["SKU-19"]
+    assert [h["key"] for h in idx.search("gazkit")["hits"]] == []           # two edits away
+    assert [h["key"] for h in idx.search("gaskey")["hits"]] == ["SKU-01"]   # one edit away
+    r = idx.search("check stock for SKU-19")
+    assert set(r["ignored"]) == {"check", "stock", "for"} and r["total"] == 3
+    assert idx.search("zzzz")["total"] == 0
+
+def test_facets_and_dates(idx):
+    r = idx.search("sku19", kind="orders", line="L1")
+    assert [h["key"] for h in r["hits"]] == ["1"] and r["facets"]["line"] == {"L1": 1}
+    assert idx.search("", kind="orders", start="2025-10-04", end="2025-10-06")["hits"][0]["key"] == "2"
+    assert idx.search("", page=2, per_page=4)["total"] == 6 and len(idx.search("", page=2, per_page=4)["hits"]) == 2
+
+def test_append_matches_rebuild():
+    a = SearchIndex(); a.add("orders", ORDERS.iloc[:1]); a.add("orders", ORDERS, start=1)
+    b = SearchIndex(); b.add("orders", ORDERS)
+    for q in ("sku19", "sku", "sku-01", ""):
+        assert a.search(q)["hits"] == b.search(q)["hits"]
+
+def test_current_index_follows_the_tables(tmp_path, monkeypatch):
+    shutil.copy(data.DATA_DIR / "inventory.csv", tmp_path)
+    monkeypatch.setattr(data, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data, "tables", data.TableCache(tmp_path, data.read_table, check_interval=0))
+    monkeypatch.setattr(S, "_index", SearchIndex()); monkeypatch.setattr(S, "_seen", {})
+    n = S.current_index().size
+    with open(tmp_path / "inventory.csv", "a") as f: f.write("SKU-99,Flux capacitor,1,0,ea\n")
+    ix = S.current_index()
+    assert ix is S._index and ix.size == n + 1 and S.search("flux")["hits"][0]["key"] == "SKU-99"
+    (tmp_path / "inventory.csv").write_text("sku,description,on_hand,safety_stock,uom\nSKU-98,Widget,1,0,ea\n")
+    assert S.current_index().size == 1 and S.search("flux")["total"] == 0
@@ -0,0 +1,24 @@
+# tests/test_sqlstore.py
+import pytest
+from utils import ops_offline, sqlstore
+from utils.data import DATA_DIR, cached_kpis, tables
+from utils.mrp import OPEN_PO, current_plan
+from utils.search import search_sc
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    return sqlstore.SQLStore(sqlstore.build(DATA_DIR, tmp_path_factory.mktemp("db") / sqlstore.DB_NAME))
+
+def test_inventory_risk_count_is_the_mrp_projection(store, monkeypatch):
+    assert "inventory_risk_count" not in store.kpis()
+    monkeypatch.setattr(ops_offline, "open_store", lambda: store)
+    risk = current_plan().risk_count()
+    assert ops_offline.kpi_snapshot().kpis["inventory_risk_count"] == risk == cached_kpis()["inventory_risk_count"]
+
+@pytest.mark.parametrize("use_store", [True, False])
+def test_open_pos_come_from_purchase_orders(store, monkeypatch, use_store):
+    monkeypatch.setenv("MFG_SQL", "0")   # no data/plant.db fallback in the pandas case
+    title, df = search_sc("open po", {"orders": tables.get("orders")}, store if use_store else None)
+    pos = tables.get("purchase_orders")
+    assert title == "Open POs" and sorted(df["po_id"]) == sorted(pos.loc[pos["status"].isin(OPEN_PO), "po_id"])
+    assert df["eta_date"].is_monotonic_increasing
@@ -0,0 +1,37 @@
+# tests/test_state_store.py
+import json, threading
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from api.models import SimState
+from api.state_store import StateStore
+
+def _bump(fp, n):
+    s = StateStore(fp)
+    for _ in range(n): s.update(lambda st: setattr(st, "extra_qty", st.extra_qty + 1))
+
+def test_versions_and_snapshots(tmp_path):
+    s = StateStore(tmp_path / "sim_state.json")
+    assert s.read() == (0, SimState())
+    v, st = s.update(lambda st: setattr(st, "eta_offset_days", 2))
+    assert v == 1 and st.eta_offset_days == 2 and json.loads(s.path.read_text())["version"] == 1
+    _, copy = s.read(); copy.eta_offset_days = 9
+    assert s.read()[1].eta_offset_days == 2                          # readers get copies
+    assert StateStore(s.path).read() == (1, st)                       # another worker sees the same snapshot
+
+def test_failed_update_writes_nothing(tmp_path):
+    s = StateStore(tmp_path / "sim_state.json"); s.update(lambda st: None)
+    def boom(st): st.extra_qty = 1; raise ValueError
+    with pytest.raises(ValueError): s.update(boom)
+    assert s.read() == (1, SimState()) and not list(tmp_path.glob("*.tmp"))
+
+def test_legacy_file_without_version(tmp_path):
+    fp = tmp_path / "sim_state.json"; fp.write_text(json.dumps(SimState(extra_qty=500).model_dump()))
+    assert StateStore(fp).read() == (0, SimState(extra_qty=500))
+
+def test_no_lost_updates_across_threads_and_processes(tmp_path):
+    fp = tmp_path / "sim_state.json"
+    threads = [threading.Thread(target=_bump, args=(fp, 25)) for _ in range(4)]
+    for t in threads: t.start()
+    with ProcessPoolExecutor(2) as ex: list(ex.map(_bump, [fp, fp], [25, 25]))
+    for t in threads: t.join()
+    assert StateStore(fp).read() == (150, SimState(extra_qty=150))
@@ -0,0 +1,56 @@
+# tests/test_table_cache.py
+import dataclasses, os
+import pandas as pd
+import pytest
+from utils.data import SALES_TABLES, read_coerced, read_table, tables
+from utils.table_cache import TableCache
+
+def test_per_table_loader(tmp_path):
+    for name in ("orders", "prospects"): (tmp_path / f"{name}.csv").write_text("id,last_date\n1,2025-10-01\n2,soon\n")
+    c = TableCache(tmp_path, read_table, check_interval=0, loaders={"prospects": read_coerced})
+    assert c.get("prospects")["last_date"].isna().tolist() == [False, True]
+    with pytest.raises(ValueError): c.get("orders")   # the default loader still rejects a bad date
+    with open(tmp_path / "prospects.csv", "a") as f: f.write("3,later\n")
+    assert c.get("prospects")["last_date"].isna().tolist() == [False, True, True] and c.counters["appends"] == 1
+
+def test_sales_tables_share_the_process_cache():
+    from utils import sales_offline
+    assert sales_offline.load_bom() is tables.get("bom") and not hasattr(sales_offline, "_tables")
+    for name in SALES_TABLES: sales_offline._csv(f"{name}.csv")
+    assert set(SALES_TABLES) <= set(tables.stats()["tables"])
+
+def _cache(tmp_path, rows=3, **kw):
+    (tmp_path / "t.csv").write_text("id,v\n" + "".join(f"{i},{i * 10}\n" for i in range(rows)))
+    return TableCache(tmp_path, pd.read_csv, check_interval=0, **kw)
+
+def test_hit_and_revalidation_keep_the_frame(tmp_path):
+    c = _cache(tmp_path); e = c.entry("t")
+    assert c.entry("t").df is e.df and c.counters["hits"] == 1
+    os.utime(tmp_path / "t.csv", ns=(1, 1))                       # touched, same bytes
+    e2 = c.entry("t")
+    assert e2.df is e.df and e2.gen == e.gen and c.counters["revalidations"] == 1
+
+def test_append_parses_only_the_tail(tmp_path):
+    c = _cache(tmp_path); e = c.entry("t")
+    with open(tmp_path / "t.csv", "a") as f: f.write("3,30\n4,40\n")
+    e2 = c.entry("t")
+    assert c.counters["appends"] == 1 and e2.gen > e.gen and e2.base_gen == e.base_gen
+    assert e2.df["id"].tolist() == [0, 1, 2, 3, 4] and len(e.df) == 3   # the handed-out entry is unchanged
+
+def test_rewrite_reparses(tmp_path):
+    c = _cache(tmp_path); e = c.entry("t")
+    (tmp_path / "t.csv").write_text("id,v\n7,70\n")
+    e2 = c.entry("t")
+    assert e2.base_gen == e2.gen > e.gen and e2.df["id"].tolist() == [7] and c.counters["appends"] == 0
+
+def test_entries_are_immutable(tmp_path):
+    e = _cache(tmp_path).entry("t")
+    with pytest.raises(dataclasses.FrozenInstanceError): e.gen = 0
+
+def test_lru_eviction_and_invalidate(tmp_path):
+    for n in ("a", "b"): (tmp_path / f"{n}.csv").write_text("x\n" + "1\n" * 1000)
+    c = TableCache(tmp_path, pd.read_csv, max_bytes=10_000)
+    a = c.entry("a"); c.entry("b")
+    assert c.counters["evictions"] == 1 and set(c.stats()["tables"]) == {"b"}
+    assert c.entry("a").gen > a.gen                               # reloaded, never a reused generation
+    c.invalidate(); assert c.stats()["tables"] == {}
@@ -1,21 +1,74 @@
 
-import os, requests
+import os, threading, time, requests
+from requests.adapters import HTTPAdapter
 API_URL = os.environ.get("MFG_API_URL", "http://localhost:8000")
+HEALTH_TTL_S = float(os.environ.get("MFG_API_HEALTH_TTL_S", "5"))       # recheck interval while the API is up
+HEALTH_BACKOFF_MAX_S = float(os.environ.get("MFG_API_BACKOFF_MAX_S", "60"))   # cap for the doubling interval while down
+HEALTH_FIRST_TIMEOUT_S = 0.3   # the only blocking probe: first use in a process
+
+# One keep-alive pool for the whole Streamlit process (all sessions/reruns share it).
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# ---------- health ----------
+_health = {"up": None, "next": 0.0, "interval": HEALTH_TTL_S}
+_health_lock = threading.Lock(); _probing = threading.Event()
+def _mark(up:bool)->bool:
+    with _health_lock:
+        interval = HEALTH_TTL_S if up else min(HEALTH_BACKOFF_MAX_S, _health["interval"] * 2 if _health["up"] is False else 2.0)
+        _health.update(up=up, interval=interval, next=time.monotonic() + interval)
+    return up
+def _probe(timeout:float=1.2)->bool:
+    try: return _mark(_session.get(f"{API_URL}/health", timeout=timeout).ok)
+    except Exception: return _mark(False)
+    finally: _probing.clear()
 def api_up()->bool:
-    try:
-        r = requests.get(f"{API_URL}/health", timeout=1.2); return r.ok
-    except Exception: return False
+    """Cached API status; never blocks a render except for one short probe on first use.
+    Stale status is refreshed in a background thread (every HEALTH_TTL_S while up, backing off while down)."""
+    if _health["up"] is None and not _probing.is_set():
+        _probing.set(); return _probe(HEALTH_FIRST_TIMEOUT_S)
+    if time.monotonic() >= _health["next"] and not _probing.is_set():
+        _probing.set(); threading.Thread(target=_probe, daemon=True, name="api-health").start()
+    return bool(_health["up"])
+
+# ---------- requests ----------
+_validated: dict[str, tuple[str, dict]] = {}   # path -> (ETag, last body)
+def _get_json(path:str, timeout:float)->dict|None:
+    """GET with If-None-Match; a 304 reuses the locally kept copy. Connection failures mark the API down."""
+    cached = _validated.get(path)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+    try: r = _session.get(f"{API_URL}{path}", headers=headers, timeout=timeout)
+    except requests.ConnectionError: _mark(False); raise
+    if r.status_code == 304 and cached: return dict(cached[1])
+    if not r.ok: return None
+    body = r.json()
+    if r.headers.get("ETag"): _validated[path] = (r.headers["ETag"], body)
+    return body
 def get_metrics()->dict|None:
+    try: return _get_json("/metrics", timeout=5)
+    except Exception: return None
+def get_state()->dict|None:
+    try: return _get_json("/state", timeout=5)
+    except Exception: return None
+def get_dashboard()->dict|None:
+    """{"state", "version", "metrics"} in one round trip; None when offline."""
+    if not api_up(): return None
+    try: return _get_json("/dashboard", timeout=5)
+    except Exception: return None
+def get_inventory(sku:str)->dict|None:
     try:
-        r = requests.get(f"{API_URL}/metrics", timeout=5); 
-        if r.ok: return r.json()
+        r = _session.get(f"{API_URL}/inventory/{sku}", timeout=4); return r.json() if r.ok else None
+    except requests.ConnectionError: _mark(False); return None
     except Exception: return None
 def post_action(label:str)->str:
     try:
-        r = requests.post(f"{API_URL}/simulate/action", json={"action": label}, timeout=6)
+        r = _session.post(f"{API_URL}/simulate/action", json={"action": label}, timeout=6)
         if r.ok: return r.json().get("message","OK")
         return f"Error: {r.text}"
-    except Exception as e: return f"API not reachable: {e}"
+    except Exception as e:
+        if isinstance(e, requests.ConnectionError): _mark(False)
+        return f"API not reachable: {e}"
 def reset()->None:
-    try: requests.post(f"{API_URL}/reset", timeout=3)
+    try: _session.post(f"{API_URL}/reset", timeout=3)
     except Exception: pass
@@ -0,0 +1,217 @@
+# utils/bom.py
+"""Multi-level BOM engine.
+
+``bom.csv`` rows are parent→child edges (``assembly`` → ``part``). A part that
+also appears as an assembly is a subassembly: its row's ``unit_cost`` is ignored
+and the subassembly's rolled-up cost is used instead. Per unit of an assembly:
+
+- material cost = Σ qty_per × (unit_cost | child material cost)
+- std cost      = Σ std_cost (per line) + Σ qty_per × child std cost
+- lead time     = max over lines of lead_time_days (+ child lead time), the critical path
+
+For a single-level BOM this is exactly the old flat ``price_from_bom`` math.
+Rollups are computed once for every assembly, level by level from the leaves,
+so shared subassemblies are costed once. ``update_part`` changes a component
+and recomputes only its ancestors. ``WhereUsed`` is the mutable bottom-up view
+joined to orders and work orders, for disruption-impact queries.
+"""
+from __future__ import annotations
+from collections import Counter, deque
+import numpy as np
+import pandas as pd
+
+class BOMCycleError(ValueError):
+    """An assembly contains itself through its children."""
+
+class BOMEngine:
+    """Parent→child graph in CSR form (edges sorted by parent, file order kept) with per-assembly rollups."""
+    def __init__(self, bom: pd.DataFrame):
+        parents = bom["assembly"].astype(str).to_numpy(); children = bom["part"].astype(str).to_numpy()
+        self.names: list[str] = list(pd.unique(np.concatenate([parents, children])))
+        self.ids = {p: i for i, p in enumerate(self.names)}
+        n = len(self.names)
+        parent = np.fromiter((self.ids[p] for p in parents), dtype=np.int64, count=len(parents))
+        child = np.fromiter((self.ids[c] for c in children), dtype=np.int64, count=len(children))
+        order = np.argsort(parent, kind="stable")
+        num = lambda c: pd.to_numeric(bom[c], errors="coerce").fillna(0.0).to_numpy(dtype=float)[order] if c in bom else np.zeros(len(order))
+        self.parent, self.child = parent[order], child[order]
+        self.qty_per, self.unit_cost, self.std_cost, self.lead = num("qty_per"), num("unit_cost"), num("std_cost"), num("lead_time_days")
+        self.desc = (bom["desc"].astype(str).to_numpy() if "desc" in bom else np.full(len(order), ""))[order]
+        self.indptr = np.searchsorted(self.parent, np.arange(n + 1))
+        self.is_assembly = np.diff(self.indptr) > 0
+        self._rlines = np.argsort(self.child, kind="stable")          # child → its parent lines
+        self._rindptr = np.searchsorted(self.child[self._rlines], np.arange(n + 1))
+        self.height = self._heights()
+        self.material, self.std, self.lead_time = np.zeros(n), np.zeros(n), np.zeros(n)
+        self._rollup_all()
+
+    # ---------- graph ----------
+    def _where_used_lines(self, i: int) -> np.ndarray:
+        return self._rlines[self._rindptr[i]:self._rindptr[i + 1]]
+
+    def _heights(self) -> np.ndarray:
+        """Longest distance to a leaf (leaves 0), by Kahn's algorithm from the leaves up; leftovers are cycles."""
+        n = len(self.names)
+        pending = np.diff(self.indptr).copy(); height = np.zeros(n, dtype=np.int64)
+        q = deque(np.flatnonzero(pending == 0).tolist())
+        while q:
+            c = q.popleft()
+            for line in self._where_used_lines(c):
+                p = self.parent[line]
+                if height[c] + 1 > height[p]: height[p] = height[c] + 1
+                pending[p] -= 1
+                if pending[p] == 0: q.append(p)
+        if pending.any(): raise BOMCycleError("BOM cycle: " + " → ".join(self._cycle(pending > 0)))
+        return height
+
+    def _cycle(self, stuck: np.ndarray) -> list[str]:
+        node, seen, path = int(np.flatnonzero(stuck)[0]), {}, []
+        while node not in seen:
+            seen[node] = len(path); path.append(node)
+            kids = self.child[self.indptr[node]:self.indptr[node + 1]]
+            node = int(next(c for c in kids if stuck[c]))
+        return [self.names[i] for i in path[seen[node]:] + [node]]
+
+    # ---------- rollups ----------
+    def _line_values(self, lines):
+        c = self.child[lines]; sub = self.is_assembly[c]; q = self.qty_per[lines]
+        mat = q * np.where(sub, self.material[c], self.unit_cost[lines])
+        std = self.std_cost[lines] + np.where(sub, q * self.std[c], 0.0)
+        lead = self.lead[lines] + np.where(sub, self.lead_time[c], 0.0)
+        return mat, std, lead
+
+    def _rollup_all(self) -> None:
+        level = self.height[self.parent]
+        order = np.argsort(level, kind="stable"); bounds = np.searchsorted(level[order], np.arange(1, level.max(initial=0) + 2))
+        for h in range(len(bounds) - 1):   # all assemblies of one height at once; children are already final
+            lines = order[bounds[h]:bounds[h + 1]]
+            if not len(lines): continue
+            mat, std, lead = self._line_values(lines); p = self.parent[lines]
+            np.add.at(self.material, p, mat); np.add.at(self.std, p, std); np.maximum.at(self.lead_time, p, lead)
+
+    def _rollup(self, i: int) -> None:
+        mat, std, lead = self._line_values(np.arange(self.indptr[i], self.indptr[i + 1]))
+        self.material[i], self.std[i], self.lead_time[i] = mat.sum(), std.sum(), lead.max(initial=0.0)
+
+    def ancestors(self, part: str) -> list[str]:
+        """Every assembly that contains ``part`` at any depth, lowest level first."""
+        return [self.names[i] for i in self._ancestors(self._part(part))]
+
+    def _ancestors(self, i: int) -> list[int]:
+        seen, q = set(), deque([i])
+        while q:
+            for p in self.parent[self._where_used_lines(q.popleft())].tolist():
+                if p not in seen: seen.add(p); q.append(p)
+        return sorted(seen, key=lambda a: self.height[a])
+
+    def update_part(self, part: str, unit_cost: float | None = None, std_cost: float | None = None,
+                    lead_time_days: float | None = None) -> list[str]:
+        """Change a component on every line that uses it and re-roll only its ancestors (returned)."""
+        i = self._part(part); lines = self._where_used_lines(i)
+        if unit_cost is not None: self.unit_cost[lines] = unit_cost
+        if std_cost is not None: self.std_cost[lines] = std_cost
+        if lead_time_days is not None: self.lead[lines] = lead_time_days
+        touched = self._ancestors(i)
+        for a in touched: self._rollup(a)
+        return [self.names[a] for a in touched]
+
+    # ---------- lookups ----------
+    def _part(self, part: str) -> int:
+        i = self.ids.get(part)
+        if i is None: raise ValueError(f"Unknown part '{part}'")
+        return i
+
+    def _assembly(self, assembly: str) -> int:
+        i = self.ids.get(assembly)
+        if i is None or not self.is_assembly[i]: raise ValueError(f"BOM not found for '{assembly}'")
+        return i
+
+    def rollup(self, assembly: str) -> dict:
+        """Per-unit rolled-up costs and critical-path lead time."""
+        i = self._assembly(assembly)
+        return {"material_cost": float(self.material[i]), "std_cost": float(self.std[i]), "lead_time_days": float(self.lead_time[i])}
+
+    def line_items(self, assembly: str, qty: int = 1) -> list[dict]:
+        """Direct (single-level) lines with extended material cost for ``qty`` assemblies."""
+        i = self._assembly(assembly); lines = np.arange(self.indptr[i], self.indptr[i + 1])
+        mat, _, _ = self._line_values(lines); c = self.child[lines]
+        unit = np.where(self.is_assembly[c], self.material[c], self.unit_cost[lines])
+        return [{"part": self.names[ch], "desc": d, "qty_per": float(q), "unit_cost": float(u), "extended": float(m * qty)}
+                for ch, d, q, u, m in zip(c.tolist(), self.desc[lines], self.qty_per[lines], unit, mat)]
+
+    def explode(self, assembly: str, qty: float = 1.0, leaves_only: bool = True) -> dict[str, float]:
+        """Total quantity of every component needed for ``qty`` assemblies, each node visited once."""
+        root = self._assembly(assembly)
+        sub, q = {root}, deque([root])
+        while q:
+            for c in self.child[self.indptr[(p := q.popleft())]:self.indptr[p + 1]].tolist():
+                if c not in sub: sub.add(c); q.append(c)
+        need = dict.fromkeys(sub, 0.0); need[root] = float(qty)
+        for p in sorted(sub, key=lambda a: -self.height[a]):   # parents before children
+            for line in range(self.indptr[p], self.indptr[p + 1]):
+                need[self.child[line]] += need[p] * self.qty_per[line]
+        return {self.names[i]: v for i, v in need.items() if i != root and not (leaves_only and self.is_assembly[i])}
+
+    def stats(self) -> dict:
+        return {"parts": len(self.names), "lines": len(self.parent), "assemblies": int(self.is_assembly.sum()),
+                "depth": int(self.height.max(initial=0))}
+
+class WhereUsed:
+    """Reverse BOM index (part → assemblies that use it, at any depth) joined to order and work-order rows by sku.
+
+    BOM edges are kept as a multiset, so ``sync_bom`` applies only the rows added
+    or removed since the last sync and ``add``/``remove`` take single rows.
+    Ancestor sets are memoized per part and dropped on any edge change.
+    """
+    def __init__(self):
+        self._edges: Counter = Counter()          # (assembly, part) → bom rows
+        self._built: Counter = Counter()          # assembly → bom rows
+        self.parents: dict[str, set[str]] = {}
+        self._memo: dict[str, dict[str, int]] = {}
+        self._tables: dict[str, tuple[pd.DataFrame, dict]] = {}
+
+    # ---------- updates ----------
+    def add(self, assembly: str, part: str, n: int = 1) -> None:
+        self._edges[(assembly, part)] += n; self._built[assembly] += n
+        self.parents.setdefault(part, set()).add(assembly); self._memo.clear()
+
+    def remove(self, assembly: str, part: str, n: int = 1) -> None:
+        have = self._edges.get((assembly, part), 0)
+        if n > have: raise ValueError(f"Cannot remove {n} BOM row(s) {assembly} → {part}: the index holds {have}")
+        self._edges[(assembly, part)] -= n; self._built[assembly] -= n
+        if self._edges[(assembly, part)] <= 0:
+            del self._edges[(assembly, part)]
+            self.parents.get(part, set()).discard(assembly); self._memo.clear()
+        if self._built[assembly] <= 0: del self._built[assembly]
+
+    def sync_bom(self, bom: pd.DataFrame) -> tuple[int, int]:
+        """Bring the index in line with a full BOM frame; returns (rows added, rows removed)."""
+        new = Counter(zip(bom["assembly"].astype(str), bom["part"].astype(str)))
+        added, removed = new - self._edges, self._edges - new
+        for (a, p), n in removed.items(): self.remove(a, p, n)
+        for (a, p), n in added.items(): self.add(a, p, n)
+        return sum(added.values()), sum(removed.values())
+
+    def set_table(self, name: str, df: pd.DataFrame, key: str = "sku") -> None:
+        self._tables[name] = (df, df.groupby(df[key].astype(str)).indices)
+
+    # ---------- queries ----------
+    def assemblies(self, part: str) -> dict[str, int]:
+        """Every assembly containing ``part``, with its level above the part (1 = direct parent)."""
+        hit = self._memo.get(part)
+        if hit is None:
+            hit, q = {}, deque([(part, 0)])
+            while q:
+                node, d = q.popleft()
+                for a in self.parents.get(node, ()):
+                    if a not in hit: hit[a] = d + 1; q.append((a, d + 1))
+            self._memo[part] = hit
+        return hit
+
+    def rows(self, name: str, skus) -> pd.DataFrame:
+        df, groups = self._tables[name]
+        idx = [groups[s] for s in skus if s in groups]
+        return df.iloc[np.sort(np.concatenate(idx))] if idx else df.iloc[:0]
+
+    def known(self, part: str) -> bool:
+        return part in self.parents or part in self._built or any(part in g for _, g in self._tables.values())
@@ -0,0 +1,304 @@
+# utils/changeover.py
+"""Sequence-dependent changeover optimizer.
+
+**Matrix.** ``ChangeoverMatrix.learn`` estimates the minutes to switch a line
+from SKU *a* to SKU *b*. Each ``Changeover`` event in ``downtime_log.csv`` is
+attributed to the work orders around it on the same line: the last one to end
+before the event and the first one to start after it. Observed pairs are sparse,
+so each cell is shrunk towards a smooth prior:
+
+- prior = line mean + from-SKU effect + to-SKU effect, with the effects pooled
+  over all lines;
+- cell = (Σ observed + ``PRIOR_WEIGHT`` × prior) / (n + ``PRIOR_WEIGHT``).
+
+The diagonal is 0. The matrix is one dense ``float32`` array of shape
+lines × SKUs × SKUs. At 500 SKUs that is about 1 MB per line.
+
+**Sequencing.** Open work orders of a line are batched into one lot per SKU.
+The lots are ordered as an open asymmetric TSP path that starts from the SKU
+currently running, if there is one. The order is built by nearest neighbour,
+then improved by or-opt moves: segments of 1–3 lots are moved, and every
+insertion point is priced with one numpy expression. Up to ``MAX_KICKS``
+double-bridge kicks followed by or-opt (iterated local search) keep improving it
+(until ``STALL_KICKS`` kicks in a row find nothing better), and the best path
+so far is always returned. The search stops on the kick cap with a fixed seed,
+so the same data always gives the same plan; the wall-clock ``budget_s`` is only
+a safety cut-off, and hitting it is logged and flagged as ``cut_off``. The baseline is the current plan
+order (by planned_start), priced with the same matrix.
+``python -m utils.changeover --bench`` runs synthetic lines with hundreds of SKUs.
+"""
+from __future__ import annotations
+import argparse, logging, threading, time
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+
+PRIOR_WEIGHT = 3.0
+DEFAULT_MIN = 30.0            # used only when the log has no changeover events at all
+MAX_GAP_H = 12.0              # a work order further than this from the event is not its neighbour
+STALL_KICKS = 100             # stop the kicks early after this many without a new best
+MAX_KICKS = 300               # kicks per line; the search is capped on kicks, not on time
+SAFETY_S = 5.0                # wall-clock cut-off for one line; only reached on a badly overloaded host
+OPEN_STATUSES = ("Planned", "In-Progress")
+log = logging.getLogger(__name__)
+
+# ---------- matrix ----------
+@dataclass
+class ChangeoverMatrix:
+    skus: list[str]
+    lines: list[str]
+    minutes: np.ndarray                       # (lines, skus, skus) float32, from-row → to-column
+    observed: np.ndarray                      # same shape, int32 event counts
+    ids: dict[str, int] = field(init=False)
+
+    def __post_init__(self):
+        self.ids = {s: i for i, s in enumerate(self.skus)}
+
+    def hours(self, line: str) -> np.ndarray:
+        """The line's matrix in hours (the mean over lines for a line without history)."""
+        m = self.minutes[self.lines.index(line)] if line in self.lines else self.minutes.mean(axis=0)
+        return m / 60.0
+
+    def get(self, line: str, a: str, b: str) -> float:
+        return float(self.hours(line)[self.ids[a], self.ids[b]])
+
+    @classmethod
+    def learn(cls, downtime: pd.DataFrame, work_orders: pd.DataFrame, prior_weight: float = PRIOR_WEIGHT) -> "ChangeoverMatrix":
+        skus = sorted(work_orders["sku"].astype(str).unique()); ids = {s: i for i, s in enumerate(skus)}
+        lines = sorted(set(work_orders["line"].astype(str)) | set(downtime["line"].astype(str)))
+        n, L = len(skus), len(lines)
+        ev = downtime[downtime["cause"] == "Changeover"]
+        pairs = []   # (line, from, to, minutes)
+        for li, line in enumerate(lines):
+            e = ev[ev["line"] == line]; w = work_orders[work_orders["line"] == line]
+            if e.empty or w.empty: continue
+            t = e["start"].to_numpy(); sku = w["sku"].astype(str).to_numpy()
+            by_end = np.argsort(w["planned_end"].to_numpy(), kind="stable"); ends = w["planned_end"].to_numpy()[by_end]
+            by_start = np.argsort(w["planned_start"].to_numpy(), kind="stable"); starts = w["planned_start"].to_numpy()[by_start]
+            before = np.searchsorted(ends, t, side="right") - 1; after = np.searchsorted(starts, t, side="left")
+            ok = (before >= 0) & (after < len(starts))
+            gap = np.timedelta64(int(MAX_GAP_H * 3600), "s")
+            for k in np.flatnonzero(ok):
+                if t[k] - ends[before[k]] > gap or starts[after[k]] - t[k] > gap: continue
+                a, b = sku[by_end[before[k]]], sku[by_start[after[k]]]
+                if a != b: pairs.append((li, ids[a], ids[b], float(e["duration_min"].iloc[k])))
+        minutes = np.zeros((L, n, n), dtype=np.float32); observed = np.zeros((L, n, n), dtype=np.int32)
+        line_mean = ev.groupby("line")["duration_min"].mean().reindex(lines).to_numpy(dtype=float)
+        mu = float(ev["duration_min"].mean()) if len(ev) else DEFAULT_MIN
+        line_mean = np.where(np.isnan(line_mean), mu, line_mean)
+        if pairs:
+            p = np.asarray(pairs); li, a, b, m = p[:, 0].astype(int), p[:, 1].astype(int), p[:, 2].astype(int), p[:, 3]
+            resid = m - line_mean[li]
+            shrink = lambda idx: np.bincount(idx, resid, n) / (np.bincount(idx, minlength=n) + prior_weight)
+            prior = line_mean[:, None, None] + shrink(a)[None, :, None] + shrink(b)[None, None, :]
+            total = np.zeros((L, n, n)); np.add.at(total, (li, a, b), m); np.add.at(observed, (li, a, b), 1)
+            minutes[:] = (total + prior_weight * prior) / (observed + prior_weight)
+        else:
+            minutes[:] = line_mean[:, None, None]
+        minutes = np.maximum(minutes, 1.0); minutes[:, np.arange(n), np.arange(n)] = 0.0
+        return cls(skus, lines, minutes, observed)
+
+    def stats(self) -> dict:
+        return {"lines": len(self.lines), "skus": len(self.skus), "observed_pairs": int((self.observed > 0).sum()),
+                "events": int(self.observed.sum()), "bytes": int(self.minutes.nbytes + self.observed.nbytes)}
+
+# ---------- path solver ----------
+def path_cost(C: np.ndarray, seq: np.ndarray) -> float:
+    return float(C[seq[:-1], seq[1:]].sum()) if len(seq) > 1 else 0.0
+
+def nearest_neighbour(C: np.ndarray, nodes: np.ndarray, start: int | None) -> np.ndarray:
+    left = nodes[nodes != start] if start is not None else nodes
+    if start is None:   # open with the lot that is cheapest to leave
+        k = int(np.argmin(C[np.ix_(left, left)].sum(axis=1))); start = int(left[k]); left = np.delete(left, k)
+    cur, out = int(start), [int(start)]
+    while len(left):
+        k = int(np.argmin(C[cur, left])); cur = int(left[k]); out.append(cur); left = np.delete(left, k)
+    return np.asarray(out, dtype=np.int64)
+
+def or_opt(C: np.ndarray, seq: np.ndarray, fixed: int, deadline: float) -> tuple[np.ndarray, int]:
+    """Move segments of 1–3 nodes to their best insertion point until no move improves (or time is up)."""
+    t = seq.copy(); moves = 0; improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for seg in (1, 2, 3):
+            i = fixed
+            while i + seg <= len(t):
+                if moves % 64 == 63 and time.perf_counter() > deadline: return t, moves
+                s0, se = t[i], t[i + seg - 1]
+                p = t[i - 1] if i > 0 else -1; nx = t[i + seg] if i + seg < len(t) else -1
+                gain = (C[p, s0] if p >= 0 else 0.0) + (C[se, nx] if nx >= 0 else 0.0) - (C[p, nx] if p >= 0 and nx >= 0 else 0.0)
+                r = np.concatenate([t[:i], t[i + seg:]])
+                js = np.arange(fixed, len(r) + 1)                                   # insert before r[j]
+                prv = np.where(js > 0, r[np.maximum(js - 1, 0)], -1); nxt = np.where(js < len(r), r[np.minimum(js, len(r) - 1)], -1)
+                add = np.where(prv >= 0, C[prv, s0], 0.0) + np.where(nxt >= 0, C[se, nxt], 0.0) - np.where((prv >= 0) & (nxt >= 0), C[prv, nxt], 0.0)
+                add[js == i] = np.inf                                              # same place
+                k = int(np.argmin(add))
+                if add[k] - gain < -1e-9:
+                    j = js[k]; t = np.concatenate([r[:j], t[i:i + seg], r[j:]]); moves += 1; improved = True
+                else:
+                    i += 1
+        if not improved: break
+    return t, moves
+
+def double_bridge(seq: np.ndarray, fixed: int, rng: np.random.Generator) -> np.ndarray:
+    """A|B|C|D → A|C|B|D on the movable tail; no segment is reversed, so it suits asymmetric costs."""
+    n = len(seq) - fixed
+    if n < 4: return seq.copy()
+    a, b, c = np.sort(rng.choice(np.arange(1, n), 3, replace=False)) + fixed
+    return np.concatenate([seq[:a], seq[b:c], seq[a:b], seq[c:]])
+
+def solve_path(C: np.ndarray, nodes: np.ndarray, start: int | None = None, max_kicks: int = MAX_KICKS,
+               seed: int = 0, budget_s: float = SAFETY_S) -> tuple[np.ndarray, dict]:
+    """Cheapest open path over ``nodes`` (starting at ``start`` if given) after at most ``max_kicks`` kicks."""
+    t0 = time.perf_counter(); deadline = t0 + budget_s; rng = np.random.default_rng(seed)
+    C = np.asarray(C, dtype=np.float64)   # float32 deltas can "improve" in a cycle
+    fixed = 1 if start is not None else 0
+    best = nearest_neighbour(C, np.asarray(nodes, dtype=np.int64), start)
+    nn_cost = path_cost(C, best)
+    best, moves = or_opt(C, best, fixed, deadline); best_cost = path_cost(C, best); kicks = 0
+    cur, cur_cost = best, best_cost; last = 0
+    while kicks < max_kicks and len(best) - fixed >= 4 and kicks - last < STALL_KICKS and time.perf_counter() < deadline:
+        cand, m = or_opt(C, double_bridge(cur, fixed, rng), fixed, deadline); moves += m; kicks += 1
+        c = path_cost(C, cand)
+        if c <= cur_cost + 1e-9: cur, cur_cost = cand, c
+        if c < best_cost - 1e-9: best, best_cost, last = cand, c, kicks
+    cut_off = time.perf_counter() >= deadline
+    if cut_off: log.warning("changeover search cut off after %.2fs (%d kicks); the plan is not reproducible", budget_s, kicks)
+    return best, {"nn_cost": nn_cost, "cost": best_cost, "moves": moves, "kicks": kicks, "cut_off": cut_off,
+                  "runtime_s": time.perf_counter() - t0}
+
+# ---------- per line ----------
+@dataclass
+class ChangeoverPlan:
+    line: str
+    lots: pd.DataFrame                        # sku, work_orders, run_h, changeover_h (into this lot), in run order
+    changeovers_before: int
+    changeovers_after: int
+    changeover_h_before: float
+    changeover_h_after: float
+    horizon_days: float
+    solver: dict
+
+    @property
+    def sequence(self) -> list[str]: return self.lots["sku"].tolist()
+
+    @property
+    def saved_h(self) -> float: return self.changeover_h_before - self.changeover_h_after
+
+    @property
+    def saved_h_per_day(self) -> float: return self.saved_h / self.horizon_days
+
+    def summary(self) -> dict:
+        return {"line": self.line, "lots": len(self.lots), "sequence": self.sequence,
+                "changeovers_before": self.changeovers_before, "changeovers_after": self.changeovers_after,
+                "changeover_h_before": round(self.changeover_h_before, 2), "changeover_h_after": round(self.changeover_h_after, 2),
+                "saved_h": round(self.saved_h, 2), "horizon_days": round(self.horizon_days, 2),
+                "saved_h_per_day": round(self.saved_h_per_day, 2), "kicks": self.solver["kicks"],
+                "cut_off": self.solver["cut_off"], "runtime_s": round(self.solver["runtime_s"], 3)}
+
+def optimize_line(matrix: ChangeoverMatrix, work_orders: pd.DataFrame, line: str, max_kicks: int = MAX_KICKS,
+                  seed: int = 0, budget_s: float = SAFETY_S) -> ChangeoverPlan:
+    """Batch the line's open work orders into one lot per SKU and order the lots for least changeover time."""
+    w = work_orders[(work_orders["line"] == line) & work_orders["status"].isin(OPEN_STATUSES)].sort_values("planned_start", kind="stable")
+    C = matrix.hours(line)
+    if w.empty:
+        return ChangeoverPlan(line, pd.DataFrame(columns=["sku", "work_orders", "run_h", "changeover_h"]), 0, 0, 0.0, 0.0, 1.0,
+                              {"nn_cost": 0.0, "cost": 0.0, "moves": 0, "kicks": 0, "cut_off": False, "runtime_s": 0.0})
+    ids = w["sku"].astype(str).map(matrix.ids).to_numpy()
+    base = C[ids[:-1], ids[1:]]
+    running = w.loc[w["status"] == "In-Progress", "sku"].astype(str)
+    start = matrix.ids[running.iloc[0]] if len(running) else None
+    seq, info = solve_path(C, np.unique(ids), start, max_kicks, seed, budget_s)
+    run_h = ((w["planned_end"] - w["planned_start"]) / pd.Timedelta(hours=1)).groupby(w["sku"].astype(str)).sum()
+    wos = w.groupby(w["sku"].astype(str))["wo_id"].apply(list)
+    names = [matrix.skus[i] for i in seq]
+    lots = pd.DataFrame({"sku": names, "work_orders": [wos[s] for s in names], "run_h": run_h.reindex(names).to_numpy(),
+                         "changeover_h": np.r_[0.0, C[seq[:-1], seq[1:]]]})
+    horizon = max(1.0, (w["planned_end"].max() - w["planned_start"].min()) / pd.Timedelta(days=1))
+    return ChangeoverPlan(line, lots, int((ids[1:] != ids[:-1]).sum()), len(seq) - 1, float(base.sum()), info["cost"], horizon, info)
+
+# ---------- cached over the shared tables ----------
+# The lock only guards the memo; learning and solving run outside it, so /metrics never waits on a solve.
+_memo: dict = {}; _memo_lock = threading.Lock()
+
+def current_matrix() -> ChangeoverMatrix:
+    from utils.data import tables
+    key = (tables.entry("downtime_log").gen, tables.entry("work_orders").gen)
+    with _memo_lock:
+        if _memo.get("matrix_key") == key: return _memo["matrix"]
+    matrix = ChangeoverMatrix.learn(tables.get("downtime_log"), tables.get("work_orders"))
+    with _memo_lock:
+        if _memo.get("matrix_key") != key: _memo.update(matrix_key=key, matrix=matrix, plans={})
+        return _memo["matrix"]
+
+def current_plan(line: str) -> ChangeoverPlan:
+    """Plan for one known line over data/, recomputed only when downtime_log or work_orders change."""
+    from utils.data import tables
+    matrix = current_matrix()
+    if line not in matrix.lines: raise KeyError(f"Unknown line: {line}")
+    with _memo_lock:
+        plan = _memo["plans"].get(line) if _memo.get("matrix") is matrix else None
+    if plan is None:
+        plan = optimize_line(matrix, tables.get("work_orders"), line)
+        with _memo_lock:
+            if _memo.get("matrix") is matrix: plan = _memo["plans"].setdefault(line, plan)
+    return plan
+
+def recent_reduction() -> dict[str, dict]:
+    """Per line: recent changeover downtime (the KPI window) and the share of it batching + sequencing removes.
+
+    The plan prices every switch in the planned order, but the line runs several
+    work orders in parallel, so the absolute planned hours overstate it. Only
+    the planned fraction saved is applied to the changeover downtime logged in
+    the window.
+    """
+    from utils.data import tables
+    from utils.kpis import WINDOW_DAYS
+    down = tables.get("downtime_log")
+    recent = down[down["start"] >= down["start"].max() - pd.Timedelta(days=WINDOW_DAYS)]
+    logged = recent[recent["cause"] == "Changeover"].groupby("line")["duration_min"].sum() / 60.0
+    out = {}
+    for line in sorted(tables.get("work_orders")["line"].astype(str).unique()):
+        plan = current_plan(line); frac = plan.saved_h / plan.changeover_h_before if plan.changeover_h_before else 0.0
+        h = float(logged.get(line, 0.0))
+        out[line] = {"changeover_h": h, "saved_frac": frac, "saved_h": h * frac, "saved_h_per_day": h * frac / (WINDOW_DAYS + 1)}
+    return out
+
+# ---------- benchmark ----------
+def synthetic(n_skus: int = 300, n_families: int = 12, n_wos: int = 1_000, seed: int = 0):
+    """Random line: cheap switches inside a family (5–20 min), expensive across (45–120 min), random plan order."""
+    rng = np.random.default_rng(seed)
+    fam = rng.integers(n_families, size=n_skus)
+    same = fam[:, None] == fam[None, :]
+    C = np.where(same, rng.uniform(5, 20, (n_skus, n_skus)), rng.uniform(45, 120, (n_skus, n_skus))).astype(np.float32)
+    np.fill_diagonal(C, 0.0)
+    skus = [f"SKU-{i:03d}" for i in range(n_skus)]
+    start = pd.Timestamp("2025-10-01 06:00") + pd.to_timedelta(np.sort(rng.uniform(0, 24 * 30, n_wos)).round(), unit="h")
+    wos = pd.DataFrame({"wo_id": np.arange(n_wos), "sku": np.asarray(skus)[rng.integers(n_skus, size=n_wos)], "op": 10,
+                        "planned_start": start, "planned_end": start + pd.to_timedelta(rng.integers(2, 9, n_wos), unit="h"),
+                        "status": "Planned", "line": "L1"})
+    return ChangeoverMatrix(skus, ["L1"], C[None], np.zeros((1, n_skus, n_skus), dtype=np.int32)), wos
+
+def bench(n_skus: int = 300, kicks=(0, 30, 300, 3_000)) -> pd.DataFrame:
+    matrix, wos = synthetic(n_skus)
+    rows = []
+    for k in kicks:
+        p = optimize_line(matrix, wos, "L1", max_kicks=k, budget_s=60.0)
+        rows.append({"max_kicks": k, "runtime_s": round(p.solver["runtime_s"], 3), "lots": len(p.lots), "moves": p.solver["moves"],
+                     "kicks": p.solver["kicks"], "nn_h": round(p.solver["nn_cost"], 1), "after_h": round(p.changeover_h_after, 1),
+                     "before_h": round(p.changeover_h_before, 1)})
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Sequence-dependent changeover optimizer")
+    ap.add_argument("--bench", action="store_true", help="path cost vs kicks on a synthetic line")
+    ap.add_argument("--skus", type=int, default=300)
+    ap.add_argument("--kicks", type=int, default=MAX_KICKS)
+    args = ap.parse_args()
+    if args.bench:
+        print(bench(args.skus).to_string(index=False))
+    else:
+        from utils.data import load_csv
+        wo = load_csv("work_orders"); m = ChangeoverMatrix.learn(load_csv("downtime_log"), wo)
+        print(m.stats())
+        for line in sorted(wo["line"].astype(str).unique()): print(optimize_line(m, wo, line, args.kicks).summary())
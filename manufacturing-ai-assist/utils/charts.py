@@ -1,5 +1,7 @@
-
+import pandas as pd
 import streamlit as st
+from utils import timeseries
+TREND_LABELS = {"throughput": "Throughput/day", "on_time": "On-time %", "defect_rate": "Defect %", "downtime": "Downtime (h)"}
 def kpi(label, value, suffix=""): st.metric(label, f"{value}{suffix}")
 def kpi_row(k):
     c1,c2,c3,c4,c5 = st.columns(5)
@@ -8,3 +10,8 @@ def kpi_row(k):
     with c3: kpi("Defect %", f"{k['defect_rate_pct']:.2f}", "%")
     with c4: kpi("Downtime (h)", f"{k['downtime_hours']:.1f}")
     with c5: kpi("Inventory risks", f"{k['inventory_risk_count']}")
+def trend_chart(metric, days=30, line=None, points=300):
+    """Downsampled daily series from utils.timeseries (same cache as GET /timeseries/{metric})."""
+    s = timeseries.query(metric, line=line, days=days, points=points)
+    df = pd.DataFrame(s["points"], columns=["day", TREND_LABELS[metric]])
+    st.line_chart(df.assign(day=pd.to_datetime(df["day"])).set_index("day"))
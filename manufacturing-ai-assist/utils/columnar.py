@@ -0,0 +1,107 @@
+# utils/columnar.py
+"""Optional Arrow IPC backend for the data/ tables.
+
+Convert once with ``python -m utils.columnar`` (needs ``pyarrow``). Files land in
+``data/columnar/<table>.arrow``, uncompressed so loads can memory-map them and
+read only the requested columns. Loaders fall back to the CSV when pyarrow is
+missing or the CSV is newer than its Arrow copy.
+
+Frames come back with the CSV path's dtypes: timestamps keep the resolution
+``pd.to_datetime`` picked at conversion, strings use pandas' default string
+dtype, and an int64 column with gaps comes back as float64 with NaN.
+"""
+from __future__ import annotations
+import os, sys
+from pathlib import Path
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+except ImportError:  # optional dependency
+    pa = feather = ipc = None
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+SUBDIR = "columnar"
+
+# Explicit per-table schemas: "ts" columns are parsed as timestamps, others cast as named.
+SCHEMAS: dict[str, dict[str, str]] = {
+    "orders": {"order_id": "int64", "order_date": "ts", "sku": "string", "qty_produced": "int64",
+               "promised_ship_date": "ts", "actual_ship_date": "ts", "line": "string"},
+    "quality_inspections": {"inspection_id": "int64", "date": "ts", "sku": "string", "defect_family": "string",
+                            "units_inspected": "int64", "defects_found": "int64", "line": "string"},
+    "downtime_log": {"event_id": "int64", "start": "ts", "end": "ts", "duration_min": "int64",
+                     "asset": "string", "cause": "string", "line": "string"},
+    "inventory": {"sku": "string", "description": "string", "on_hand": "int64", "safety_stock": "int64", "uom": "string"},
+    "work_orders": {"wo_id": "int64", "sku": "string", "op": "int64", "planned_start": "ts", "planned_end": "ts",
+                    "status": "string", "line": "string"},
+    "bom": {"assembly": "string", "part": "string", "desc": "string", "qty_per": "float64",
+            "unit_cost": "float64", "std_cost": "float64", "lead_time_days": "int64"},
+    "products": {"sku": "string", "desc": "string", "family": "string", "recent_demand": "int64"},
+    "purchase_orders": {"po_id": "string", "sku": "string", "supplier": "string", "qty": "int64", "order_date": "ts",
+                        "eta_date": "ts", "status": "string"},
+    "prospects": {"account": "string", "contact": "string", "email": "string", "last_quote_id": "string",
+                  "last_quote_date": "ts"},
+}
+
+def enabled() -> bool:
+    return pa is not None and os.getenv("MFG_COLUMNAR", "1") != "0"
+
+def arrow_path(name: str, data_dir: Path = DATA_DIR) -> Path:
+    return Path(data_dir) / SUBDIR / f"{name}.arrow"
+
+def available(name: str, data_dir: Path = DATA_DIR) -> bool:
+    """True if an Arrow copy exists and is at least as new as the CSV."""
+    if not enabled(): return False
+    fp, csv = arrow_path(name, data_dir), Path(data_dir) / f"{name}.csv"
+    if not fp.exists(): return False
+    return not csv.exists() or fp.stat().st_mtime_ns >= csv.stat().st_mtime_ns
+
+def resolve(name: str, data_dir: Path = DATA_DIR) -> Path:
+    return arrow_path(name, data_dir) if available(name, data_dir) else Path(data_dir) / f"{name}.csv"
+
+_STR = pd.Series([""]).dtype   # what read_csv gives a text column
+
+def read_arrow(fp: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """Memory-mapped read of only ``columns`` (unknown names are skipped), in the CSV path's dtypes."""
+    if columns is not None:
+        with pa.memory_map(str(fp), "r") as src: names = ipc.open_file(src).schema.names
+        columns = [c for c in columns if c in names]
+    table = feather.read_table(str(fp), columns=columns, memory_map=True)
+    if columns is not None: table = table.select(columns)   # in the order asked for
+    strings = {pa.string(): _STR, pa.large_string(): _STR} if _STR != object else {}
+    return table.to_pandas(types_mapper=strings.get)
+
+def read_table(name: str, columns: list[str] | None = None, data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    return read_arrow(arrow_path(name, data_dir), columns)
+
+def _arrow_schema(df: pd.DataFrame, spec: dict[str, str]):
+    kinds = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64()}
+    kind = lambda c: pa.from_numpy_dtype(df[c].dtype) if spec[c] == "ts" else kinds[spec[c]]   # the unit the CSV path infers
+    return pa.schema([(c, kind(c)) if c in spec else (c, pa.Schema.from_pandas(df[[c]], preserve_index=False).field(c).type)
+                      for c in df.columns])
+
+def convert(name: str, data_dir: Path = DATA_DIR) -> Path:
+    """Parse data/<name>.csv once with its explicit schema and write the Arrow IPC copy."""
+    if pa is None: raise RuntimeError("pyarrow is required for the columnar backend (pip install pyarrow)")
+    spec = SCHEMAS.get(name, {})
+    df = pd.read_csv(Path(data_dir) / f"{name}.csv")
+    for c, kind in spec.items():
+        if c not in df.columns: continue
+        if kind == "ts": df[c] = pd.to_datetime(df[c], errors="coerce")
+        elif kind == "string": df[c] = df[c].astype(_STR)
+    table = pa.Table.from_pandas(df, schema=_arrow_schema(df, spec), preserve_index=False).replace_schema_metadata()
+    fp = arrow_path(name, data_dir); fp.parent.mkdir(exist_ok=True)
+    tmp = fp.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, fp)
+    return fp
+
+def convert_all(data_dir: Path = DATA_DIR, names: list[str] | None = None) -> list[Path]:
+    return [convert(n, data_dir) for n in (names or SCHEMAS) if (Path(data_dir) / f"{n}.csv").exists()]
+
+if __name__ == "__main__":
+    for fp in convert_all(names=sys.argv[1:] or None):
+        print(f"wrote {fp} ({fp.stat().st_size:,} bytes)")
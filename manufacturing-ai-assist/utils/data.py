@@ -1,16 +1,62 @@
-
+import os, threading
 import pandas as pd
 from pathlib import Path
+from utils import columnar
+from utils.kpis import KPIEngine
+from utils.table_cache import TableCache
 DATA_DIR = Path(__file__).resolve().parents[1] / 'data'
-def load_csv(name:str)->pd.DataFrame:
-    df = pd.read_csv(DATA_DIR / f"{name}.csv")
+def read_table(src)->pd.DataFrame:
+    df = pd.read_csv(src)
     for col in df.columns:
         if any(tag in col.lower() for tag in ['date','start','end','planned']):
             df[col] = pd.to_datetime(df[col])
     return df
+def read_coerced(src)->pd.DataFrame:
+    """Sales-side tables (bom/products/prospects): an unparseable date becomes NaT instead of failing the load."""
+    df = pd.read_csv(src)
+    for col in df.columns:
+        if 'date' in col.lower():
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+SALES_TABLES = ('bom', 'products', 'prospects')
+# One parse per file change for the whole process (every Streamlit session, or the API), LRU-capped at MFG_CACHE_MB.
+# data/columnar/<name>.arrow (see utils.columnar) is preferred over the CSV when present and fresh.
+tables = TableCache(DATA_DIR, read_table, check_interval=float(os.getenv("MFG_TABLE_CHECK_S", "1.0")),
+                    resolve=lambda name: columnar.resolve(name, DATA_DIR), readers={".arrow": columnar.read_arrow},
+                    loaders={name: read_coerced for name in SALES_TABLES},
+                    max_bytes=int(float(os.getenv("MFG_CACHE_MB", "512")) * 2**20))
+def load_csv(name:str, columns:list[str]|None=None)->pd.DataFrame:
+    """Shared, read-only frame for data/<name>.csv (copy before mutating)."""
+    df = tables.get(name)
+    return df[columns] if columns else df
 def load_all_data():
     return (load_csv('orders'),
             load_csv('quality_inspections'),
             load_csv('downtime_log'),
             load_csv('inventory'),
             load_csv('work_orders'))
+KPI_PARTS = {'orders': 'orders', 'quality': 'quality_inspections', 'down': 'downtime_log'}
+def fold_kpi_tables(engine:KPIEngine, seen:dict)->KPIEngine:
+    """Fold rows appended since ``seen`` (part -> (gen, rows)) into ``engine``; a rewritten table is refolded from scratch."""
+    for part, name in KPI_PARTS.items():
+        e = tables.entry(name); last = seen.get(part)
+        if last and last[0] == e.gen: continue
+        if last is None or e.base_gen > last[0]:
+            engine.reset(part); engine.fold(**{part: e.df})
+        else:
+            engine.fold(**{part: e.df.iloc[last[1]:]})
+        seen[part] = (e.gen, len(e.df))
+    return engine
+_kpi_engine = KPIEngine(); _kpi_seen: dict = {}; _kpi_lock = threading.Lock()
+def cached_kpis()->dict:
+    """compute_kpis over the shared tables, folding forward only the rows appended since the last call.
+    inventory_risk_count is the MRP projection (utils.mrp), the same figure /metrics reports."""
+    from utils.mrp import current_plan
+    with _kpi_lock:
+        fold_kpi_tables(_kpi_engine, _kpi_seen)
+        inv = tables.entry('inventory')
+        if _kpi_seen.get('inventory') != inv.gen:
+            _kpi_engine.set_inventory(inv.df); _kpi_seen['inventory'] = inv.gen
+        k = _kpi_engine.kpis()
+    k['inventory_risk_count'] = current_plan().risk_count()
+    return k
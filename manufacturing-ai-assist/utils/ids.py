@@ -0,0 +1,21 @@
+# utils/ids.py
+"""Quote / event ids shared by the API's sales log and the offline quote generator."""
+from __future__ import annotations
+import os, secrets, threading, time
+
+class IdGen:
+    """Collision-free, time-ordered ids: ``<prefix>-<ms>-<node>``.
+
+    ms never repeats within a generator; ``node`` is 32 random bits drawn per
+    process (redrawn after a fork), so workers, containers and hosts that share
+    a sales log cannot collide the way pid-derived suffixes could.
+    """
+    def __init__(self):
+        self._last = 0; self._lock = threading.Lock(); self._pid = None; self.node = ""
+    def next(self, prefix: str = "Q") -> str:
+        with self._lock:
+            if self._pid != os.getpid(): self._pid, self.node = os.getpid(), secrets.token_hex(4)
+            self._last = max(int(time.time() * 1000), self._last + 1)
+            return f"{prefix}-{self._last}-{self.node}"
+
+quote_ids = IdGen()   # one per process
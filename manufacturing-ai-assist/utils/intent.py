@@ -0,0 +1,257 @@
+# manufacturing-ai-assist/utils/intent.py
+"""Intent router and entity extractor for the chat assistant.
+
+Trigger phrases and the gazetteers (SKUs, assemblies, parts, lines and
+prospect accounts, loaded from the data tables) are compiled into one
+Aho-Corasick automaton. ``parse`` walks the prompt once. The walk collects
+every trigger hit, every entity mention and the free-standing numbers.
+Entities use leftmost-longest matching on word boundaries, so 'sku-1' never
+fires inside 'sku-19'. Numbers that sit inside an entity are not reused as
+quantities. Codes the automaton missed but that carry a gazetteer prefix
+('sku-1', 'SKU-45') are matched on their number, so 'sku-1' resolves to
+'SKU-01'. A code with no match is an unknown entity, and a slot it would
+fill is reported in ``missing`` (with the code in ``unknown``) instead of
+taking the slot's default.
+
+When several intents fire, the one whose rule matched the most trigger
+characters wins, with ties going to the earlier entry in ``INTENTS``. So
+'status of the expedite po' is an expedite, not a KPI brief. The same router
+serves the Chat page and ``POST /chat/intent``:
+
+    python -m utils.intent "expedite po for sku 19 by 3 days"
+    python -m utils.intent --bench --prompts 200000
+"""
+from __future__ import annotations
+import argparse, json, re, threading, time
+from collections import deque
+from dataclasses import dataclass, field, asdict
+import numpy as np
+
+BOS = "\x02"   # prepended to every prompt so a rule can anchor at the start ('^quote')
+
+# ---------- intents ----------
+# name, persona, rules (a rule fires when all of its phrases occur; a leading '^' anchors it at the start) and slots.
+# slot → (entity kinds accepted, default); slots take the first unused matching entity, 'number' = a free-standing number.
+INTENTS: list[dict] = [
+    {"name": "kpi_brief", "persona": None, "rules": [("kpi",), ("brief",), ("status",)], "slots": {}},
+    {"name": "quote", "persona": "Sales AE", "rules": [("^quote",), ("quote for",)],
+     "slots": {"assembly": (("assembly", "sku", "part"), None), "qty": (("number",), None)}},
+    {"name": "follow_up", "persona": "Sales AE", "rules": [("follow up",), ("follow-up",)],
+     "slots": {"account": (("account",), "ACME Mfg")}},
+    {"name": "propose_product", "persona": "Sales AE", "rules": [("propose",), ("suggest product",), ("cross sell",), ("cross-sell",)],
+     "slots": {"assembly": (("assembly",), "ASSY-100")}},
+    {"name": "expedite_po", "persona": "Supply Chain Manager", "rules": [("expedite po",), ("expedite", "po")],
+     "slots": {"sku": (("sku", "assembly", "part"), "SKU-19"), "days": (("number",), 2)}},
+    {"name": "alternate_supplier", "persona": "Supply Chain Manager", "rules": [("alternate supplier",), ("alt supplier",)],
+     "slots": {"sku": (("sku", "assembly"), "SKU-19"), "qty": (("number",), 500)}},
+    {"name": "upgrade_carrier", "persona": "Supply Chain Manager", "rules": [("upgrade carrier",), ("carrier", "air")], "slots": {}},
+    {"name": "resequence", "persona": "Plant Manager", "rules": [("re-sequence",), ("resequence",)],
+     "slots": {"line": (("line",), "L2")}},
+    {"name": "batch_changeovers", "persona": "Plant Manager", "rules": [("batch changeover",)],
+     "slots": {"line": (("line",), "L2")}},
+    {"name": "qa_fast_track", "persona": "Plant Manager", "rules": [("qa fast",), ("fast-track",), ("fast track",)],
+     "slots": {"sku": (("sku", "assembly"), "SKU-19")}},
+]
+FALLBACK = "acknowledge"
+
+@dataclass
+class Entity:
+    kind: str
+    value: str          # canonical form from the gazetteer ('SKU-19', 'L2', 'ACME Mfg'), the number, or the code as typed
+    start: int          # span in the prompt
+    end: int
+    known: bool = True  # False for a code-shaped mention ('SKU-45') that is not in the gazetteer
+
+@dataclass
+class Intent:
+    name: str
+    persona: str | None
+    slots: dict
+    missing: list[str] = field(default_factory=list)   # required slots (no default) not found, or given an unknown code
+    triggers: list[str] = field(default_factory=list)
+    entities: list[Entity] = field(default_factory=list)
+    unknown: dict = field(default_factory=dict)          # slot → unknown code mentioned for it ('SKU-45')
+    def to_dict(self) -> dict: return asdict(self)
+
+# ---------- automaton ----------
+class Automaton:
+    """Aho-Corasick over lowercase strings; ``payload[i]`` is returned for every occurrence of ``patterns[i]``."""
+    def __init__(self, patterns: list[str], payload: list):
+        self.goto: list[dict[str, int]] = [{}]; self.out: list[list[int]] = [[]]
+        self.lens = [len(p) for p in patterns]; self.payload = payload
+        for i, p in enumerate(patterns):
+            s = 0
+            for ch in p:
+                nxt = self.goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto); self.goto[s][ch] = nxt; self.goto.append({}); self.out.append([])
+                s = nxt
+            self.out[s].append(i)
+        self.fail = [0] * len(self.goto); q = deque(self.goto[0].values())
+        while q:
+            s = q.popleft()
+            for ch, t in self.goto[s].items():
+                q.append(t); f = self.fail[s]
+                while f and ch not in self.goto[f]: f = self.fail[f]
+                self.fail[t] = self.goto[f].get(ch, 0) if self.goto[f].get(ch, 0) != t else 0
+                self.out[t] = self.out[t] + self.out[self.fail[t]]
+
+    def scan(self, text: str):
+        """One pass over ``text``: (pattern hits as (start, end, id)), (free-standing digit runs as (start, end))."""
+        goto, fail, out, lens = self.goto, self.fail, self.out, self.lens
+        hits, nums = [], []; s = 0; run = -1; prev_word = False
+        for i, ch in enumerate(text):
+            while s and ch not in goto[s]: s = fail[s]
+            s = goto[s].get(ch, 0)
+            if out[s]:
+                for p in out[s]: hits.append((i + 1 - lens[p], i + 1, p))
+            alnum = ch.isalnum()
+            if ch.isdigit():
+                if run < 0 and not prev_word: run = i
+            elif run >= 0:
+                if not alnum: nums.append((run, i))
+                run = -1
+            prev_word = alnum or (ch in "-_" and prev_word)     # 'assy-999' / 'sku_7' digits belong to a code
+        if run >= 0: nums.append((run, len(text)))
+        return hits, nums
+
+def _variants(code: str) -> set[str]:
+    """'SKU-19' → {'sku-19', 'sku 19', 'sku19', 'sku_19'}; other names just lowercased."""
+    low = code.lower(); head, sep, tail = low.rpartition("-")
+    if sep and head.isalpha() and tail.isdigit():
+        return {f"{head}{s}{tail}" for s in ("-", " ", "", "_")}
+    return {low}
+
+_CODE = re.compile(r"(?<![a-z0-9])([a-z]+)[-_ ]?(\d+)(?![a-z0-9])")
+
+class IntentRouter:
+    def __init__(self, gazetteer: dict[str, list[str]]):
+        pats: list[str] = []; pay: list[tuple] = []
+        for it in INTENTS:
+            for phrase in {p for rule in it["rules"] for p in rule}:
+                pats.append(BOS + phrase[1:] if phrase.startswith("^") else phrase); pay.append(("trigger", phrase))
+        for kind, names in gazetteer.items():
+            for name in names:
+                for v in _variants(name): pats.append(v); pay.append((kind, name))
+        for line in gazetteer.get("line", ()):
+            n = line.lower().lstrip("l")
+            for v in {f"line {n}", f"line-{n}", f"line{n}", f"line {line.lower()}"}:
+                pats.append(v); pay.append(("line", line))
+        self.automaton = Automaton(pats, pay); self.gazetteer = gazetteer
+        # 'PREFIX-digits' names by (prefix, number), so 'sku-1' finds 'SKU-01'; prefix → kind for unknown codes
+        self.codes: dict[tuple[str, int], tuple[str, str]] = {}; self.prefixes: dict[str, str] = {}
+        for kind, names in gazetteer.items():
+            for name in names:
+                head, sep, tail = name.lower().rpartition("-")
+                if sep and head.isalpha() and tail.isdigit():
+                    self.codes.setdefault((head, int(tail)), (kind, name)); self.prefixes.setdefault(head, kind)
+
+    def parse(self, prompt: str) -> Intent:
+        text = BOS + prompt.lower()
+        hits, nums = self.automaton.scan(text)
+        seen: set[str] = set(); ents: list[tuple] = []
+        for a, b, p in hits:
+            kind, val = self.automaton.payload[p]
+            if kind == "trigger": seen.add(val)
+            elif (a == 0 or not text[a - 1].isalnum()) and (b == len(text) or not text[b].isalnum()):
+                ents.append((a, b, kind, val))
+        ents.sort(key=lambda e: (e[0], -(e[1] - e[0]))); picked, end = [], -1
+        for e in ents:                                           # leftmost-longest, non-overlapping
+            if e[0] >= end: picked.append(e); end = e[1]
+        picked = [(a, b, k, v, True) for a, b, k, v in picked]
+        for m in _CODE.finditer(text):                           # codes the gazetteer spells differently, or lacks
+            head = m.group(1)
+            if head not in self.prefixes or any(e[0] < m.end() and m.start() < e[1] for e in picked): continue
+            kind, name = self.codes.get((head, int(m.group(2))), (self.prefixes[head], None))
+            picked.append((m.start(), m.end(), kind, name or f"{head.upper()}-{m.group(2)}", name is not None))
+        picked.sort()
+        free = [(a, b) for a, b in nums if not any(e[0] <= a and b <= e[1] for e in picked)]
+        entities = sorted([Entity(k, v, a - 1, b - 1, known) for a, b, k, v, known in picked]
+                          + [Entity("number", text[a:b], a - 1, b - 1) for a, b in free], key=lambda e: e.start)
+
+        best, best_score, fired = None, 0, []
+        for it in INTENTS:
+            for rule in it["rules"]:
+                if all(p in seen for p in rule):
+                    score = sum(len(p.lstrip("^")) for p in rule)
+                    if score > best_score: best, best_score, fired = it, score, list(rule)
+        if best is None: return Intent(FALLBACK, None, {}, entities=entities)
+        slots, missing, unknown, used = {}, [], {}, set()
+        for slot, (kinds, default) in best["slots"].items():
+            e = next((e for e in entities if e.kind in kinds and id(e) not in used), None)
+            if e is not None and not e.known:
+                used.add(id(e)); unknown[slot] = e.value; missing.append(slot)
+            elif e is not None:
+                used.add(id(e)); slots[slot] = int(e.value) if e.kind == "number" else e.value
+            elif default is not None: slots[slot] = default
+            else: missing.append(slot)
+        return Intent(best["name"], best["persona"], slots, missing, fired, entities, unknown)
+
+# ---------- gazetteer from the data tables ----------
+GAZETTEER_TABLES = ("inventory", "orders", "work_orders", "bom", "products", "prospects")
+_memo: dict = {}; _lock = threading.Lock()
+
+def load_gazetteer() -> tuple[tuple, dict[str, list[str]]]:
+    """(table generations, {kind: names}) from inventory / bom / products / prospects and the lines in orders / work_orders."""
+    from utils.data import tables
+    es = {n: tables.entry(n) for n in GAZETTEER_TABLES}
+    uniq = lambda *cols: sorted({str(v) for c in cols for v in c.dropna().unique()})
+    prod = es["products"].df
+    gaz = {"sku": uniq(es["inventory"].df["sku"]),
+           "assembly": uniq(es["bom"].df["assembly"], prod.loc[~prod["sku"].str.startswith("SKU"), "sku"]),
+           "part": uniq(es["bom"].df["part"]),
+           "line": uniq(es["orders"].df["line"], es["work_orders"].df["line"]),
+           "account": uniq(es["prospects"].df["account"])}
+    return tuple(e.gen for e in es.values()), gaz
+
+def current_router() -> IntentRouter:
+    """Router for the current tables; the automaton is recompiled only when a gazetteer table changes."""
+    with _lock:
+        key, gaz = load_gazetteer()
+        if _memo.get("key") != key: _memo.update(key=key, router=IntentRouter(gaz))
+        return _memo["router"]
+
+def parse(prompt: str) -> Intent:
+    return current_router().parse(prompt)
+
+# ---------- benchmark ----------
+TEMPLATES = [
+    "give me the kpi brief", "what's the status today?", "quote for {assy} qty {n}", "quote {assy} {n} units please",
+    "follow up with {acct}", "propose something like {assy}", "expedite po for {sku} by {d} days",
+    "can we expedite the po on {sku_s}? pull in {d}", "alternate supplier for {sku} {n} pcs", "alt supplier {sku_s} qty {n}",
+    "upgrade carrier to air", "move {sku} by carrier to air asap", "resequence {line}", "re-sequence line {ln} after the current batch",
+    "batch changeovers on {line}", "qa fast-track {sku}", "fast track inspection for {sku_s} lots", "hello there",
+    "what is the status of the expedite po for {sku}", "please look at {sku} and {sku2} on {line}",
+]
+
+def corpus(n: int, router: IntentRouter, seed: int = 0) -> list[str]:
+    rng = np.random.default_rng(seed); g = router.gazetteer
+    pick = lambda k: g[k][rng.integers(len(g[k]))] if g.get(k) else ""
+    out = []
+    for t in rng.integers(len(TEMPLATES), size=n):
+        sku = pick("sku"); line = pick("line")
+        out.append(TEMPLATES[t].format(assy=pick("assembly"), n=int(rng.integers(1, 2000)), acct=pick("account"), sku=sku,
+                                       sku_s=sku.lower().replace("-", " "), sku2=pick("sku"), d=int(rng.integers(1, 9)),
+                                       line=line, ln=line.lstrip("L")))
+    return out
+
+def bench(n: int = 100_000, seed: int = 0) -> dict:
+    """Latency of ``parse`` over ``n`` generated prompts (single thread)."""
+    router = current_router(); prompts = corpus(n, router, seed)
+    t = time.perf_counter(); IntentRouter(router.gazetteer); compile_ms = (time.perf_counter() - t) * 1000
+    lat = np.empty(n); names: dict[str, int] = {}
+    for i, p in enumerate(prompts):
+        t = time.perf_counter(); it = router.parse(p); lat[i] = time.perf_counter() - t
+        names[it.name] = names.get(it.name, 0) + 1
+    us = lat * 1e6
+    return {"prompts": n, "patterns": len(router.automaton.lens), "states": len(router.automaton.goto), "compile_ms": round(compile_ms, 2),
+            "p50_us": round(float(np.percentile(us, 50)), 1), "p99_us": round(float(np.percentile(us, 99)), 1),
+            "max_us": round(float(us.max()), 1), "prompts_per_s": int(n / lat.sum()), "intents": dict(sorted(names.items()))}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Chat intent router")
+    ap.add_argument("prompt", nargs="?", default="")
+    ap.add_argument("--bench", action="store_true")
+    ap.add_argument("--prompts", type=int, default=100_000)
+    args = ap.parse_args()
+    print(json.dumps(bench(args.prompts) if args.bench else parse(args.prompt).to_dict(), indent=2))
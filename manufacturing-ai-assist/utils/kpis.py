@@ -1,20 +1,119 @@
-
 import pandas as pd
+from bisect import bisect_left, insort
+
+WINDOW_DAYS = 6   # `recent` = last 7 calendar days (max - 6d)
+TREND_DAYS = 2    # last3 vs prev4 split inside the window
+
+class KPIEngine:
+    """Running KPI aggregates that fold in appended rows instead of recomputing.
+
+    Only the rolling windows (orders per order_date, downtime events by start)
+    are kept row-level; they evict as the max date advances. Everything else
+    (on-time counts, quality totals, per-cause / per-family sums) is a running
+    total, so a refresh costs O(rows appended), not O(history).
+    """
+    PARTS = ("orders", "quality", "down")
+
+    def __init__(self):
+        self._inv = None
+        for part in self.PARTS: self.reset(part)
+
+    def reset(self, part: str) -> None:
+        if part == "orders":
+            self._omax = None; self._on_time = 0; self._n_orders = 0
+            self._days = {}; self._day_keys = []          # order_date -> [qty_sum, rows], window only
+        elif part == "quality":
+            self._units = 0; self._defects = 0; self._fam = {}
+        elif part == "down":
+            self._dmax = None; self._cause = {}
+            self._events = []; self._down_sum = 0         # sorted (start, event#, minutes), window only
+            self._seq = 0
+        else:
+            raise ValueError(f"Unknown part '{part}'")
+        self._memo = None
+
+    # ---------- folding ----------
+    def fold(self, orders: pd.DataFrame | None = None, quality: pd.DataFrame | None = None,
+             down: pd.DataFrame | None = None) -> "KPIEngine":
+        if orders is not None and len(orders): self._fold_orders(orders)
+        if quality is not None and len(quality): self._fold_quality(quality)
+        if down is not None and len(down): self._fold_down(down)
+        return self
+
+    def set_inventory(self, inv: pd.DataFrame) -> "KPIEngine":
+        self._inv = inv; self._memo = None
+        return self
+
+    def _fold_orders(self, b: pd.DataFrame) -> None:
+        self._on_time += int((b['actual_ship_date'] <= b['promised_ship_date']).sum())
+        self._n_orders += len(b)
+        bmax = b['order_date'].max()
+        if pd.notna(bmax) and (self._omax is None or bmax > self._omax): self._omax = bmax
+        if self._omax is None: return
+        cutoff = self._omax - pd.Timedelta(days=WINDOW_DAYS)
+        g = b[b['order_date'] >= cutoff].groupby('order_date')['qty_produced'].agg(['sum', 'count'])
+        for day, qty, n in zip(g.index, g['sum'].to_list(), g['count'].to_list()):
+            cur = self._days.get(day)
+            if cur is None:
+                self._days[day] = [qty, n]; insort(self._day_keys, day)
+            else:
+                cur[0] += qty; cur[1] += n
+        i = bisect_left(self._day_keys, cutoff)
+        for day in self._day_keys[:i]: del self._days[day]
+        del self._day_keys[:i]
+        self._memo = None
+
+    def _fold_quality(self, b: pd.DataFrame) -> None:
+        self._units += b['units_inspected'].sum(); self._defects += b['defects_found'].sum()
+        for fam, n in b.groupby('defect_family')['defects_found'].sum().items():
+            self._fam[fam] = self._fam.get(fam, 0) + n
+        self._memo = None
+
+    def _fold_down(self, b: pd.DataFrame) -> None:
+        for cause, n in b.groupby('cause')['duration_min'].sum().items():
+            self._cause[cause] = self._cause.get(cause, 0) + n
+        bmax = b['start'].max()
+        if pd.notna(bmax) and (self._dmax is None or bmax > self._dmax): self._dmax = bmax
+        if self._dmax is None: return
+        cutoff = self._dmax - pd.Timedelta(days=WINDOW_DAYS)
+        w = b[b['start'] >= cutoff]
+        for start, minutes in zip(w['start'], w['duration_min'].to_list()):
+            insort(self._events, (start, self._seq, minutes)); self._seq += 1
+            self._down_sum += minutes
+        i = bisect_left(self._events, (cutoff,))
+        for _, _, minutes in self._events[:i]: self._down_sum -= minutes
+        del self._events[:i]
+        self._memo = None
+
+    # ---------- results ----------
+    @staticmethod
+    def _top(totals: dict) -> str:
+        # Same ordering as groupby(...).sum().sort_values(ascending=False) so ties resolve identically.
+        return pd.Series(totals).sort_index().sort_values(ascending=False).head(1).index.to_list()[0]
+
+    def _mean_qty(self, keys) -> float:
+        qty = sum(self._days[d][0] for d in keys); n = sum(self._days[d][1] for d in keys)
+        return qty / n if n else float('nan')
+
+    def kpis(self) -> dict:
+        if self._memo is not None: return dict(self._memo)
+        k = {}
+        qty = sum(v[0] for v in self._days.values())
+        k['throughput_per_day'] = qty / max(1, len(self._days))
+        k['on_time_pct'] = (self._on_time / self._n_orders * 100) if self._n_orders else float('nan')
+        k['defect_rate_pct'] = (self._defects/self._units*100) if self._units else 0.0
+        k['downtime_hours'] = self._down_sum/60.0
+        if self._inv is not None:
+            k['inventory_risk_count'] = (self._inv['on_hand'] < self._inv['safety_stock']).sum()
+        split = bisect_left(self._day_keys, self._omax - pd.Timedelta(days=TREND_DAYS)) if self._omax is not None else 0
+        last3 = self._mean_qty(self._day_keys[split:]); prev4 = self._mean_qty(self._day_keys[:split])
+        k['throughput_trend'] = 'up' if last3 > prev4 else 'down' if last3 < prev4 else 'flat'
+        k['top_downtime_cause'] = self._top(self._cause)
+        k['top_defect_family'] = self._top(self._fam)
+        if self._inv is not None:
+            k['lowest_stock_sku'] = self._inv.sort_values('on_hand').head(1)['sku'].iloc[0]
+        self._memo = k
+        return dict(k)
+
 def compute_kpis(df_orders, df_quality, df_down, df_inv):
-    k = {}
-    recent = df_orders[df_orders['order_date'] >= (df_orders['order_date'].max() - pd.Timedelta(days=6))]
-    k['throughput_per_day'] = recent['qty_produced'].sum() / max(1,(recent['order_date'].nunique()))
-    k['on_time_pct'] = (df_orders['actual_ship_date'] <= df_orders['promised_ship_date']).mean() * 100
-    total_units = df_quality['units_inspected'].sum(); defects = df_quality['defects_found'].sum()
-    k['defect_rate_pct'] = (defects/total_units*100) if total_units else 0.0
-    down_recent = df_down[df_down['start'] >= (df_down['start'].max() - pd.Timedelta(days=6))]
-    k['downtime_hours'] = down_recent['duration_min'].sum()/60.0
-    k['inventory_risk_count'] = (df_inv['on_hand'] < df_inv['safety_stock']).sum()
-    last3 = recent[recent['order_date'] >= (df_orders['order_date'].max() - pd.Timedelta(days=2))]['qty_produced'].mean()
-    prev4 = recent[recent['order_date'] < (df_orders['order_date'].max() - pd.Timedelta(days=2))]['qty_produced'].mean()
-    k['throughput_trend'] = 'up' if last3 > prev4 else 'down' if last3 < prev4 else 'flat'
-    k['top_downtime_cause'] = df_down.groupby('cause')['duration_min'].sum().sort_values(ascending=False).head(1).index.to_list()[0]
-    fam = df_quality.groupby('defect_family')['defects_found'].sum().sort_values(ascending=False).head(1).index.to_list()[0]
-    k['top_defect_family'] = fam
-    k['lowest_stock_sku'] = df_inv.sort_values('on_hand').head(1)['sku'].iloc[0]
-    return k
+    return KPIEngine().fold(df_orders, df_quality, df_down).set_inventory(df_inv).kpis()
@@ -0,0 +1,220 @@
+# utils/montecarlo.py
+"""Monte Carlo forecast of OTD risk, throughput, downtime and defects for a SimState.
+
+Everything is fitted from data/:
+
+- **Downtime.** Events per line-day are Poisson, at the logged rate. Each
+  event's minutes are resampled from that line's own log.
+- **Defects.** The daily defect rate per line is Beta, fitted by moments on the
+  daily rates in ``quality_inspections.csv``.
+- **Output.** Per line-day, output = capacity × availability × yield × noise.
+  Availability is 1 − downtime / 24h. Capacity is calibrated so the simulated
+  mean equals the logged mean. The lognormal noise supplies the day-to-day
+  spread that downtime and defects alone don't explain.
+- **OTD.** Orders per trial are Poisson. An order is late with the historical
+  probability that actual ship date > promise. Orders for the short SKU that
+  ``extra_qty`` doesn't cover wait for the inbound lot. Their lateness is
+  shifted by its remaining ETA (``3 − eta_offset − carrier_upgrade`` days, as
+  in the API), plus a slip resampled from the historical lateness.
+
+State effects:
+
+- ``resequence`` scales capacity by the scheduler's throughput gain.
+- ``batch_changeovers`` shortens Changeover events by the planned share saved.
+- ``qa_fast_track`` shortens Quality Hold events by ``QA_HOLD_FACTOR``.
+
+Sampling is vectorized over trials × days, in chunks of at most ``CHUNK_CELLS``
+trial-days so memory stays flat however many trials are asked for.
+``run(..., workers=n)`` splits the trials over a process pool with
+independent seed streams.
+"""
+from __future__ import annotations
+import os, threading, time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+
+SHORT_SKU = "SKU-19"
+BASE_ETA_DAYS = 3
+AVAIL_H = 24.0
+QA_HOLD_FACTOR = 0.5
+HORIZON_DAYS = 7
+CALIBRATION_TRIALS = 20_000
+CHUNK_CELLS = 250_000          # trial-days sampled at once: a few (cells × lines) float64 arrays, ~6 MB each for 3 lines
+MC_WORKERS = int(os.getenv("MFG_MC_WORKERS", "1"))
+
+@dataclass
+class Model:
+    lines: list[str]
+    capacity: np.ndarray              # units/day per line at full availability and yield
+    noise_sigma: np.ndarray           # lognormal sigma of output spread not explained by downtime/defects
+    events_per_day: np.ndarray
+    durations: list[np.ndarray]       # per line, minutes of each logged event
+    causes: list[np.ndarray]          # per line, cause of each logged event
+    defect_ab: np.ndarray             # (lines, 2) Beta parameters of the daily defect rate
+    lateness: np.ndarray              # sorted days late (actual − promised) of shipped orders
+    orders_per_day: float
+    short_share: float                # share of orders on SHORT_SKU
+    short_qty_per_day: float
+
+@dataclass
+class Effects:
+    eta_days: float = 0.0             # remaining inbound delay for SHORT_SKU
+    uncovered: float = 0.0            # share of SHORT_SKU orders extra_qty doesn't cover
+    capacity_gain: float = 0.0
+    changeover_factor: dict[str, float] = field(default_factory=dict)
+    qa_hold_factor: float = 1.0
+
+# ---------- fit ----------
+def fit(orders: pd.DataFrame, quality: pd.DataFrame, downtime: pd.DataFrame, seed: int = 0) -> Model:
+    lines = sorted(orders["line"].astype(str).unique())
+    n_days = max(1, orders["order_date"].nunique())
+    span = lambda s: max(1, (s.max().normalize() - s.min().normalize()).days + 1)
+    d_days = span(downtime["start"])
+    dl = [downtime[downtime["line"] == l] for l in lines]
+    events_per_day = np.array([len(d) / d_days for d in dl])
+    rate = quality.groupby(["line", "date"])[["defects_found", "units_inspected"]].sum()
+    rate = (rate["defects_found"] / rate["units_inspected"].where(rate["units_inspected"] > 0)).dropna()
+    ab = []
+    for l in lines:
+        r = rate[rate.index.get_level_values(0) == l].to_numpy() if l in rate.index.get_level_values(0) else rate.to_numpy()
+        m, v = (float(r.mean()), float(r.var())) if len(r) else (0.0, 0.0)
+        k = m * (1 - m) / v - 1 if v > 0 and 0 < m < 1 else 1e6   # no spread → near-constant rate
+        ab.append((max(m * k, 1e-6), max((1 - m) * k, 1e-6)))
+    shipped = orders.dropna(subset=["actual_ship_date"])
+    lateness = np.sort(((shipped["actual_ship_date"] - shipped["promised_ship_date"]) / pd.Timedelta(days=1)).to_numpy())
+    short = orders[orders["sku"] == SHORT_SKU]
+    model = Model(lines, np.ones(len(lines)), np.zeros(len(lines)), events_per_day,
+                  [d["duration_min"].to_numpy(dtype=float) for d in dl], [d["cause"].astype(str).to_numpy() for d in dl],
+                  np.array(ab), lateness if len(lateness) else np.zeros(1), len(orders) / n_days,
+                  len(short) / max(1, len(orders)), float(short["qty_produced"].sum()) / n_days)
+    # calibrate: capacity so the mean matches history, noise for the spread downtime/defects don't explain
+    daily = orders.groupby(["line", "order_date"])["qty_produced"].sum()
+    sim = _line_days(model, Effects(), CALIBRATION_TRIALS, 1, np.random.default_rng(seed))[:, 0, :]
+    for i, l in enumerate(lines):
+        hist = daily.loc[l].to_numpy(dtype=float) if l in daily.index.get_level_values(0) else np.zeros(1)
+        mean = sim[:, i].mean()
+        model.capacity[i] = hist.mean() / mean if mean > 0 else 0.0
+        cv2_hist = hist.var() / hist.mean() ** 2 if hist.mean() > 0 else 0.0
+        cv2_sim = sim[:, i].var() / mean ** 2 if mean > 0 else 0.0
+        model.noise_sigma[i] = np.sqrt(np.log1p(max(0.0, cv2_hist - cv2_sim)))
+    return model
+
+# ---------- sampling ----------
+def _downtime(model: Model, eff: Effects, trials: int, days: int, rng: np.random.Generator) -> np.ndarray:
+    """Downtime minutes, shape (trials, days, lines)."""
+    out = np.zeros((trials, days, len(model.lines)))
+    for i, line in enumerate(model.lines):
+        pool = model.durations[i]
+        if not len(pool): continue
+        scale = np.ones(len(pool))
+        scale[model.causes[i] == "Changeover"] = eff.changeover_factor.get(line, 1.0)
+        scale[model.causes[i] == "Quality Hold"] = eff.qa_hold_factor
+        k = rng.poisson(model.events_per_day[i], trials * days)
+        cell = np.repeat(np.arange(trials * days), k)
+        out[:, :, i] = np.bincount(cell, (pool * scale)[rng.integers(len(pool), size=len(cell))], trials * days).reshape(trials, days)
+    return out
+
+def _line_days(model: Model, eff: Effects, trials: int, days: int, rng: np.random.Generator, down: np.ndarray | None = None,
+               defects: np.ndarray | None = None) -> np.ndarray:
+    """Good output per line-day, shape (trials, days, lines)."""
+    down = _downtime(model, eff, trials, days, rng) if down is None else down
+    defects = rng.beta(model.defect_ab[:, 0], model.defect_ab[:, 1], (trials, days, len(model.lines))) if defects is None else defects
+    s = model.noise_sigma
+    noise = rng.lognormal(-s ** 2 / 2, s, (trials, days, len(model.lines)))
+    avail = np.clip(1 - down / 60.0 / AVAIL_H, 0.0, 1.0)
+    return model.capacity * (1 + eff.capacity_gain) * noise * avail * (1 - defects)
+
+def _late_prob(lateness: np.ndarray, shift: np.ndarray) -> np.ndarray:
+    """P(historical lateness + shift > 0) for each shift."""
+    return 1 - np.searchsorted(lateness, -shift, side="right") / len(lateness)
+
+def simulate(model: Model, eff: Effects, trials: int, days: int = HORIZON_DAYS, seed=0) -> dict[str, np.ndarray]:
+    """Per-trial arrays, sampled in chunks of ``CHUNK_CELLS`` trial-days from one seeded stream."""
+    rng = np.random.default_rng(seed); step = max(1, CHUNK_CELLS // days)
+    parts = [_batch(model, eff, min(step, trials - lo), days, rng) for lo in range(0, trials, step)]
+    return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+def _batch(model: Model, eff: Effects, trials: int, days: int, rng: np.random.Generator) -> dict[str, np.ndarray]:
+    down = _downtime(model, eff, trials, days, rng)
+    defects = rng.beta(model.defect_ab[:, 0], model.defect_ab[:, 1], (trials, days, len(model.lines)))
+    good = _line_days(model, eff, trials, days, rng, down, defects)
+    n = rng.poisson(model.orders_per_day * days, trials)
+    n_short = rng.binomial(n, model.short_share * eff.uncovered)
+    if eff.eta_days > 0:
+        slip = model.lateness[rng.integers(len(model.lateness), size=trials)] - np.median(model.lateness)
+        delay = np.maximum(0.0, eff.eta_days + slip)
+    else:
+        delay = np.zeros(trials)
+    late = rng.binomial(n - n_short, _late_prob(model.lateness, np.zeros(1))[0]) + rng.binomial(n_short, _late_prob(model.lateness, delay))
+    return {"otd_risk_pct": np.where(n > 0, late / np.maximum(n, 1) * 100, 0.0),
+            "throughput_per_day": good.sum(axis=2).mean(axis=1),
+            "downtime_hours": down.sum(axis=(1, 2)) / 60.0,
+            "defect_rate_pct": defects.mean(axis=(1, 2)) * 100}
+
+_pool: ProcessPoolExecutor | None = None; _pool_lock = threading.Lock()
+
+def _executor(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool._max_workers != workers:
+            if _pool is not None: _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+def run(model: Model, eff: Effects, trials: int = 100_000, days: int = HORIZON_DAYS, seed: int = 0,
+        workers: int = MC_WORKERS) -> dict:
+    """Percentiles of every metric over ``trials``; with ``workers`` > 1 the trials are split over a process pool."""
+    t0 = time.perf_counter()
+    if workers > 1 and trials >= 20_000:
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        sizes = [trials // workers + (i < trials % workers) for i in range(workers)]
+        parts = list(_executor(workers).map(simulate, [model] * workers, [eff] * workers, sizes, [days] * workers, seeds))
+        res = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    else:
+        res = simulate(model, eff, trials, days, seed)
+    pct = lambda a: {"mean": round(float(a.mean()), 2), **{f"p{q}": round(float(v), 2) for q, v in zip((10, 50, 90), np.percentile(a, (10, 50, 90)))}}
+    return {"trials": trials, "horizon_days": days, **{k: pct(v) for k, v in res.items()}, "runtime_s": round(time.perf_counter() - t0, 3)}
+
+# ---------- SimState ----------
+def effects_for(state, model: Model) -> Effects:
+    """Translate a SimState into sampling effects; scheduler/changeover gains are pulled only for flags that are set."""
+    eta = max(0.0, BASE_ETA_DAYS - (state.eta_offset_days + state.carrier_upgrade_days))
+    need = model.short_qty_per_day * eta
+    uncovered = float(np.clip(1 - state.extra_qty / need, 0.0, 1.0)) if need > 0 else 0.0
+    eff = Effects(eta_days=eta, uncovered=uncovered, qa_hold_factor=QA_HOLD_FACTOR if state.qa_fast_track else 1.0)
+    if state.resequence:
+        from utils.scheduling import current_schedule
+        eff.capacity_gain = current_schedule().summary()["throughput_gain_pct"] / 100
+    if state.batch_changeovers:
+        from utils.changeover import recent_reduction
+        eff.changeover_factor = {l: 1 - r["saved_frac"] for l, r in recent_reduction().items()}
+    return eff
+
+_memo: dict = {}; _memo_lock = threading.Lock()
+
+def current_model() -> Model:
+    """Model fitted on the shared tables, refitted only when orders, quality or downtime change."""
+    from utils.data import tables
+    with _memo_lock:
+        key = tuple(tables.entry(n).gen for n in ("orders", "quality_inspections", "downtime_log"))
+        if _memo.get("key") != key:
+            _memo.update(key=key, model=fit(tables.get("orders"), tables.get("quality_inspections"), tables.get("downtime_log")))
+        return _memo["model"]
+
+def forecast(state, trials: int = 100_000, days: int = HORIZON_DAYS, seed: int = 0, workers: int = MC_WORKERS) -> dict:
+    model = current_model()
+    return run(model, effects_for(state, model), trials, days, seed, workers)
+
+if __name__ == "__main__":
+    import argparse
+    from api.models import SimState
+    ap = argparse.ArgumentParser(description="Monte Carlo KPI forecast for a SimState")
+    ap.add_argument("--trials", type=int, default=100_000)
+    ap.add_argument("--days", type=int, default=HORIZON_DAYS)
+    ap.add_argument("--workers", type=int, default=MC_WORKERS)
+    args = ap.parse_args()
+    for label, st in (("baseline", SimState()), ("mitigated", SimState(eta_offset_days=2, carrier_upgrade_days=1, extra_qty=500,
+                                                                         resequence=True, batch_changeovers=True, qa_fast_track=True))):
+        print(label, forecast(st, args.trials, args.days, workers=args.workers))
@@ -4,8 +4,11 @@ from dataclasses import dataclass
 from datetime import datetime
 import pandas as pd
 
-from utils.data import load_all_data
-from utils.kpis import compute_kpis
+from utils.changeover import current_plan, recent_reduction
+from utils.data import cached_kpis
+from utils.mrp import current_plan as current_mrp
+from utils.scheduling import current_schedule
+from utils.sqlstore import open_store
 
 @dataclass
 class Snapshot:
@@ -13,9 +16,10 @@ class Snapshot:
     note: str = ""
 
 def kpi_snapshot(note: str = "") -> Snapshot:
-    df_orders, df_quality, df_down, df_inv, df_wos = load_all_data()
-    k = compute_kpis(df_orders, df_quality, df_down, df_inv)
-    return Snapshot(kpis=k, note=note)
+    store = open_store()
+    if store is not None:   # plant.db has no projection; the risk count is MRP's, as in cached_kpis and /metrics
+        return Snapshot(kpis={**store.kpis(), "inventory_risk_count": current_mrp().risk_count()}, note=note)
+    return Snapshot(kpis=cached_kpis(), note=note)
 
 # ---------- Supply Chain canned actions ----------
 def sc_expedite_po(sku: str = "SKU-19", days_pull: int = 2) -> str:
@@ -54,17 +58,30 @@ def erp_snapshot(sku: str = "SKU-19") -> dict:
 # ---------- Plant canned actions ----------
 def plant_resequence(line: str = "L2") -> str:
     snap = kpi_snapshot()
+    sched = current_schedule()
+    if line not in sched.lines:
+        return f"**No open work orders on {line}** — nothing to re-sequence."
+    s = sched.summary(line)
     return (
-        f"**Re-sequenced {line}** to run stocked SKUs while C-19 is inbound.  \n"
-        f"- Expected throughput: **+3%** vs current {snap.kpis['throughput_per_day']:.0f}/day.  \n"
+        f"**Re-sequenced {line}** ({s['jobs']} open WOs on {sched.lines[line].stations} stations) to run stocked SKUs while C-19 is inbound.  \n"
+        f"- Expected throughput: **{s['throughput_gain_pct']:+.1f}%** vs current {snap.kpis['throughput_per_day']:.0f}/day "
+        f"(changeovers {s['setups_before']}→{s['setups_after']}).  \n"
+        f"- On-time WOs: **{s['on_time_pct_before']:.0f}%→{s['on_time_pct_after']:.0f}%**, tardiness {s['tardiness_h_before']:.0f}h→{s['tardiness_h_after']:.0f}h.  \n"
         f"- Keep QA on standby for alternate supplier lots."
     )
 
 def plant_batch_changeovers(line: str = "L2") -> str:
     snap = kpi_snapshot()
+    plan = current_plan(line)
+    if plan.lots.empty:
+        return f"**No open work orders on {line}** — nothing to batch."
+    red = recent_reduction().get(line, {"saved_h_per_day": 0.0})
+    head = " → ".join(plan.sequence[:6]) + (" → …" if len(plan.lots) > 6 else "")
     return (
-        f"**Batched changeovers on {line}**  \n"
-        f"- Setup consolidation reduces downtime **≈0.5h/day** (recent: {snap.kpis['downtime_hours']:.1f}h).  \n"
+        f"**Batched changeovers on {line}** ({len(plan.lots)} SKU lots, changeovers {plan.changeovers_before}→{plan.changeovers_after})  \n"
+        f"- Run order: {head}  \n"
+        f"- Planned changeover time **{plan.changeover_h_before:.1f}h→{plan.changeover_h_after:.1f}h**; "
+        f"downtime **−{red['saved_h_per_day']:.2f}h/day** (recent: {snap.kpis['downtime_hours']:.1f}h).  \n"
         f"- Pair with re-sequencing for best effect."
     )
 
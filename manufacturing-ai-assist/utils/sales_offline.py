@@ -1,18 +1,21 @@
 # utils/sales_offline.py
 from __future__ import annotations
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-import math, random
+from functools import cached_property
+import math, random, threading
 
-DATA = Path(__file__).resolve().parents[1] / "data"
+from utils.bom import BOMEngine
+from utils.data import tables
+from utils.ids import quote_ids
 
-def _csv(name: str) -> pd.DataFrame:
-    df = pd.read_csv(DATA / name)
-    for c in df.columns:
-        if "date" in c.lower():
-            df[c] = pd.to_datetime(df[c], errors="coerce")
-    return df
+def _csv(name: str, columns: list[str] | None = None) -> pd.DataFrame:
+    """Shared, read-only frame from utils.data.tables (copy before mutating)."""
+    df = tables.get(Path(name).stem)
+    return df[columns] if columns else df
 
 def load_bom() -> pd.DataFrame:
     return _csv("bom.csv")
@@ -23,17 +26,24 @@ def load_products() -> pd.DataFrame:
 def load_prospects() -> pd.DataFrame:
     return _csv("prospects.csv")
 
+_bom: dict = {}; _bom_lock = threading.Lock()
+
+def bom_engine() -> BOMEngine:
+    """Rolled-up BOM for the current bom.csv, rebuilt only when the file changes."""
+    gen = tables.entry("bom").gen
+    with _bom_lock:
+        if _bom.get("gen") != gen:
+            _bom.update(gen=gen, engine=BOMEngine(load_bom()))
+        return _bom["engine"]
+
 def price_from_bom(assembly: str, qty: int, margin_pct: float = 22.0) -> dict:
-    bom = load_bom()
-    items = bom[bom["assembly"] == assembly].copy()
-    if items.empty:
-        raise ValueError(f"BOM not found for '{assembly}'")
-    items["extended"] = items["qty_per"] * qty * items["unit_cost"]
-    material_cost = float(items["extended"].sum())
-    std_cost = float(items["std_cost"].sum() * qty)
+    bom = bom_engine()
+    r = bom.rollup(assembly)
+    material_cost = r["material_cost"] * qty
+    std_cost = r["std_cost"] * qty
     base_cost = material_cost + std_cost
     price = base_cost * (1 + margin_pct/100.0)
-    lead_time_days = math.ceil(items["lead_time_days"].max())
+    lead_time_days = math.ceil(r["lead_time_days"])
     return {
         "assembly": assembly,
         "qty": int(qty),
@@ -43,12 +53,12 @@ def price_from_bom(assembly: str, qty: int, margin_pct: float = 22.0) -> dict:
         "margin_pct": margin_pct,
         "price": round(price, 2),
         "lead_time_days": int(lead_time_days),
-        "line_items": items[["part","desc","qty_per","unit_cost","extended"]].to_dict("records"),
+        "line_items": bom.line_items(assembly, qty),
     }
 
 def generate_quote(assembly: str, qty: int, prospect: str = "ACME Mfg", terms: str = "Net 30") -> dict:
     q = price_from_bom(assembly, qty)
-    quote_id = f"Q-{int(datetime.utcnow().timestamp())}"
+    quote_id = quote_ids.next("Q")
     ship_eta = (datetime.utcnow() + timedelta(days=q["lead_time_days"])).date()
     body = (
         f"**Quote {quote_id}**\n\n"
@@ -64,6 +74,71 @@ def generate_quote(assembly: str, qty: int, prospect: str = "ACME Mfg", terms: s
     )
     return {"quote_id": quote_id, "ship_eta": str(ship_eta), "body": body, "rollup": q}
 
+# ---------- Batch quoting ----------
+# Margin points given back at each quantity break, and the margin no line may drop below.
+PRICE_BREAKS: tuple[tuple[int, float], ...] = ((1, 0.0), (10, 1.0), (25, 2.0), (100, 3.5), (500, 5.0))
+MARGIN_FLOOR_PCT = 12.0
+BREAK_QTYS = tuple(q for q, _ in PRICE_BREAKS)
+
+@dataclass
+class QuoteBatch:
+    """Priced RFQ lines (one row each, ``error`` set for lines that could not be priced)."""
+    lines: pd.DataFrame
+
+    @property
+    def total(self) -> float:
+        return round(float(self.lines["price"].sum()), 2)
+
+    def records(self) -> list[dict]:
+        df = self.lines.astype(object).where(self.lines.notna(), None)
+        return df.to_dict("records")
+
+    @cached_property
+    def markdown(self) -> str:
+        ok = self.lines[self.lines["error"].isna()]
+        rows = [f"| {r.assembly} | {r.qty:,} | ${r.unit_price:,.2f} | ${r.price:,.2f} | {r.margin_pct:g}% | {r.lead_time_days}d |"
+                for r in ok.itertuples(index=False)]
+        bad = [f"- {r.assembly} x{r.qty}: {r.error}" for r in self.lines[self.lines["error"].notna()].itertuples(index=False)]
+        return "\n".join(["| Item | Qty | Unit | Price | Margin | Lead |", "|---|---:|---:|---:|---:|---:|", *rows,
+                          "", f"**Total: ${self.total:,.2f}**", *(["", "**Not priced**", *bad] if bad else [])])
+
+def price_lines(assemblies, qtys, margins=22.0, breaks: bool = True, floor_pct: float = MARGIN_FLOOR_PCT) -> QuoteBatch:
+    """Price many (assembly, qty, margin) lines in one pass over the BOM rollups.
+
+    With ``breaks`` each line's margin drops by its qty tier in ``PRICE_BREAKS``,
+    but never below ``floor_pct`` (nor below the requested margin, if that is lower).
+    """
+    bom = bom_engine()
+    asm = pd.Series(assemblies, dtype=str).reset_index(drop=True)
+    qty = pd.to_numeric(pd.Series(qtys), errors="coerce").reindex(asm.index).to_numpy(dtype=float)
+    margin = np.broadcast_to(np.asarray(margins, dtype=float), qty.shape).copy()
+    idx = asm.map(bom.ids).to_numpy(dtype=float)
+    known = ~np.isnan(idx); i = np.where(known, idx, 0).astype(np.int64)
+    known &= bom.is_assembly[i]
+    whole = qty == np.floor(qty)                # a fractional qty would be priced but shown truncated by the int qty column
+    valid = known & (qty > 0) & whole
+    brk_q, brk_pct = np.array([q for q, _ in PRICE_BREAKS], dtype=float), np.array([p for _, p in PRICE_BREAKS])
+    tier = np.clip(np.searchsorted(brk_q, np.nan_to_num(qty), side="right") - 1, 0, None)
+    give = brk_pct[tier] if breaks else np.zeros_like(qty)
+    eff = np.where(give > 0, np.maximum(margin - give, np.minimum(floor_pct, margin)), margin)
+    material, std = bom.material[i] * qty, bom.std[i] * qty
+    base = material + std; price = base * (1 + eff / 100.0)
+    nan = lambda a: np.where(valid, a, np.nan)
+    r2 = lambda a: np.array([round(x, 2) for x in nan(a).tolist()])   # Python round, so lines match price_from_bom to the cent
+    out = pd.DataFrame({
+        "assembly": asm, "qty": np.nan_to_num(qty).astype(int),
+        "requested_margin_pct": margin, "break_pct": nan(give), "margin_pct": nan(eff),
+        "material_cost": r2(material), "std_cost": r2(std), "base_cost": r2(base),
+        "price": r2(price), "unit_price": r2(price / np.where(qty > 0, qty, 1)),
+        "lead_time_days": pd.array(np.where(valid, np.ceil(bom.lead_time[i]), np.nan), dtype="Int64"),
+        "error": np.where(~known, "BOM not found", np.where(~(qty > 0), "qty must be positive",
+                                                            np.where(~whole, "qty must be a whole number", None))),
+    })
+    return QuoteBatch(out)
+
+def qty_break_table(assembly: str, qtys=BREAK_QTYS, margin_pct: float = 22.0) -> QuoteBatch:
+    return price_lines([assembly] * len(qtys), list(qtys), margin_pct)
+
 def follow_up_email(prospect: str, quote_id: str, tone: str = "crisp") -> str:
     openers = {
         "crisp": f"Checking in on quote {quote_id} —",
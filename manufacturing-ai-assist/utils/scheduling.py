@@ -0,0 +1,248 @@
+# utils/scheduling.py
+"""Finite-capacity work-order scheduler.
+
+Each line is modelled as ``k`` identical stations, ``k`` being the peak number
+of work orders the current plan runs at once on that line. Open work orders
+(Planned / In-Progress) are sequenced per station. Running orders stay first
+where they are. Switching SKU on a station costs ``changeover_h``. Due dates
+come from the open orders' ``promised_ship_date`` for the same SKU, matched in
+plan order; if there is none, the work order's own ``planned_end`` is used.
+
+The result is built in two steps:
+
+1. Greedy construction: earliest due date first, each job placed on the station
+   that finishes it soonest. The start point is this or the current plan,
+   whichever is better.
+2. Local search: relocate and insert moves (random, tardy-first and
+   same-SKU grouping) until the move cap runs out. A move is
+   kept only if it lowers total tardiness + ``flow_weight`` × mean completion
+   time (the flow term breaks ties towards fewer changeovers and balanced stations). The
+   search stops early after ``STALL_MOVES`` moves without an improvement.
+   With a fixed seed the moves tried are fixed, so the same data always gives
+   the same schedule. ``budget_s`` is only a wall-clock safety cut-off; a line
+   that hits it is logged and flagged ``cut_off``.
+
+The current plan (by planned_start) is scored with the same model, so the
+before/after numbers are comparable. ``python -m utils.scheduling --bench``
+shows schedule quality against runtime on synthetic data.
+"""
+from __future__ import annotations
+import argparse, logging, threading, time
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+
+CHANGEOVER_H = 0.5
+FLOW_WEIGHT = 1.0
+STALL_MOVES = 5_000
+MAX_MOVES = 20_000            # move cap of the shared schedule (split over lines by job count)
+SAFETY_S = 5.0                # wall-clock cut-off; only reached on a badly overloaded host
+OPEN_STATUSES = ("Planned", "In-Progress")
+log = logging.getLogger(__name__)
+
+@dataclass
+class LineResult:
+    line: str
+    stations: int
+    baseline: dict
+    optimized: dict
+    moves: int = 0
+    cut_off: bool = False
+
+@dataclass
+class Schedule:
+    plan: pd.DataFrame                        # wo_id, sku, line, station, start, end, due, late
+    lines: dict[str, LineResult] = field(default_factory=dict)
+    runtime_s: float = 0.0
+
+    def summary(self, line: str | None = None) -> dict:
+        res = [self.lines[line]] if line else list(self.lines.values())
+        if not res: return {"jobs": 0, "throughput_gain_pct": 0.0}
+        agg = lambda which, k: sum(getattr(r, which)[k] for r in res)
+        jobs = agg("baseline", "jobs")
+        before, after = agg("baseline", "busy_h"), agg("optimized", "busy_h")
+        return {"jobs": jobs,
+                "throughput_gain_pct": round((before / after - 1) * 100, 2) if after else 0.0,   # same work, fewer station-hours
+                "on_time_pct_before": round(agg("baseline", "on_time") / jobs * 100, 1) if jobs else 100.0,
+                "on_time_pct_after": round(agg("optimized", "on_time") / jobs * 100, 1) if jobs else 100.0,
+                "tardiness_h_before": round(agg("baseline", "tardiness_h"), 1), "tardiness_h_after": round(agg("optimized", "tardiness_h"), 1),
+                "setups_before": agg("baseline", "setups"), "setups_after": agg("optimized", "setups"),
+                "makespan_h_before": round(agg("baseline", "makespan_h"), 1), "makespan_h_after": round(agg("optimized", "makespan_h"), 1),
+                "moves": sum(r.moves for r in res), "cut_off": any(r.cut_off for r in res), "runtime_s": round(self.runtime_s, 3)}
+
+# ---------- data ----------
+def _peak_overlap(start: np.ndarray, end: np.ndarray) -> int:
+    ev = sorted([(s, 1) for s in start] + [(e, -1) for e in end])   # ends sort before starts at the same instant
+    run = peak = 0
+    for _, d in ev: run += d; peak = max(peak, run)
+    return max(1, peak)
+
+def _due_dates(wos: pd.DataFrame, orders: pd.DataFrame | None, t0: pd.Timestamp) -> pd.Series:
+    """k-th open WO of a SKU (plan order) gets the k-th open order promise of that SKU; else its planned_end."""
+    due = wos["planned_end"].to_numpy(copy=True)
+    if orders is None or orders.empty: return pd.Series(due, index=wos.index)
+    open_o = orders[orders["actual_ship_date"].isna() | (orders["actual_ship_date"] > t0)] if "actual_ship_date" in orders else orders
+    promises = {sku: g.to_numpy() for sku, g in open_o.sort_values("promised_ship_date").groupby("sku")["promised_ship_date"]}
+    rank = wos.sort_values("planned_start").groupby("sku").cumcount().reindex(wos.index).to_numpy()
+    for i, (sku, k) in enumerate(zip(wos["sku"].to_numpy(), rank)):
+        p = promises.get(sku)
+        if p is not None and k < len(p): due[i] = p[k]
+    return pd.Series(due, index=wos.index)
+
+# ---------- one line ----------
+class _Line:
+    """Stations as lists of job indices; costs evaluated with numpy over one station at a time."""
+    def __init__(self, p, due, sku, running, k, changeover_h, flow_weight):
+        self.p, self.due, self.sku, self.running = p, due, sku, running
+        self.k, self.setup, self.w = k, changeover_h, flow_weight / max(1, len(p))   # per job, so tardiness dominates
+
+    def station_cost(self, seq: list[int]) -> float:
+        if not seq: return 0.0
+        idx = np.asarray(seq); s = self.sku[idx]
+        done = np.cumsum(self.p[idx] + np.r_[0.0, (s[1:] != s[:-1]) * self.setup])
+        return float(np.maximum(0.0, done - self.due[idx]).sum() + self.w * done.sum())
+
+    def list_schedule(self, order) -> list[list[int]]:
+        """Running jobs first, then ``order``; each job goes to the station that completes it soonest."""
+        stations = [[] for _ in range(self.k)]; free = [0.0] * self.k; last = [None] * self.k
+        for j in [j for j in order if self.running[j]] + [j for j in order if not self.running[j]]:
+            best, fin = None, None
+            for i in range(self.k):
+                f = free[i] + self.p[j] + (self.setup if last[i] is not None and last[i] != self.sku[j] else 0.0)
+                if fin is None or f < fin: best, fin = i, f
+            stations[best].append(j); free[best], last[best] = fin, self.sku[j]
+        return stations
+
+    def metrics(self, stations: list[list[int]]) -> dict:
+        jobs = late = setups = 0; tard = mk = 0.0
+        for seq in stations:
+            if not seq: continue
+            idx = np.asarray(seq); s = self.sku[idx]; ch = s[1:] != s[:-1]
+            done = np.cumsum(self.p[idx] + np.r_[0.0, ch * self.setup])
+            t = np.maximum(0.0, done - self.due[idx])
+            jobs += len(seq); late += int((t > 1e-9).sum()); tard += float(t.sum()); setups += int(ch.sum()); mk = max(mk, float(done[-1]))
+        return {"jobs": jobs, "on_time": jobs - late, "tardiness_h": tard, "setups": setups, "makespan_h": mk,
+                "busy_h": float(self.p.sum()) + setups * self.setup}
+
+    def improve(self, stations: list[list[int]], deadline: float, max_moves: int, rng: np.random.Generator) -> tuple[int, bool]:
+        """Apply improving moves in place; returns (accepted moves, whether the deadline cut the search short)."""
+        costs = [self.station_cost(s) for s in stations]
+        fixed = [sum(1 for j in s if self.running[j]) for s in stations]   # running prefix never moves
+        accepted = last = 0
+        for it in range(max_moves):
+            if it % 64 == 0 and time.perf_counter() > deadline: return accepted, True
+            if it - last > STALL_MOVES: break
+            a = int(rng.integers(self.k)); sa = stations[a]
+            if len(sa) <= fixed[a]: continue
+            i = int(rng.integers(fixed[a], len(sa))); j = sa[i]
+            kind = rng.random()
+            if kind < 0.4:                     # group with another job of the same SKU
+                b = int(rng.integers(self.k)); sb = stations[b]
+                same = [q for q in range(fixed[b], len(sb)) if self.sku[sb[q]] == self.sku[j] and sb[q] != j]
+                if not same: continue
+                pos = same[int(rng.integers(len(same)))] + 1
+            elif kind < 0.7:                   # pull a job earlier on its own station
+                b, pos = a, int(rng.integers(fixed[a], i + 1))
+            else:                              # anywhere, any station
+                b = int(rng.integers(self.k)); pos = int(rng.integers(fixed[b], len(stations[b]) + 1))
+            na = sa[:i] + sa[i + 1:]
+            if b == a:
+                pos = min(pos, len(na)); nb = na[:pos] + [j] + na[pos:]
+                delta = self.station_cost(nb) - costs[a]
+                if delta < -1e-9: stations[a], costs[a] = nb, costs[a] + delta; accepted += 1; last = it
+            else:
+                sb = stations[b]; nb = sb[:pos] + [j] + sb[pos:]
+                ca, cb = self.station_cost(na), self.station_cost(nb)
+                if ca + cb < costs[a] + costs[b] - 1e-9:
+                    stations[a], stations[b], costs[a], costs[b] = na, nb, ca, cb; accepted += 1; last = it
+        return accepted, False
+
+def schedule(work_orders: pd.DataFrame, orders: pd.DataFrame | None = None, budget_s: float = SAFETY_S,
+             max_moves: int = 200_000, changeover_h: float = CHANGEOVER_H, flow_weight: float = FLOW_WEIGHT,
+             stations: dict[str, int] | None = None, lines: list[str] | None = None, seed: int = 0) -> Schedule:
+    """Sequence the open work orders of every line; ``max_moves`` and ``budget_s`` are split by job count."""
+    t_start = time.perf_counter(); rng = np.random.default_rng(seed)
+    wo = work_orders if lines is None else work_orders[work_orders["line"].isin(lines)]
+    open_wo = wo[wo["status"].isin(OPEN_STATUSES)]
+    total = max(1, len(open_wo)); plans, results = [], {}
+    due_all = _due_dates(open_wo, orders, open_wo["planned_start"].min())   # across lines: promises are per SKU, not per line
+    for line, g in open_wo.groupby("line", sort=True):
+        all_line = wo[wo["line"] == line]
+        k = (stations or {}).get(line) or _peak_overlap(all_line["planned_start"].to_numpy(), all_line["planned_end"].to_numpy())
+        t0 = g["planned_start"].min()
+        hours = lambda ts: ((ts - t0) / pd.Timedelta(hours=1)).to_numpy(dtype=float)
+        due = due_all.loc[g.index]
+        L = _Line(hours(g["planned_end"]) - hours(g["planned_start"]), hours(due), g["sku"].astype(str).to_numpy(),
+                  (g["status"] == "In-Progress").to_numpy(), k, changeover_h, flow_weight)
+        n = len(g)
+        current = L.list_schedule(list(np.argsort(hours(g["planned_start"]), kind="stable")))
+        greedy = L.list_schedule(list(np.lexsort((L.sku, L.due))))
+        cost = lambda st: sum(L.station_cost(s) for s in st)
+        best = min((current, greedy), key=cost)
+        best = [list(s) for s in best]
+        moves, cut_off = L.improve(best, time.perf_counter() + budget_s * n / total, max_moves * n // total + 1, rng)
+        if cut_off: log.warning("schedule search on %s cut off with %d moves accepted; the schedule is not reproducible", line, moves)
+        results[line] = LineResult(str(line), k, L.metrics(current), L.metrics(best), moves, cut_off)
+        for st_i, seq in enumerate(best):
+            if not seq: continue
+            idx = np.asarray(seq); s = L.sku[idx]
+            done = np.cumsum(L.p[idx] + np.r_[0.0, (s[1:] != s[:-1]) * changeover_h])
+            start = done - L.p[idx]
+            rows = g.iloc[idx]
+            plans.append(pd.DataFrame({"wo_id": rows["wo_id"].to_numpy(), "sku": s, "line": line, "station": st_i + 1,
+                                       "start": t0 + pd.to_timedelta(start, unit="h"), "end": t0 + pd.to_timedelta(done, unit="h"),
+                                       "due": due.iloc[idx].to_numpy(), "late": done > L.due[idx] + 1e-9}))
+    plan = pd.concat(plans, ignore_index=True) if plans else pd.DataFrame(columns=["wo_id","sku","line","station","start","end","due","late"])
+    return Schedule(plan.sort_values(["line", "station", "start"], ignore_index=True), results, time.perf_counter() - t_start)
+
+# ---------- cached over the shared tables ----------
+# The lock only guards the memo; the search runs outside it.
+_memo: dict = {}; _memo_lock = threading.Lock()
+
+def current_schedule() -> Schedule:
+    """Schedule for data/work_orders.csv + orders.csv (``MAX_MOVES``, seed 0), recomputed only when either file changes."""
+    from utils.data import tables
+    key = (tables.entry("work_orders").gen, tables.entry("orders").gen)
+    with _memo_lock:
+        if _memo.get("key") == key: return _memo["sched"]
+    sched = schedule(tables.get("work_orders"), tables.get("orders"), max_moves=MAX_MOVES)
+    with _memo_lock:
+        if _memo.get("key") != key: _memo.update(key=key, sched=sched)
+        return _memo["sched"]
+
+# ---------- benchmark ----------
+def synthetic(n_jobs: int = 10_000, n_lines: int = 4, n_skus: int = 40, stations: int = 4, seed: int = 0):
+    """Random open work orders/orders shaped like data/: 2–8h jobs over ~stations × lines parallel slots."""
+    rng = np.random.default_rng(seed); t0 = pd.Timestamp("2025-10-01 06:00")
+    line = rng.integers(n_lines, size=n_jobs); p = rng.integers(2, 9, size=n_jobs)
+    horizon_h = p.sum() * 1.15 / (n_lines * stations)   # ~15% slack over pure run time, eaten partly by changeovers
+    start = t0 + pd.to_timedelta(np.sort(rng.uniform(0, horizon_h, n_jobs)).round(), unit="h")
+    sku = np.array([f"SKU-{i:02d}" for i in rng.integers(n_skus, size=n_jobs)])
+    wos = pd.DataFrame({"wo_id": np.arange(n_jobs), "sku": sku, "op": 10, "planned_start": start,
+                        "planned_end": start + pd.to_timedelta(p, unit="h"), "status": "Planned", "line": [f"L{i+1}" for i in line]})
+    promised = wos["planned_end"] + pd.to_timedelta(rng.integers(-12, 48, n_jobs), unit="h")
+    orders = pd.DataFrame({"sku": sku, "promised_ship_date": promised, "actual_ship_date": pd.NaT})
+    return wos, orders, {f"L{i+1}": stations for i in range(n_lines)}
+
+def bench(n_jobs: int = 10_000, caps=(0, 20_000, 200_000, 2_000_000)) -> pd.DataFrame:
+    wos, orders, st = synthetic(n_jobs)
+    rows = []
+    for m in caps:
+        s = schedule(wos, orders, budget_s=60.0, max_moves=m, stations=st).summary()
+        rows.append({"max_moves": m, **{k: s[k] for k in ("runtime_s", "moves", "tardiness_h_after", "on_time_pct_after",
+                                                         "setups_after", "makespan_h_after", "throughput_gain_pct")}})
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Finite-capacity work-order scheduler")
+    ap.add_argument("--bench", action="store_true", help="quality vs move cap on synthetic work orders")
+    ap.add_argument("--jobs", type=int, default=10_000)
+    ap.add_argument("--moves", type=int, default=MAX_MOVES)
+    args = ap.parse_args()
+    if args.bench:
+        print(bench(args.jobs).to_string(index=False))
+    else:
+        from utils.data import load_csv
+        s = schedule(load_csv("work_orders"), load_csv("orders"), max_moves=args.moves)
+        for line in s.lines: print(line, s.summary(line))
+        print("all", s.summary())
@@ -1,37 +1,365 @@
 # manufacturing-ai-assist/utils/search.py
 # -*- coding: utf-8 -*-
+import argparse, math, re, threading, time
+from bisect import bisect_left
+from collections import defaultdict
+import numpy as np
 import pandas as pd
 from typing import Dict, Tuple
+from utils.mrp import OPEN_PO
+from utils.rollup import current_cube
+from utils.sqlstore import open_store
 
-def search_sales(q: str, dfs: Dict[str, pd.DataFrame]) -> Tuple[str, pd.DataFrame]:
-    ql = q.lower()
+# Each persona search opens utils.sqlstore's data/plant.db when it is built and
+# fresh (or takes an explicit ``store``); filters then run in SQLite against
+# indexed columns instead of scanning `dfs`. Plant aggregates are read from the
+# rollup cubes (utils.rollup).
+
+# ---------- index ----------
+# What gets indexed per table: text fields, the row key shown in results, and the facet columns.
+SOURCES: dict[str, dict] = {
+    "inventory": {"key": "sku", "text": ("sku", "description")},
+    "products": {"key": "sku", "text": ("sku", "desc", "family")},
+    "bom": {"key": "part", "text": ("assembly", "part", "desc")},
+    "prospects": {"key": "account", "text": ("account", "contact", "email")},
+    "orders": {"key": "order_id", "text": ("order_id", "sku"), "line": "line", "date": "order_date"},
+    "work_orders": {"key": "wo_id", "text": ("wo_id", "sku"), "line": "line", "date": "planned_start", "status": "status"},
+    "downtime_log": {"key": "event_id", "text": ("event_id", "asset", "cause"), "line": "line", "date": "start"},
+    "quality_inspections": {"key": "inspection_id", "text": ("inspection_id", "sku", "defect_family"), "line": "line", "date": "date"},
+    "purchase_orders": {"key": "po_id", "text": ("po_id", "sku", "supplier"), "date": "eta_date", "status": "status"},
+}
+PREFIX_W, FUZZY_W = 0.7, 0.5       # match weight vs an exact token
+KEY_BOOST = 1.5                    # exact hit on the row's own key (the inventory row for 'SKU-19' beats orders of it)
+MAX_EXPANSIONS = 64                # prefix / fuzzy vocabulary terms tried per query token
+FUZZY_MIN_LEN = 4
+_WORD = re.compile(r"[a-z0-9]+(?:[-_.@][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+NO_DATE = np.iinfo(np.int64).min
+
+def doc_tokens(text: str) -> set[str]:
+    """Words, their alphanumeric parts and the parts joined: 'SKU-19' → {'sku', '19', 'sku19'}."""
+    out = set()
+    for w in _WORD.findall(text.lower()):
+        parts = _PART.findall(w); out.update(parts)
+        if len(parts) > 1: out.add("".join(parts))
+    return out
+
+def query_tokens(q: str) -> list[str]:
+    return list(dict.fromkeys("".join(_PART.findall(w)) for w in _WORD.findall(q.lower())))
+
+def _deletes(t: str) -> set[str]:
+    return {t[:i] + t[i + 1:] for i in range(len(t))}
+
+class _Grow:
+    """Append-only numpy column with amortized doubling."""
+    def __init__(self, dtype):
+        self.a = np.empty(1024, dtype=dtype); self.n = 0
+    def extend(self, v) -> None:
+        v = np.asarray(v, dtype=self.a.dtype)
+        if self.n + len(v) > len(self.a):
+            a = np.empty(max(2 * len(self.a), self.n + len(v)), dtype=self.a.dtype); a[:self.n] = self.a[:self.n]; self.a = a
+        self.a[self.n:self.n + len(v)] = v; self.n += len(v)
+    @property
+    def view(self) -> np.ndarray: return self.a[:self.n]
+
+class SearchIndex:
+    """In-memory inverted index over the plant tables.
+
+    Every row is one document with a table ("kind"), line, status and date facet.
+    Postings are sorted doc-id arrays (ids only grow, so appends stay sorted).
+    A query token matches in three ways:
+
+    - exactly;
+    - as a prefix, through a sorted vocabulary plus a small unsorted tail of
+      tokens added since;
+    - fuzzily, when there is no exact hit: alphabetic tokens within one edit,
+      found through a deletion-neighbourhood table.
+
+    Documents must match every query token that matches anything (see
+    ``search``). They are ranked by Σ idf × match weight, newest first on
+    ties. Facet filters and counts are vectorized over the candidate ids only.
+    """
+    def __init__(self):
+        self.kinds: list[str] = []; self.lines: list[str] = []; self.statuses: list[str] = []
+        self._codes = {"kind": {}, "line": {}, "status": {}}
+        self.kind, self.row, self.line, self.status, self.date = (_Grow(np.int16), _Grow(np.int64), _Grow(np.int16), _Grow(np.int16), _Grow(np.int64))
+        self.postings: dict[str, np.ndarray] = {}; self.keyed: dict[str, np.ndarray] = {}
+        self._sorted = np.array([], dtype=object); self._tail: list[str] = []
+        self._del: dict[str, set[str]] = defaultdict(set)
+        self.frames: dict[str, pd.DataFrame] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def size(self) -> int: return self.kind.n
+
+    def _code(self, facet: str, names: list, values: pd.Series) -> np.ndarray:
+        codes, uniq = pd.factorize(values.astype("string").fillna(""), sort=False)
+        m = self._codes[facet]
+        for u in uniq:
+            if u not in m: m[u] = len(names); names.append(u)
+        lut = np.array([m[u] for u in uniq], dtype=np.int16) if len(uniq) else np.zeros(1, dtype=np.int16)
+        return lut[codes]
+
+    def add(self, name: str, df: pd.DataFrame, start: int = 0) -> int:
+        """Index ``df.iloc[start:]`` as documents of table ``name``; returns the number of rows added."""
+        spec = SOURCES[name]; new = df.iloc[start:]
+        if not len(new): return 0
+        with self._lock:
+            self.frames[name] = df
+            base = self.size; n = len(new)
+            kind = self._codes["kind"].setdefault(name, len(self.kinds))
+            if kind == len(self.kinds): self.kinds.append(name)
+            self.kind.extend(np.full(n, kind)); self.row.extend(np.arange(start, start + n))
+            none = pd.Series([""] * n, index=new.index)
+            self.line.extend(self._code("line", self.lines, new[spec["line"]] if "line" in spec else none))
+            self.status.extend(self._code("status", self.statuses, new[spec["status"]] if "status" in spec else none))
+            if "date" in spec:
+                d = pd.to_datetime(new[spec["date"]], errors="coerce")
+                self.date.extend(np.where(d.isna(), NO_DATE, d.to_numpy(dtype="datetime64[D]").astype(np.int64)))
+            else:
+                self.date.extend(np.full(n, NO_DATE))
+            parts: dict[str, list[np.ndarray]] = defaultdict(list); keyed: dict[str, list[np.ndarray]] = defaultdict(list)
+            for col in spec["text"]:
+                if col not in new: continue
+                codes, uniq = pd.factorize(new[col].astype("string").fillna(""), sort=False)
+                order = np.argsort(codes, kind="stable"); bounds = np.searchsorted(codes[order], np.arange(len(uniq) + 1))
+                for k, u in enumerate(uniq):
+                    ids = order[bounds[k]:bounds[k + 1]] + base
+                    for t in doc_tokens(u):
+                        parts[t].append(ids)
+                        if col == spec["key"]: keyed[t].append(ids)
+            for t, lst in parts.items():
+                ids = np.unique(np.concatenate(lst)) if len(lst) > 1 else lst[0]
+                old = self.postings.get(t)
+                if old is None:
+                    self.postings[t] = ids; self._tail.append(t)
+                    if len(t) >= FUZZY_MIN_LEN and t.isalpha():
+                        for d in _deletes(t): self._del[d].add(t)
+                else:
+                    self.postings[t] = np.concatenate([old, ids])
+            for t, lst in keyed.items():
+                ids = np.unique(np.concatenate(lst)) if len(lst) > 1 else lst[0]
+                self.keyed[t] = np.concatenate([self.keyed[t], ids]) if t in self.keyed else ids
+            if len(self._tail) > max(1024, len(self._sorted) // 8):
+                self._sorted = np.array(sorted([*self._sorted.tolist(), *self._tail]), dtype=object); self._tail = []
+            return n
+
+    # ---------- query ----------
+    def _prefixed(self, t: str) -> list[str]:
+        lo = bisect_left(self._sorted, t) if len(self._sorted) else 0
+        hi = bisect_left(self._sorted, t + "￿", lo) if len(self._sorted) else 0
+        out = [v for v in self._sorted[lo:min(hi, lo + MAX_EXPANSIONS)] if v != t]
+        out += [v for v in self._tail if v.startswith(t) and v != t]
+        return out[:MAX_EXPANSIONS]
+
+    def _fuzzy(self, t: str) -> list[str]:
+        if len(t) < FUZZY_MIN_LEN or not t.isalpha(): return []
+        cand = set(self._del.get(t, ()))                       # one insertion away
+        for d in _deletes(t):
+            cand |= self._del.get(d, set())                    # one substitution / transposition-ish away
+            if d in self.postings: cand.add(d)                 # one deletion away
+        return sorted(cand - {t})[:MAX_EXPANSIONS]
+
+    def _variants(self, t: str) -> list[tuple[str, float]]:
+        variants = [(t, 1.0)] if t in self.postings else []
+        variants += [(v, PREFIX_W) for v in self._prefixed(t) if len(t) >= 2]
+        return variants or [(v, FUZZY_W) for v in self._fuzzy(t)]
+
+    def _weights(self, v: str, w: float) -> np.ndarray:
+        ws = np.full(len(self.postings[v]), w * math.log1p(max(1, self.size) / len(self.postings[v])), dtype=np.float32)
+        if w == 1.0 and v in self.keyed: ws[np.searchsorted(self.postings[v], self.keyed[v])] *= KEY_BOOST
+        return ws
+
+    def _term(self, t: str) -> tuple[np.ndarray, np.ndarray]:
+        """Doc ids (sorted) and their best weight for one query token."""
+        variants = self._variants(t)
+        if not variants: return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if len(variants) == 1:
+            v, w = variants[0]; return self.postings[v], self._weights(v, w)
+        ids = np.concatenate([self.postings[v] for v, _ in variants])
+        ws = np.concatenate([self._weights(v, w) for v, w in variants])
+        if len(ids) > self.size // 8:   # dense: one pass over all docs beats sorting a big union
+            best = np.zeros(self.size, dtype=np.float32); np.maximum.at(best, ids, ws)
+            ids = np.flatnonzero(best); return ids, best[ids]
+        order = np.lexsort((-ws, ids)); ids, ws = ids[order], ws[order]
+        first = np.r_[True, ids[1:] != ids[:-1]]
+        return ids[first], ws[first]
+
+    def _term_on(self, t: str, cand: np.ndarray) -> np.ndarray:
+        """Best weight of token ``t`` for each candidate id (0 = no match); cost scales with the candidates, not the postings."""
+        best = np.zeros(len(cand), dtype=np.float32)
+        for v, w in self._variants(t):
+            post = self.postings[v]; pos = np.minimum(np.searchsorted(post, cand), len(post) - 1); hit = post[pos] == cand
+            if hit.any(): best[hit] = np.maximum(best[hit], self._weights(v, w)[pos[hit]] if w == 1.0 and v in self.keyed
+                                                 else w * math.log1p(max(1, self.size) / len(post)))
+        return best
+
+    def _facet_mask(self, ids: np.ndarray, kind=None, line=None, status=None, start=None, end=None) -> np.ndarray:
+        mask = np.ones(len(ids), dtype=bool)
+        for facet, col, want in (("kind", self.kind, kind), ("line", self.line, line), ("status", self.status, status)):
+            if want is None: continue
+            codes = [self._codes[facet][w] for w in ([want] if isinstance(want, str) else want) if w in self._codes[facet]]
+            mask &= np.isin(col.view[ids], codes)
+        if start is not None or end is not None:
+            d = self.date.view[ids]; mask &= d != NO_DATE
+            if start is not None: mask &= d >= np.datetime64(pd.Timestamp(start).date(), "D").astype(np.int64)
+            if end is not None: mask &= d <= np.datetime64(pd.Timestamp(end).date(), "D").astype(np.int64)
+        return mask
+
+    def search(self, q: str = "", kind=None, line=None, status=None, start=None, end=None,
+               page: int = 1, per_page: int = 20) -> dict:
+        """Ranked, paginated hits for ``q`` with optional facet filters; an empty ``q`` lists newest first.
+
+        Tokens are ANDed, rarest first, within the facet filters. A token
+        nothing matches, or one that would leave no hits ('show', 'check stock
+        for' in 'check stock for SKU-19'), is skipped and listed under
+        ``ignored``. A query whose every token is skipped has no hits.
+        """
+        t0 = time.perf_counter(); facets_kw = dict(kind=kind, line=line, status=status, start=start, end=end)
+        with self._lock:
+            ids, score, ignored = None, None, []
+            tokens = query_tokens(q)
+            for t in sorted(tokens, key=lambda t: len(self.postings.get(t, ())) or 1 << 62):
+                if ids is None:
+                    tids, tw = self._term(t); keep = self._facet_mask(tids, **facets_kw)
+                    if keep.any(): ids, score = tids[keep], tw[keep].copy()
+                    else: ignored.append(t)
+                else:
+                    tw = self._term_on(t, ids); keep = tw > 0
+                    if keep.any(): ids, score = ids[keep], score[keep] + tw[keep]
+                    else: ignored.append(t)
+            if ids is None:
+                ids = np.empty(0, dtype=np.int64) if tokens else np.arange(self.size)
+                ids = ids[self._facet_mask(ids, **facets_kw)]; score = np.zeros(len(ids), dtype=np.float32)
+            total = len(ids); lo = max(0, (page - 1) * per_page); k = lo + per_page
+            if total and score.max() == score.min():
+                pos = np.arange(total)[::-1][lo:k]                        # unranked: newest first
+            else:
+                key = np.round(score.astype(np.float64) * 1e4).astype(np.int64) * (self.size + 1) + ids   # score (4 dp) desc, then newest
+                part = np.argpartition(-key, k - 1)[:k] if total > k else np.arange(total)
+                pos = part[np.argsort(-key[part])][lo:k]
+            facets = {f: {names[c]: int(n) for c, n in enumerate(np.bincount(col.view[ids], minlength=len(names))) if n and names[c]}
+                      for f, names, col in (("kind", self.kinds, self.kind), ("line", self.lines, self.line), ("status", self.statuses, self.status))}
+            hits = []
+            for i, sc in zip(ids[pos].tolist(), score[pos].tolist()):
+                name = self.kinds[self.kind.a[i]]; row = self.frames[name].iloc[int(self.row.a[i])]; spec = SOURCES[name]
+                hits.append({"kind": name, "key": str(row[spec["key"]]), "title": " · ".join(str(row[c]) for c in spec["text"] if c in row.index),
+                             "line": self.lines[self.line.a[i]] or None, "status": self.statuses[self.status.a[i]] or None,
+                             "date": None if self.date.a[i] == NO_DATE else str(np.datetime64(int(self.date.a[i]), "D")),
+                             "score": round(sc, 3)})
+            return {"q": q, "ignored": ignored, "total": total, "page": page, "per_page": per_page, "hits": hits, "facets": facets,
+                    "took_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+    def stats(self) -> dict:
+        return {"docs": self.size, "tokens": len(self.postings), "fuzzy_keys": len(self._del), "kinds": {k: int(n) for k, n in zip(self.kinds, np.bincount(self.kind.view, minlength=len(self.kinds)))}}
+
+# ---------- kept in sync with the shared tables ----------
+_index = SearchIndex(); _seen: dict[str, tuple[int, int, int]] = {}; _sync_lock = threading.Lock()
+
+def current_index() -> SearchIndex:
+    """The process-wide index; appended rows are indexed incrementally, a rewritten table rebuilds it."""
+    global _index
+    from utils.data import DATA_DIR, tables
+    with _sync_lock:
+        ents = {n: tables.entry(n) for n in SOURCES if (DATA_DIR / f"{n}.csv").exists()}
+        if any(n in _seen and e.base_gen != _seen[n][0] for n, e in ents.items()) or set(_seen) - set(ents):
+            _index = SearchIndex(); _seen.clear()
+        for n, e in ents.items():
+            if _seen.get(n, (None, None))[1] == e.gen: continue
+            _index.add(n, e.df, _seen[n][2] if n in _seen else 0)
+            _seen[n] = (e.base_gen, e.gen, len(e.df))
+        return _index
+
+def search(q: str, **kw) -> dict:
+    return current_index().search(q, **kw)
+
+def _hits_frame(res: dict) -> pd.DataFrame:
+    return pd.DataFrame(res["hits"], columns=["kind", "key", "title", "line", "status", "date", "score"])
+
+# ---------- persona routes ----------
+def search_sales(q: str, dfs: Dict[str, pd.DataFrame], store=None) -> Tuple[str, pd.DataFrame]:
+    ql = q.lower(); store = store if store is not None else open_store()
     if "bom" in ql or "assy" in ql:
+        if store is not None:
+            return ("BOM / Catalog", store.select("inventory", like=[("sku", f"%{t}%") for t in ("ASSY", "KIT", "COMP")], limit=50))
         df = dfs["inv"]
         mask = df["sku"].str.contains("ASSY|KIT|COMP", case=False, regex=True)
         return ("BOM / Catalog", df[mask].head(50))
     if "quote" in ql or "customer" in ql:
-        df = dfs["orders"]
+        df = store.select("orders", limit=50) if store is not None else dfs["orders"]
         cols = [c for c in df.columns if c in ("customer","status","sku","qty","created_at")]
         return ("Quotes", df[cols].head(50))
-    return ("Sales search", dfs["orders"].head(50))
+    res = search(q, kind=["prospects", "products", "bom", "orders", "inventory"], per_page=50)
+    return ("Sales search", _hits_frame(res) if res["total"] else dfs["orders"].head(50))
 
-def search_sc(q: str, dfs: Dict[str, pd.DataFrame]) -> Tuple[str, pd.DataFrame]:
-    ql = q.lower()
-    if "sku-" in ql:
-        sku = q.upper().split()[-1]
-        df = dfs["inv"]
-        return (f"Inventory for {sku}", df[df["sku"]==sku])
-    if "po" in ql:
-        df = dfs.get("pos", dfs["orders"])
-        return ("Open POs", df.head(50))
-    return ("Supply chain search", dfs["inv"].head(50))
+def search_sc(q: str, dfs: Dict[str, pd.DataFrame], store=None) -> Tuple[str, pd.DataFrame]:
+    ql = q.lower(); store = store if store is not None else open_store()
+    if "sku" in ql:
+        hit = search(q, kind="inventory", per_page=1)["hits"]   # 'sku 19', 'SKU-19?', 'skU19' all resolve
+        if hit:
+            sku = hit[0]["key"]
+            if store is not None:
+                return (f"Inventory for {sku}", store.select("inventory", filters={"sku": sku}))
+            df = dfs["inv"]
+            return (f"Inventory for {sku}", df[df["sku"]==sku])
+    if "po" in ql:   # open purchase orders, soonest ETA first
+        if store is not None and "pos" not in dfs:
+            marks = ", ".join("?" * len(OPEN_PO))
+            return ("Open POs", store.query(f'SELECT * FROM purchase_orders WHERE status IN ({marks}) ORDER BY eta_date LIMIT 50',
+                                            OPEN_PO, table="purchase_orders"))
+        from utils.data import tables
+        df = dfs["pos"] if "pos" in dfs else tables.get("purchase_orders")
+        return ("Open POs", df[df["status"].isin(OPEN_PO)].sort_values("eta_date", kind="stable").head(50))
+    res = search(q, kind=["inventory", "purchase_orders", "bom", "orders"], per_page=50)
+    return ("Supply chain search", _hits_frame(res) if res["total"] else dfs["inv"].head(50))
 
-def search_plant(q: str, dfs: Dict[str, pd.DataFrame]) -> Tuple[str, pd.DataFrame]:
+def search_plant(q: str, dfs: Dict[str, pd.DataFrame], store=None) -> Tuple[str, pd.DataFrame]:
+    # Aggregates come from the rollup cubes, folded forward as rows are appended.
     ql = q.lower()
     if "downtime" in ql or "line" in ql:
-        df = dfs["down"]
-        return ("Downtime by line", df.groupby("line")["minutes"].sum().reset_index().sort_values("minutes", ascending=False))
+        df = current_cube("downtime").pareto("line", "minutes")
+        return ("Downtime by line", df[["line", "minutes"]])
     if "defect" in ql or "spc" in ql:
-        df = dfs["quality"]
-        return ("Defects by family", df.groupby("defect_family").size().reset_index(name="count").sort_values("count", ascending=False))
-    return ("Plant search", dfs["down"].head(50))
+        df = current_cube("quality").pareto("defect_family", "rows")
+        return ("Defects by family", df[["defect_family", "rows"]].rename(columns={"rows": "count"}))
+    res = search(q, kind=["downtime_log", "quality_inspections", "work_orders"], per_page=50)
+    return ("Plant search", _hits_frame(res) if res["total"] else dfs["down"].head(50))
+
+# ---------- benchmark ----------
+def bench(rows: int = 2_000_000, seed: int = 0) -> pd.DataFrame:
+    """Index ``rows`` synthetic downtime/WO/order rows and time a mix of queries."""
+    rng = np.random.default_rng(seed); n = rows // 3
+    day = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 300, n), unit="D")
+    assets = np.array([f"Press-{i}" for i in range(1, 40)] + [f"Line-{i}" for i in range(1, 12)])
+    causes = np.array(["Mechanical", "Electrical", "Operator", "Quality Hold", "Changeover", "Material Shortage"])
+    lines = np.array([f"L{i}" for i in range(1, 9)]); skus = np.array([f"SKU-{i:04d}" for i in range(5000)])
+    idx = SearchIndex(); t = time.perf_counter()
+    idx.add("downtime_log", pd.DataFrame({"event_id": np.arange(n), "start": day, "asset": assets[rng.integers(len(assets), size=n)],
+                                          "cause": causes[rng.integers(len(causes), size=n)], "line": lines[rng.integers(8, size=n)]}))
+    idx.add("work_orders", pd.DataFrame({"wo_id": np.arange(n) + 10**7, "sku": skus[rng.integers(5000, size=n)], "planned_start": day,
+                                         "status": np.array(["Planned", "In-Progress", "Completed"])[rng.integers(3, size=n)],
+                                         "line": lines[rng.integers(8, size=n)]}))
+    idx.add("orders", pd.DataFrame({"order_id": np.arange(n) + 2 * 10**7, "sku": skus[rng.integers(5000, size=n)], "order_date": day,
+                                    "line": lines[rng.integers(8, size=n)]}))
+    build = time.perf_counter() - t
+    queries = [("SKU-0042", {}), ("sku 42", {}), ("press-17 mechanical", {}), ("mechanicl", {}), ("electr", {"line": "L3"}),
+               ("changeover", {"start": "2025-03-01", "end": "2025-03-31"}), ("10000042", {}), ("sku-0042", {"kind": "work_orders", "status": "Planned"}),
+               ("L2", {"page": 3})]
+    out = []
+    for q, kw in queries:
+        idx.search(q, **kw); t = time.perf_counter(); r = None
+        for _ in range(5): r = idx.search(q, **kw)
+        out.append({"query": q, "filters": kw, "total": r["total"], "ms": round((time.perf_counter() - t) / 5 * 1000, 2)})
+    print(f"{idx.size:,} docs, {len(idx.postings):,} tokens, built in {build:.1f}s")
+    return pd.DataFrame(out)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Plant search index")
+    ap.add_argument("q", nargs="?", default="")
+    ap.add_argument("--bench", action="store_true")
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    args = ap.parse_args()
+    if args.bench: print(bench(args.rows).to_string(index=False))
+    else:
+        r = search(args.q); print(f"{r['total']} hits in {r['took_ms']}ms  {r['facets']}")
+        print(_hits_frame(r).to_string(index=False))
@@ -0,0 +1,153 @@
+# utils/sqlstore.py
+"""Optional embedded SQLite store for the data/ tables.
+
+Build (or rebuild) with ``python -m utils.sqlstore``; it writes ``data/plant.db``
+with indexes on sku, line, asset, cause, defect_family and the date columns.
+Timestamps are stored as ``YYYY-MM-DD HH:MM:SS`` text so range predicates stay
+index-friendly. ``open_store()`` returns None when the db is missing, disabled
+(``MFG_SQL=0``) or older than any of its CSVs, and callers fall back to pandas.
+"""
+from __future__ import annotations
+import os, sqlite3, sys, threading
+from pathlib import Path
+import pandas as pd
+
+from utils.columnar import SCHEMAS
+from utils.kpis import KPIEngine, WINDOW_DAYS, TREND_DAYS
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+DB_NAME = "plant.db"
+TS_FMT = "%Y-%m-%d %H:%M:%S"
+
+INDEXES: dict[str, list[str]] = {
+    "orders": ["sku", "line", "order_date", "promised_ship_date"],
+    "quality_inspections": ["sku", "line", "defect_family", "date"],
+    "downtime_log": ["line", "asset", "cause", "start"],
+    "inventory": ["sku"],
+    "work_orders": ["sku", "line", "status", "planned_start"],
+    "bom": ["assembly", "part"],
+    "products": ["sku", "family"],
+    "prospects": ["account"],
+    "purchase_orders": ["sku", "eta_date"],
+}
+
+def _ts_cols(table: str) -> list[str]:
+    return [c for c, kind in SCHEMAS.get(table, {}).items() if kind == "ts"]
+
+def _ts(value) -> str:
+    return pd.Timestamp(value).strftime(TS_FMT)
+
+def build(data_dir: Path = DATA_DIR, db_path: Path | None = None) -> Path:
+    """Load every CSV in data/ into a fresh SQLite file and index it."""
+    data_dir = Path(data_dir); db_path = Path(db_path or data_dir / DB_NAME)
+    tmp = db_path.with_suffix(".db.tmp")
+    tmp.unlink(missing_ok=True)
+    con = sqlite3.connect(tmp)
+    try:
+        for table, cols in INDEXES.items():
+            fp = data_dir / f"{table}.csv"
+            if not fp.exists(): continue
+            df = pd.read_csv(fp)
+            for c in _ts_cols(table):
+                if c in df.columns: df[c] = pd.to_datetime(df[c], errors="coerce").dt.strftime(TS_FMT)
+            df.to_sql(table, con, index=False)
+            for c in cols:
+                if c in df.columns: con.execute(f'CREATE INDEX "ix_{table}_{c}" ON "{table}" ("{c}")')
+        con.execute("ANALYZE"); con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+    return db_path
+
+class SQLStore:
+    """Read-only access to plant.db with one connection per thread."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._kpis: dict | None = None   # a store object never outlives its db file (see open_store)
+
+    @property
+    def con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return con
+
+    def query(self, sql: str, params=(), table: str | None = None) -> pd.DataFrame:
+        df = pd.read_sql_query(sql, self.con, params=params)
+        for c in _ts_cols(table) if table else []:
+            if c in df.columns: df[c] = pd.to_datetime(df[c])
+        return df
+
+    def scalar(self, sql: str, params=()):
+        return self.con.execute(sql, params).fetchone()[0]
+
+    def select(self, table: str, columns: list[str] | None = None, filters: dict | None = None,
+               date_col: str | None = None, start=None, end=None, like: list[tuple[str, str]] | None = None,
+               order_by: str | None = None, limit: int | None = None) -> pd.DataFrame:
+        """Predicate push-down: equality ``filters``, ``like`` patterns (OR-ed) and a [start, end] date range."""
+        where, params = [], []
+        for c, v in (filters or {}).items():
+            if v is None: continue
+            where.append(f'"{c}" = ?'); params.append(v)
+        if like:
+            where.append("(" + " OR ".join(f'"{c}" LIKE ?' for c, _ in like) + ")"); params += [p for _, p in like]
+        if date_col and start is not None: where.append(f'"{date_col}" >= ?'); params.append(_ts(start))
+        if date_col and end is not None: where.append(f'"{date_col}" <= ?'); params.append(_ts(end))
+        cols = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        sql = f'SELECT {cols} FROM "{table}"' + (" WHERE " + " AND ".join(where) if where else "")
+        if order_by: sql += f' ORDER BY "{order_by}"'
+        if limit is not None: sql += " LIMIT ?"; params.append(int(limit))
+        return self.query(sql, params, table)
+
+    def sum_by(self, table: str, key: str, value: str | None = None, alias: str = "total") -> pd.DataFrame:
+        agg = f'SUM("{value}")' if value else "COUNT(*)"
+        return self.query(f'SELECT "{key}", {agg} AS "{alias}" FROM "{table}" GROUP BY "{key}" ORDER BY "{alias}" DESC')
+
+    def _mean_qty(self, where: str, params) -> float:
+        qty, n = self.con.execute(f"SELECT SUM(qty_produced), COUNT(*) FROM orders WHERE {where}", params).fetchone()
+        return qty / n if n else float('nan')
+
+    def kpis(self) -> dict:
+        """utils.kpis.compute_kpis without inventory_risk_count (an MRP projection, see utils.mrp), computed once per
+        db build with indexed range scans and GROUP BYs."""
+        if self._kpis is None: self._kpis = self._compute_kpis()
+        return dict(self._kpis)
+
+    def _compute_kpis(self) -> dict:
+        k = {}
+        omax = pd.Timestamp(self.scalar("SELECT MAX(order_date) FROM orders"))
+        cutoff, split = _ts(omax - pd.Timedelta(days=WINDOW_DAYS)), _ts(omax - pd.Timedelta(days=TREND_DAYS))
+        qty, days = self.con.execute("SELECT SUM(qty_produced), COUNT(DISTINCT order_date) FROM orders WHERE order_date >= ?", (cutoff,)).fetchone()
+        k['throughput_per_day'] = (qty or 0) / max(1, days)
+        on_time, n = self.con.execute("SELECT SUM(CASE WHEN actual_ship_date <= promised_ship_date THEN 1 ELSE 0 END), COUNT(*) FROM orders").fetchone()
+        k['on_time_pct'] = (on_time / n * 100) if n else float('nan')
+        units, defects = self.con.execute("SELECT SUM(units_inspected), SUM(defects_found) FROM quality_inspections").fetchone()
+        k['defect_rate_pct'] = (defects/units*100) if units else 0.0
+        dmax = pd.Timestamp(self.scalar("SELECT MAX(start) FROM downtime_log"))
+        k['downtime_hours'] = (self.scalar("SELECT SUM(duration_min) FROM downtime_log WHERE start >= ?", (_ts(dmax - pd.Timedelta(days=WINDOW_DAYS)),)) or 0)/60.0
+        inv = self.query("SELECT sku, on_hand FROM inventory", table="inventory")
+        last3 = self._mean_qty("order_date >= ?", (split,))
+        prev4 = self._mean_qty("order_date >= ? AND order_date < ?", (cutoff, split))
+        k['throughput_trend'] = 'up' if last3 > prev4 else 'down' if last3 < prev4 else 'flat'
+        k['top_downtime_cause'] = KPIEngine._top(dict(self.con.execute("SELECT cause, SUM(duration_min) FROM downtime_log GROUP BY cause").fetchall()))
+        k['top_defect_family'] = KPIEngine._top(dict(self.con.execute("SELECT defect_family, SUM(defects_found) FROM quality_inspections GROUP BY defect_family").fetchall()))
+        k['lowest_stock_sku'] = inv.sort_values('on_hand').head(1)['sku'].iloc[0]
+        return k
+
+_stores: dict[Path, tuple[int, SQLStore]] = {}
+
+def open_store(data_dir: Path = DATA_DIR) -> SQLStore | None:
+    data_dir = Path(data_dir); fp = data_dir / DB_NAME
+    if os.getenv("MFG_SQL", "1") == "0" or not fp.exists(): return None
+    built = fp.stat().st_mtime_ns
+    if any((data_dir / f"{t}.csv").exists() and (data_dir / f"{t}.csv").stat().st_mtime_ns > built for t in INDEXES):
+        return None   # stale: a CSV changed after the last build
+    cached = _stores.get(fp)
+    if cached is None or cached[0] != built:   # rebuilt db: drop connections to the old file
+        cached = _stores[fp] = (built, SQLStore(fp))
+    return cached[1]
+
+if __name__ == "__main__":
+    fp = build(Path(sys.argv[1]) if len(sys.argv) > 1 else DATA_DIR)
+    print(f"wrote {fp} ({fp.stat().st_size:,} bytes)")
@@ -0,0 +1,147 @@
+# utils/table_cache.py
+from __future__ import annotations
+import hashlib, io, itertools, os, threading, time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable
+import pandas as pd
+
+def file_digest(fp: Path, limit: int | None = None) -> str:
+    """Content hash of ``fp`` (optionally of its first ``limit`` bytes), streamed in chunks."""
+    h = hashlib.blake2b(digest_size=16); left = limit
+    with open(fp, "rb") as f:
+        while left is None or left > 0:
+            chunk = f.read(1 << 20 if left is None else min(1 << 20, left))
+            if not chunk: break
+            h.update(chunk)
+            if left is not None: left -= len(chunk)
+    return h.hexdigest()
+
+@dataclass(frozen=True)
+class TableEntry:
+    """Immutable snapshot of one table; a reload or revalidation stores a new entry, never edits a handed-out one."""
+    df: pd.DataFrame
+    path: Path
+    mtime_ns: int
+    size: int
+    digest: str
+    checked: float
+    gen: int = 1        # cache-wide increasing; new on every (re)load, so it never repeats after an eviction
+    base_gen: int = 1   # gen of the last full (non-append) parse
+    nbytes: int = 0
+
+class TableCache:
+    """Process-wide cache of parsed tables keyed by name.
+
+    A table's file is stat'ed at most every ``check_interval`` seconds. A new
+    mtime/size only triggers a content hash, and only a new hash re-parses.
+    When a CSV's old bytes are an exact prefix of the new file (rows appended),
+    just the tail is parsed and concatenated. ``resolve`` maps a table name to
+    its file and ``readers`` maps non-CSV suffixes to path readers. ``loaders``
+    maps a table name to its own CSV loader in place of ``loader``. With
+    ``max_bytes`` the least recently used frames are dropped once the total
+    in-memory size exceeds it. Returned frames are shared: callers must treat
+    them as read-only.
+    """
+    def __init__(self, data_dir: Path, loader: Callable[..., pd.DataFrame], check_interval: float = 1.0,
+                 resolve: Callable[[str], Path] | None = None, readers: dict[str, Callable[[Path], pd.DataFrame]] | None = None,
+                 max_bytes: int | None = None, loaders: dict[str, Callable[..., pd.DataFrame]] | None = None):
+        self.data_dir = Path(data_dir)
+        self.loader = loader
+        self.check_interval = check_interval
+        self.resolve = resolve
+        self.readers = readers or {}
+        self.loaders = loaders or {}
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, TableEntry] = OrderedDict()
+        self._lock = threading.RLock()
+        self._gen = itertools.count(1)
+        self.counters = {"hits": 0, "misses": 0, "reloads": 0, "appends": 0, "revalidations": 0, "evictions": 0}
+
+    def path(self, name: str) -> Path:
+        return self.resolve(name) if self.resolve else self.data_dir / f"{name}.csv"
+
+    def _read(self, name: str, fp: Path, size: int) -> pd.DataFrame:
+        """Parse ``fp``; a CSV only up to the ``size`` bytes that were stat'ed and hashed, so a concurrent append is picked up next check."""
+        reader = self.readers.get(fp.suffix)
+        if reader: return reader(fp)
+        with open(fp, "rb") as f:
+            return self.loaders.get(name, self.loader)(io.BytesIO(f.read(size)))
+
+    def get(self, name: str) -> pd.DataFrame:
+        return self.entry(name).df
+
+    def entry(self, name: str) -> TableEntry:
+        with self._lock:
+            e = self._entries.get(name)
+            now = time.monotonic()
+            if e is not None:
+                self._entries.move_to_end(name)
+            if e is not None and now - e.checked < self.check_interval:
+                self.counters["hits"] += 1
+                return e
+            fp = self.path(name)
+            st = os.stat(fp)
+            if e is None:
+                self.counters["misses"] += 1
+                gen = next(self._gen); df = self._read(name, fp, st.st_size)
+                e = TableEntry(df=df, path=fp, mtime_ns=st.st_mtime_ns, size=st.st_size, digest=file_digest(fp, st.st_size),
+                               checked=now, gen=gen, base_gen=gen, nbytes=self._nbytes(df))
+            elif e.path == fp and (st.st_mtime_ns, st.st_size) == (e.mtime_ns, e.size):
+                self.counters["hits"] += 1
+                e = replace(e, checked=now)
+            else:
+                e = self._refresh(name, e, fp, st, now)
+            self._entries[name] = e
+            self._evict(e)
+            return e
+
+    def _refresh(self, name: str, e: TableEntry, fp: Path, st: os.stat_result, now: float) -> TableEntry:
+        digest = file_digest(fp, st.st_size)
+        if e.path == fp and digest == e.digest:
+            self.counters["revalidations"] += 1
+            return replace(e, mtime_ns=st.st_mtime_ns, checked=now)
+        self.counters["reloads"] += 1
+        gen, base_gen = next(self._gen), e.base_gen
+        if e.path == fp and fp.suffix == ".csv" and st.st_size > e.size and self._appended(fp, e.size, e.digest):
+            with open(fp, "rb") as f:
+                header = f.readline(); f.seek(e.size); tail = f.read(st.st_size - e.size)
+            df = pd.concat([e.df, self.loaders.get(name, self.loader)(io.BytesIO(header + tail))], ignore_index=True)
+            self.counters["appends"] += 1
+        else:
+            df = self._read(name, fp, st.st_size); base_gen = gen
+        return TableEntry(df=df, path=fp, mtime_ns=st.st_mtime_ns, size=st.st_size, digest=digest, checked=now,
+                          gen=gen, base_gen=base_gen, nbytes=self._nbytes(df))
+
+    @staticmethod
+    def _nbytes(df: pd.DataFrame) -> int:
+        return int(df.memory_usage(index=True, deep=True).sum())
+
+    def _evict(self, e: TableEntry) -> None:
+        """Evict least recently used tables (never ``e``) while the total footprint is above ``max_bytes``."""
+        if self.max_bytes is None: return
+        while len(self._entries) > 1 and sum(x.nbytes for x in self._entries.values()) > self.max_bytes:
+            name, victim = next(iter(self._entries.items()))
+            if victim is e: break
+            del self._entries[name]; self.counters["evictions"] += 1
+
+    @staticmethod
+    def _appended(fp: Path, old: int, old_digest: str) -> bool:
+        if old <= 0: return False
+        with open(fp, "rb") as f:
+            f.seek(old - 1)
+            if f.read(1) != b"\n": return False
+        return file_digest(fp, old) == old_digest
+
+    def invalidate(self, name: str | None = None) -> None:
+        with self._lock:
+            if name is None: self._entries.clear()
+            else: self._entries.pop(name, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tables = {n: {"rows": len(e.df), "gen": e.gen, "digest": e.digest, "source": e.path.name, "bytes": e.nbytes}
+                      for n, e in self._entries.items()}
+            return {**self.counters, "check_interval_s": self.check_interval, "max_bytes": self.max_bytes,
+                    "bytes": sum(e.nbytes for e in self._entries.values()), "tables": tables}
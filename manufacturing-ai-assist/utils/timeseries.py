@@ -0,0 +1,133 @@
+# manufacturing-ai-assist/utils/timeseries.py
+"""Bounded, downsampled KPI time series for trend charts.
+
+Each metric is read per day from a rollup cube (utils.rollup). Ratio metrics
+are computed from the per-day sums. When the range holds more days than
+``points``, the series is downsampled in one of two ways:
+
+- LTTB (largest-triangle-three-buckets) keeps the visual shape;
+- ``minmax`` keeps each bucket's extremes.
+
+The payload never exceeds ``points``, however long the history. Results are
+memoized on (query, cube state). ``days=N`` ranges are anchored on the latest
+data day, so the common "last 30 days" views share one cache entry until new
+rows arrive.
+
+    python -m utils.timeseries throughput --days 90 --points 200
+    python -m utils.timeseries --bench --days 20000
+"""
+from __future__ import annotations
+import argparse, json, os, threading, time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.rollup import Cube, SPECS, current_cube
+
+MAX_POINTS = int(os.getenv("MFG_MAX_POINTS", "1000"))
+MEMO_SIZE = 256
+MODES = ("lttb", "minmax")
+
+# metric → (cube, numerator measure, denominator measure or None, scale, unit)
+METRICS = {
+    "throughput": ("orders", "qty", None, 1.0, "units/day"),
+    "on_time": ("orders", "on_time", "rows", 100.0, "%"),
+    "defect_rate": ("quality", "defects", "inspected", 100.0, "%"),
+    "downtime": ("downtime", "minutes", None, 1 / 60, "h/day"),
+}
+
+# ---------- downsampling ----------
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the ``n`` points largest-triangle-three-buckets keeps (first and last always kept)."""
+    m = len(x)
+    if n >= m or n < 3: return np.arange(m) if n >= m else np.linspace(0, m - 1, max(n, 1)).round().astype(int)
+    edges = np.floor(np.linspace(1, m - 1, n - 1)).astype(int)        # n - 2 buckets over the interior points
+    out = np.empty(n, dtype=np.int64); out[0], out[-1] = 0, m - 1; a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < len(edges) else m)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()                   # average of the next bucket
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax()); out[i + 1] = a
+    return out
+
+def minmax(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of each bucket's minimum and maximum (``n // 2`` buckets), in time order."""
+    m = len(x)
+    if n >= m: return np.arange(m)
+    b = np.floor(np.arange(m) * max(1, n // 2) / m).astype(int)
+    order = np.lexsort((y, b)); first = np.r_[True, b[order][1:] != b[order][:-1]]; last = np.r_[first[1:], True]
+    return np.unique(np.concatenate([order[first], order[last]]))
+
+# ---------- queries ----------
+def daily(cube: Cube, metric: str, start=None, end=None, **filters) -> pd.DataFrame:
+    """Per-day value of ``metric`` (days without rows omitted)."""
+    _, num, den, scale, _ = METRICS[metric]
+    s = cube.series([num] + ([den] if den else []), start, end, **filters)
+    v = s[num].to_numpy(dtype=float) if den is None else np.divide(s[num], s[den], out=np.zeros(len(s)), where=s[den].to_numpy() > 0)
+    return pd.DataFrame({"day": s["day"], "value": v * scale})
+
+_memo: OrderedDict[tuple, dict] = OrderedDict(); _lock = threading.Lock()
+
+def query(metric: str, line=None, sku=None, start=None, end=None, days: int | None = None,
+          points: int = 500, mode: str = "lttb") -> dict:
+    """``metric`` per day over [start, end] (or the last ``days`` days of data), downsampled to at most ``points`` points."""
+    if metric not in METRICS: raise KeyError(metric)
+    if not 2 <= points <= MAX_POINTS: raise ValueError(f"points must be within 2..{MAX_POINTS}")
+    if mode not in MODES: raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    cube = current_cube(METRICS[metric][0])
+    filters = {k: v for k, v in (("line", line), ("sku", sku)) if v is not None}
+    bad = set(filters) - set(cube.spec.dims)
+    if bad: raise ValueError(f"{metric} cannot be filtered by {', '.join(sorted(bad))}")
+    if days is not None:
+        if days < 1: raise ValueError("days must be >= 1")
+        last = cube.span[1] if cube.span else pd.Timestamp.today().normalize()
+        start, end = last - pd.Timedelta(days=days - 1), last
+    start = None if start is None else pd.Timestamp(start); end = None if end is None else pd.Timestamp(end)
+    key = (metric, line, sku, start, end, points, mode, cube.version)
+    with _lock:
+        hit = _memo.get(key)
+        if hit is not None: _memo.move_to_end(key); return hit
+    t0 = time.perf_counter()
+    s = daily(cube, metric, start, end, **filters)
+    x = s["day"].to_numpy(dtype="datetime64[D]").astype(np.int64).astype(float); y = s["value"].to_numpy()
+    keep = (lttb if mode == "lttb" else minmax)(x, y, points)
+    out = {"metric": metric, "unit": METRICS[metric][4], "line": line, "sku": sku, "mode": mode,
+           "start": None if start is None else start.date().isoformat(), "end": None if end is None else end.date().isoformat(),
+           "source_points": len(s), "points": [[str(np.datetime64(int(x[i]), "D")), round(float(y[i]), 4)] for i in keep],
+           "version": cube.version, "took_ms": round((time.perf_counter() - t0) * 1000, 2)}
+    with _lock:
+        _memo[key] = out
+        while len(_memo) > MEMO_SIZE: _memo.popitem(last=False)
+    return out
+
+# ---------- benchmark ----------
+def bench(days: int = 20_000, rows_per_day: int = 200, seed: int = 0) -> pd.DataFrame:
+    """Cold (un-memoized) cost of reducing ``days`` of synthetic order history to 1,000 points."""
+    rng = np.random.default_rng(seed); n = days * rows_per_day
+    d = pd.Timestamp("1971-01-01") + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+    df = pd.DataFrame({"line": np.array(["L1", "L2", "L3"])[rng.integers(3, size=n)], "sku": np.array([f"SKU-{i:02d}" for i in range(30)])[rng.integers(30, size=n)],
+                       "order_date": d, "qty_produced": rng.integers(50, 500, n), "promised_ship_date": d + pd.Timedelta(days=3),
+                       "actual_ship_date": d + pd.to_timedelta(rng.integers(1, 6, n), unit="D")})
+    cube = Cube(SPECS["orders"]); cube.fold(df)
+    out = []
+    for metric, filters in (("throughput", {}), ("on_time", {"line": "L2"}), ("throughput", {"line": "L1", "sku": "SKU-07"})):
+        for mode in MODES:
+            t = time.perf_counter(); s = daily(cube, metric, **filters)
+            x = s["day"].to_numpy(dtype="datetime64[D]").astype(np.int64).astype(float)
+            keep = (lttb if mode == "lttb" else minmax)(x, s["value"].to_numpy(), 1000)
+            out.append({"metric": metric, "filters": filters, "mode": mode, "source_points": len(s), "points": len(keep),
+                        "ms": round((time.perf_counter() - t) * 1000, 2)})
+    print(f"{n:,} order rows → {cube.cells:,} cells")
+    return pd.DataFrame(out)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Downsampled KPI time series")
+    ap.add_argument("metric", nargs="?", default="throughput", choices=list(METRICS))
+    ap.add_argument("--line"); ap.add_argument("--sku")
+    ap.add_argument("--days", type=int)
+    ap.add_argument("--points", type=int, default=500)
+    ap.add_argument("--mode", default="lttb", choices=MODES)
+    ap.add_argument("--bench", action="store_true")
+    args = ap.parse_args()
+    if args.bench: print(bench(args.days or 20_000).to_string(index=False))
+    else: print(json.dumps(query(args.metric, args.line, args.sku, days=args.days, points=args.points, mode=args.mode), indent=2))